@@ -0,0 +1,149 @@
+import numpy as np
+
+from Analysis.logica_p2 import MATERIAS
+
+# AGREGADOS PRECALCULADOS PARA LA API
+# Las cifras detras de calcular_brechas (logica_p2), calcular_estadisticas_brecha
+# (logica_p1) y calcular_probabilidad_b1 (logica_p3) para todos los filtros,
+# en diccionarios pequenos listos para serializar. Se calculan una vez por
+# version de los datos (ver Server/api.py) y cada consulta es una busqueda.
+
+TODOS = "TODOS"
+
+
+def _clave_municipio(nombre):
+    return str(nombre).upper().strip()
+
+
+def _clave_periodo(periodo):
+    return str(int(periodo))
+
+
+def _redondear(valor, decimales=2):
+    return None if valor is None or np.isnan(valor) else round(float(valor), decimales)
+
+
+# BRECHAS PUBLICO VS PRIVADO
+# Celdas de conteo y suma por (municipio, periodo, naturaleza); las medias de
+# cualquier combinacion (incluido TODOS) salen de sumar celdas.
+def _fila_brecha(conteo, suma, columna):
+    n = conteo[columna]
+    medias = suma[columna] / n.where(n > 0)
+    pub = medias.get("Público", np.nan)
+    priv = medias.get("Privado", np.nan)
+    brecha = priv - pub if not (np.isnan(pub) or np.isnan(priv)) else np.nan
+    return {
+        "brecha": _redondear(brecha, 1),
+        "media_publico": _redondear(pub, 1),
+        "media_privado": _redondear(priv, 1),
+        "n_publico": int(n.get("Público", 0)),
+        "n_privado": int(n.get("Privado", 0)),
+    }
+
+
+def agregados_brechas(celdas):
+    """`celdas` es la salida de `consultas.celdas_naturaleza` (cualquier backend)."""
+    columnas = [c for c in MATERIAS.values() if f"n_{c}" in celdas.columns]
+    # Filas sin municipio o periodo cuentan en TODOS pero no tienen entrada propia
+    celdas = celdas.assign(
+        _municipio=celdas["municipio"].map(_clave_municipio, na_action="ignore"),
+        _periodo=celdas["periodo"].map(_clave_periodo, na_action="ignore"),
+        cole_naturaleza=celdas["naturaleza"],
+    ).set_index(["_municipio", "_periodo", "cole_naturaleza"])
+    conteos = celdas[[f"n_{c}" for c in columnas]].set_axis(columnas, axis=1)
+    sumas = celdas[[f"suma_{c}" for c in columnas]].set_axis(columnas, axis=1)
+
+    # Mismas celdas sumadas sobre municipios y/o periodos
+    combinaciones = [
+        (["_municipio", "_periodo", "cole_naturaleza"], lambda k: (k[0], k[1])),
+        (["_municipio", "cole_naturaleza"], lambda k: (k[0], TODOS)),
+        (["_periodo", "cole_naturaleza"], lambda k: (TODOS, k[0])),
+        (["cole_naturaleza"], lambda k: (TODOS, TODOS)),
+    ]
+
+    brechas = {}
+    for niveles, destino in combinaciones:
+        conteo = conteos.groupby(level=niveles, dropna=False).sum()
+        suma = sumas.groupby(level=niveles, dropna=False).sum()
+        grupo = niveles[:-1]
+        if grupo:
+            llaves = conteo.index.droplevel("cole_naturaleza").unique()
+        else:
+            llaves = [()]
+        for llave in llaves:
+            llave = llave if isinstance(llave, tuple) else (llave,)
+            municipio, periodo = destino(llave)
+            if not (isinstance(municipio, str) and isinstance(periodo, str)):
+                continue
+            c = conteo.xs(llave, level=grupo) if grupo else conteo
+            s = suma.xs(llave, level=grupo) if grupo else suma
+            brechas.setdefault(municipio, {})[periodo] = {
+                nombre: _fila_brecha(c, s, col)
+                for nombre, col in MATERIAS.items() if col in columnas
+            }
+    return brechas
+
+
+# BRECHA URBANO VS RURAL (T DE WELCH)
+# Con n, media y desviacion por zona el t de Welch es identico al de
+# stats.ttest_ind(..., equal_var=False) sobre los datos crudos.
+def _ttest_desde_estadisticas(est):
+    from scipy import stats
+    if not {"Urbano", "Rural"} <= set(est.index):
+        return None
+    u, r = est.loc["Urbano"], est.loc["Rural"]
+    if u["count"] < 2 or r["count"] < 2:
+        return None
+    t_stat, p_val = stats.ttest_ind_from_stats(
+        u["mean"], u["std"], u["count"], r["mean"], r["std"], r["count"], equal_var=False
+    )
+    return {
+        "brecha": _redondear(u["mean"] - r["mean"], 1),
+        "media_urbano": _redondear(u["mean"]),
+        "media_rural": _redondear(r["mean"]),
+        "n_urbano": int(u["count"]),
+        "n_rural": int(r["count"]),
+        "t": _redondear(t_stat, 4),
+        "p_valor": _redondear(p_val, 6),
+        "significativa": bool(p_val < 0.05),
+    }
+
+
+def agregados_ttest(estadisticas):
+    """`estadisticas` es la salida de `consultas.estadisticas_area` (cualquier backend)."""
+    tabla = estadisticas.rename(columns={"n": "count", "media": "mean", "desviacion": "std"})
+    tabla = tabla.set_index(["municipio", "Area"])[["count", "mean", "std"]]
+
+    resultado = {}
+    for municipio, est in tabla.groupby(level=0):
+        resultado[_clave_municipio(municipio)] = _ttest_desde_estadisticas(est.droplevel(0))
+    return resultado
+
+
+# PROBABILIDAD DE NIVEL B1/B+ SEGUN ACCESO A INTERNET
+# Sale de la tabla de contingencia de logica_p3 (con intervalo de Newcombe).
+def agregados_b1(tensor):
+    from Analysis.logica_p3 import diferencial_b1
+
+    resultado = {TODOS: diferencial_b1(tensor, TODOS)}
+    for municipio, porcion in tensor.groupby(level="cole_mcpio_ubicacion", observed=True):
+        resultado[_clave_municipio(municipio)] = diferencial_b1(porcion, TODOS)
+    return resultado
+
+
+# TODOS LOS AGREGADOS
+def calcular_agregados():
+    from Analysis import consultas
+    from Analysis.logica_p3 import cargar_datos_p3, construir_tensor_tic
+
+    # Brechas y t de Welch salen del backend configurado (pandas o DuckDB)
+    backend = consultas.backend()
+    brechas = agregados_brechas(backend.celdas_naturaleza())
+    return {
+        "brechas": brechas,
+        "urbano_rural": agregados_ttest(backend.estadisticas_area()),
+        "probabilidad_b1": agregados_b1(construir_tensor_tic(cargar_datos_p3())),
+        "municipios": sorted(m for m in brechas if m != TODOS),
+        "periodos": sorted(p for p in brechas.get(TODOS, {}) if p != TODOS),
+        "materias": MATERIAS,
+    }
@@ -0,0 +1,177 @@
+"""Intervalos bootstrap de las brechas para todos los municipios a la vez.
+
+Remuestrear estudiantes con reemplazo equivale a sacar, para cada grupo
+(municipio x lado de la brecha), un vector multinomial de conteos sobre
+sus valores distintos con probabilidades iguales a sus frecuencias. Los
+puntajes son enteros, así que cada grupo tiene a lo sumo unos cientos de
+valores distintos y cada réplica cuesta eso, no el número de
+estudiantes; las proporciones B1/B+ son el caso de dos valores. Las
+réplicas de un grupo salen de una sola llamada a `rng.multinomial(...,
+size=replicas)` y los grupos se reparten entre procesos.
+
+El resultado es exactamente el bootstrap no paramétrico por estudiante
+(percentil) de:
+
+- `urbano_rural`: media urbana - rural del puntaje global por municipio
+  (la brecha de `logica_p1.calcular_estadisticas_brecha`);
+- `publico_privado`: media privada - pública por municipio y materia (la
+  de `logica_p2.calcular_brechas`, todos los periodos);
+- `b1_internet`: diferencia en puntos porcentuales de la probabilidad de
+  B1/B+ con y sin internet (la de `logica_p3.diferencial_b1`).
+
+`intervalos_version` los calcula una vez por versión de los datos y los
+guarda en el caché de figuras. Las semillas salen de un `SeedSequence`
+por grupo, así que el resultado no depende del número de procesos.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Analysis import cache_figuras
+
+TODOS = "TODOS"
+REPLICAS = int(os.environ.get("SABER_BOOTSTRAP_REPLICAS", "2000"))
+CONFIANZA = 0.95
+SEMILLA = 20240
+
+
+# HISTOGRAMAS POR GRUPO
+
+def histogramas(df, columna, lado, municipio="cole_mcpio_ubicacion"):
+    """Conteos por (municipio, lado, valor) de `columna`, con TODOS sumando municipios."""
+    conteos = (df.dropna(subset=[columna, lado, municipio])
+               .groupby([municipio, lado, columna], observed=True).size())
+    conteos.index = conteos.index.set_names(["municipio", "lado", "valor"])
+    todos = conteos.groupby(level=["lado", "valor"], observed=True).sum()
+    todos = pd.concat({TODOS: todos}, names=["municipio"])
+    return pd.concat([conteos, todos])
+
+
+def _grupos(conteos, lado_a, lado_b):
+    """[(municipio, valores_a, conteos_a, valores_b, conteos_b)] con ambos lados."""
+    grupos = []
+    for municipio, porcion in conteos.groupby(level="municipio", observed=True, sort=True):
+        lados = porcion.droplevel("municipio")
+        if lado_a not in lados.index.get_level_values("lado") or lado_b not in lados.index.get_level_values("lado"):
+            continue
+        a, b = lados.xs(lado_a, level="lado"), lados.xs(lado_b, level="lado")
+        grupos.append((municipio,
+                       a.index.to_numpy(dtype=float), a.to_numpy(dtype=np.int64),
+                       b.index.to_numpy(dtype=float), b.to_numpy(dtype=np.int64)))
+    return grupos
+
+
+# MOTOR
+
+def _medias_replicas(valores, conteos, replicas, rng):
+    n = int(conteos.sum())
+    pesos = rng.multinomial(n, conteos / n, size=replicas)
+    return pesos @ valores / n
+
+
+def _remuestrear(tareas, replicas, confianza):
+    # Corre en un proceso del pool: [(clave, semilla, grupo)] -> filas
+    alfa = (1 - confianza) / 2
+    filas = []
+    for clave, semilla, (valores_a, conteos_a, valores_b, conteos_b) in tareas:
+        rng = np.random.default_rng(semilla)
+        diferencias = (_medias_replicas(valores_a, conteos_a, replicas, rng)
+                       - _medias_replicas(valores_b, conteos_b, replicas, rng))
+        estimacion = (valores_a @ conteos_a / conteos_a.sum()) - (valores_b @ conteos_b / conteos_b.sum())
+        inferior, superior = np.quantile(diferencias, [alfa, 1 - alfa])
+        filas.append({
+            **clave,
+            "estimacion": float(estimacion),
+            "ic_inferior": float(inferior),
+            "ic_superior": float(superior),
+            "ee": float(diferencias.std(ddof=1)),
+            "n_a": int(conteos_a.sum()),
+            "n_b": int(conteos_b.sum()),
+        })
+    return filas
+
+
+def bootstrap_diferencias(grupos, replicas=REPLICAS, confianza=CONFIANZA, semilla=SEMILLA, procesos=None):
+    """Intervalo percentil de la diferencia de medias a - b de cada grupo.
+
+    `grupos` es [(clave, valores_a, conteos_a, valores_b, conteos_b)] con
+    `clave` un dict que se copia en la fila del resultado.
+    """
+    if not grupos:
+        return pd.DataFrame()
+    semillas = np.random.SeedSequence(semilla).spawn(len(grupos))
+    tareas = [(clave, s, datos) for (clave, *datos), s in zip(grupos, semillas)]
+
+    procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+    if procesos == 1:
+        return pd.DataFrame(_remuestrear(tareas, replicas, confianza))
+    # Tareas intercaladas: los grupos grandes (TODOS, Medellín) no caen juntos
+    lotes = [tareas[i::procesos] for i in range(procesos)]
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        filas = [fila for lote in pool.map(_remuestrear, lotes, [replicas] * procesos, [confianza] * procesos)
+                 for fila in lote]
+    return pd.DataFrame(filas)
+
+
+# BRECHAS DE LOS TABLEROS
+
+def grupos_urbano_rural(df_p1):
+    conteos = histogramas(df_p1, "punt_global", "Area")
+    return [({"municipio": m}, *datos) for m, *datos in _grupos(conteos, "Urbano", "Rural")]
+
+
+def grupos_publico_privado(df_p2, materias):
+    grupos = []
+    for nombre, columna in materias.items():
+        if columna not in df_p2.columns:
+            continue
+        conteos = histogramas(df_p2, columna, "cole_naturaleza")
+        grupos += [({"municipio": m, "materia": nombre}, *datos)
+                   for m, *datos in _grupos(conteos, "Privado", "Público")]
+    return grupos
+
+
+def grupos_b1(tensor, niveles_b1):
+    # Del tensor de logica_p3: valor 1 si el nivel es B1/B+ (en %), 0 si no
+    internet = tensor.index.get_level_values("fami_tieneinternet")
+    valor = np.where(tensor.index.get_level_values("desemp_ingles").isin(niveles_b1), 100.0, 0.0)
+    marco = pd.DataFrame({
+        "cole_mcpio_ubicacion": tensor.index.get_level_values("cole_mcpio_ubicacion"),
+        "lado": internet, "valor": valor, "n": tensor.to_numpy(),
+    })
+    marco = marco[marco["lado"].isin(["Si", "No"])]
+    conteos = marco.groupby(["cole_mcpio_ubicacion", "lado", "valor"], observed=True)["n"].sum()
+    conteos.index = conteos.index.set_names(["municipio", "lado", "valor"])
+    todos = pd.concat({TODOS: conteos.groupby(level=["lado", "valor"]).sum()}, names=["municipio"])
+    conteos = pd.concat([conteos, todos])
+    return [({"municipio": m}, *datos) for m, *datos in _grupos(conteos[conteos > 0], "Si", "No")]
+
+
+def calcular_intervalos(df_p1, df_p2, tensor, replicas=REPLICAS, confianza=CONFIANZA,
+                        semilla=SEMILLA, procesos=None):
+    """Tablas de intervalos de las tres brechas para todos los municipios (y TODOS)."""
+    from Analysis.logica_p2 import MATERIAS
+    from Analysis.logica_p3 import NIVELES_B1
+
+    return {
+        nombre: bootstrap_diferencias(grupos, replicas, confianza, semilla, procesos)
+        for nombre, grupos in (
+            ("urbano_rural", grupos_urbano_rural(df_p1)),
+            ("publico_privado", grupos_publico_privado(df_p2, MATERIAS)),
+            ("b1_internet", grupos_b1(tensor, NIVELES_B1)),
+        )
+    }
+
+
+def intervalos_version(version, replicas=REPLICAS, procesos=None):
+    """Intervalos de la versión de datos `version` (de `registro_datos`), en caché."""
+    datos = version.datos
+    return cache_figuras.obtener(
+        "bootstrap", (replicas, CONFIANZA, SEMILLA),
+        lambda: calcular_intervalos(
+            datos["pregunta_1"]["df"], datos["pregunta_2"]["df"],
+            datos["pregunta_3"]["precalculos"]["tensor"], replicas, procesos=procesos),
+        version=version.id
+    )
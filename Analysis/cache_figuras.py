@@ -0,0 +1,172 @@
+"""Caché persistente de figuras y estadísticas de los tableros.
+
+Las salidas de los callbacks se guardan en disco (`diskcache`) bajo una
+clave `s<VERSION_SALIDAS>:<version>:<pagina>:<argumentos>`, donde la
+versión se deriva del tamaño y la fecha de modificación de los CSV de
+`Data/`. Al refrescar los datos cambia la versión y las entradas viejas
+simplemente dejan de usarse (`limpiar_versiones_viejas` las borra). El
+directorio sobrevive a los despliegues, así que `VERSION_SALIDAS` se sube
+cada vez que cambia lo que guarda un constructor (figuras, textos o claves
+de los dicts) para no servir salidas del código anterior. En la app la
+versión la fija el registro de datos (`Analysis/registro_datos.py`) al
+activar cada carga.
+
+El directorio es compartido por todos los workers de Gunicorn y por los
+procesos de callbacks en segundo plano; `Analysis/precalentar_cache.py`
+lo llena para todos los municipios antes de recibir usuarios. Con
+`SABER_MODO_ESTATICO=1` se consulta antes el export de `Analysis/estatico.py`.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import diskcache
+
+from Analysis.memo import InfoCache
+from Analysis.precision import recortar_salida
+
+DIRECTORIO_FIGURAS = os.environ.get("SABER_CACHE_FIGURAS", os.path.join(".cache", "figuras"))
+MODO_ESTATICO = os.environ.get("SABER_MODO_ESTATICO") == "1"
+
+ARCHIVOS_DATOS = (
+    os.path.join("Data", "saber11_Antioquia_clean.csv"),
+    os.path.join("Data", "municipios_unicos.csv"),
+    os.path.join("Data", "PIB_municipios.csv"),
+    # Al construir los límites los mapas pasan a ser coropléticos
+    os.path.join("Data", "geometrias", "indice.json"),
+)
+
+# Subir al cambiar el contenido de cualquier salida guardada en el caché
+VERSION_SALIDAS = 1
+
+# Tope del caché en disco; diskcache desaloja por LRU al superarlo
+LIMITE_BYTES = 2 * 1024 ** 3
+
+_FALTA = object()
+
+
+def huella_archivos(archivos=ARCHIVOS_DATOS):
+    """Huella actual (tamaño y fecha) de los archivos de datos."""
+    huella = hashlib.sha1()
+    for ruta in archivos:
+        try:
+            info = os.stat(ruta)
+            huella.update(f"{ruta}:{info.st_size}:{info.st_mtime_ns};".encode())
+        except FileNotFoundError:
+            huella.update(f"{ruta}:-;".encode())
+    return huella.hexdigest()[:12]
+
+
+def fecha_archivos(archivos=ARCHIVOS_DATOS):
+    """Fecha de modificación más reciente de los archivos de datos (epoch)."""
+    fechas = [os.stat(ruta).st_mtime for ruta in archivos if os.path.exists(ruta)]
+    return max(fechas) if fechas else 0.0
+
+
+# Versión activa fijada por el registro de datos: (huella, fecha) o None
+_version_fijada = None
+
+
+def fijar_version(version, fecha):
+    """Usa `version` en las claves desde ahora (la llama el registro al cambiar de datos)."""
+    global _version_fijada
+    _version_fijada = (version, fecha)
+
+
+@lru_cache(maxsize=None)
+def _version_inicial():
+    return huella_archivos(), fecha_archivos()
+
+
+def version_datos():
+    """Versión de los datos en uso: la fijada por el registro o, fuera de la
+    app, la huella de los archivos al arrancar el proceso.
+    """
+    return (_version_fijada or _version_inicial())[0]
+
+
+def fecha_datos():
+    return (_version_fijada or _version_inicial())[1]
+
+
+@lru_cache(maxsize=None)
+def _cache(directorio=DIRECTORIO_FIGURAS):
+    cache = diskcache.Cache(directorio, size_limit=LIMITE_BYTES)
+    # Las estadísticas de aciertos quedan en disco y las comparten los procesos
+    cache.stats(enable=True)
+    return cache
+
+
+def _normalizar(valor):
+    # Enteros y flotantes de numpy (periodos, por ejemplo) como tipos de Python
+    if hasattr(valor, "item"):
+        return valor.item()
+    raise TypeError(f"No se puede usar {type(valor).__name__} en una clave de caché")
+
+
+def clave(pagina, args, version=None):
+    version = version or version_datos()
+    argumentos = json.dumps(list(args), default=_normalizar, ensure_ascii=False)
+    return f"s{VERSION_SALIDAS}:{version}:{pagina}:{argumentos}"
+
+
+def leer(pagina, args, version=None):
+    """Retorna la salida guardada o None si no está en el caché."""
+    valor = _cache().get(clave(pagina, args, version), default=_FALTA)
+    return None if valor is _FALTA else valor
+
+
+def guardar(pagina, args, valor, version=None):
+    """Guarda la salida con la precisión de las figuras ya recortada y la retorna."""
+    valor = recortar_salida(valor)
+    _cache().set(clave(pagina, args, version), valor)
+    return valor
+
+
+def obtener(pagina, args, calcular, version=None):
+    """Lee la salida de `pagina` con `args`; si no existe la calcula y la guarda.
+
+    `version` fija la versión de los datos de la clave; los callbacks pasan la
+    que tomaron al empezar, así una recarga a mitad de cálculo no guarda
+    resultados viejos bajo la versión nueva. El export estático es solo del
+    departamento por defecto: con la versión de otro (ver
+    `Analysis/departamentos.py`) no se consulta.
+    """
+    if MODO_ESTATICO and version in (None, version_datos()):
+        from Analysis import estatico
+        valor = estatico.leer(pagina, args)
+        if valor is not None:
+            return valor
+    valor = _cache().get(clave(pagina, args, version), default=_FALTA)
+    if valor is _FALTA:
+        valor = guardar(pagina, args, calcular(), version)
+    return valor
+
+
+def cache_info():
+    """Aciertos y fallos acumulados (todos los procesos) y entradas actuales."""
+    cache = _cache()
+    hits, misses = cache.stats()
+    return InfoCache(hits, misses, None, len(cache))
+
+
+def resumen_cache():
+    cache = _cache()
+    return {
+        "directorio": cache.directory,
+        "entradas": len(cache),
+        "megabytes": cache.volume() / 1024 ** 2,
+        "version": version_datos(),
+    }
+
+
+def limpiar_versiones_viejas():
+    """Borra las entradas de versiones de datos o de salidas distintas a las actuales."""
+    cache = _cache()
+    prefijo = f"s{VERSION_SALIDAS}:{version_datos()}:"
+    borradas = 0
+    for llave in list(cache.iterkeys()):
+        if isinstance(llave, str) and not llave.startswith(prefijo):
+            borradas += cache.delete(llave)
+    return borradas
@@ -0,0 +1,227 @@
+"""Índice de colegios para bajar de municipio a colegio sin recorrer filas.
+
+`IndiceColegios(df)` ordena una vez las filas por código DANE del
+establecimiento y guarda, por colegio, su rango de filas en ese orden
+(`filas`), nombre, municipio y naturaleza, y celdas de conteo, suma y suma
+de cuadrados de cada puntaje por colegio x `por` (zona en /pregunta_1,
+naturaleza en /pregunta_2). Las estadísticas de un colegio y las de su
+municipio (`estadisticas`) son búsquedas en esas celdas, no filtros sobre
+el DataFrame.
+
+La búsqueda del dropdown (`buscar`) corre en el servidor y devuelve solo
+`LIMITE` opciones. Los nombres se pliegan (sin tildes, en mayúsculas, solo
+letras y números) y se indexan de dos formas:
+
+- prefijos de palabra: lista ordenada de (palabra, colegio); cada palabra
+  de la consulta es un rango por bisección y el colegio debe tener todas
+  ("INST SAN JO" encuentra "INSTITUCION EDUCATIVA SAN JOSE");
+- trigramas del nombre completo, para subcadenas a mitad de palabra
+  ("BOLIVAR" en "SIMONBOLIVAR"): se intersecan las listas de los trigramas
+  de la consulta y se verifica la subcadena.
+
+Una consulta solo con dígitos busca por prefijo del código DANE.
+"""
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from Analysis.series_tiempo import COLUMNAS_PUNTAJE
+
+COLUMNA_CODIGO = "cole_cod_dane_establecimiento"
+COLUMNA_NOMBRE = "cole_nombre_establecimiento"
+COLUMNA_MUNICIPIO = "cole_mcpio_ubicacion"
+COLUMNA_NATURALEZA = "cole_naturaleza"
+LIMITE = 20
+# Mayor que cualquier carácter de un texto plegado: [p, p + FIN_PREFIJO) son los que empiezan por p
+FIN_PREFIJO = "\uffff"
+TODOS = ("TODOS", "Todos", None)
+
+
+def plegar(texto):
+    """Texto en mayúsculas, sin tildes y con solo letras y números separados por un espacio."""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.findall(r"[A-Z0-9]+", texto.upper()))
+
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _resumir(celdas, columna):
+    # n, media y desviación estándar muestral a partir de conteo, suma y suma de cuadrados
+    n = celdas[f"n_{columna}"]
+    media = celdas[f"suma_{columna}"] / n.where(n > 0)
+    varianza = (celdas[f"suma2_{columna}"] - n * media ** 2) / (n - 1).where(n > 1)
+    return pd.DataFrame({"n": n, "media": media, "de": np.sqrt(varianza.clip(lower=0))})
+
+
+class IndiceColegios:
+    """Rangos de filas, celdas por `por` y búsqueda por nombre o código de los colegios."""
+
+    def __init__(self, df, por="Area"):
+        codigos_fila = df[COLUMNA_CODIGO].astype("string").str.strip()
+        posiciones = np.flatnonzero((codigos_fila.notna() & codigos_fila.ne("")).to_numpy())
+        codigos_validos = codigos_fila.to_numpy(dtype=object)[posiciones].astype(str)
+
+        # Filas ordenadas por código: cada colegio es un rango contiguo
+        orden = np.argsort(codigos_validos, kind="stable")
+        self.orden = posiciones[orden]
+        self.codigos, inicios = np.unique(codigos_validos[orden], return_index=True)
+        fines = np.append(inicios[1:], len(orden))
+        self.rangos = {c: (int(i), int(f)) for c, i, f in zip(self.codigos, inicios, fines)}
+
+        columnas = [c for c in (COLUMNA_NOMBRE, COLUMNA_MUNICIPIO, COLUMNA_NATURALEZA) if c in df.columns]
+        self.colegios = df.iloc[self.orden][columnas].groupby(codigos_validos[orden], sort=True).first()
+        self.colegios["n"] = fines - inicios
+        if COLUMNA_NOMBRE not in self.colegios:
+            self.colegios[COLUMNA_NOMBRE] = self.colegios.index
+
+        # Celdas de conteo, suma y suma de cuadrados por colegio x `por`
+        self.por = por
+        self.columnas = [c for c in COLUMNAS_PUNTAJE if c in df.columns]
+        marco = pd.DataFrame({
+            "codigo": codigos_validos,
+            por: df[por].to_numpy()[posiciones] if por in df.columns else "Total",
+        })
+        for columna in self.columnas:
+            valores = df[columna].to_numpy(dtype=float)[posiciones]
+            validos = ~np.isnan(valores)
+            marco[f"n_{columna}"] = validos.astype(np.int64)
+            marco[f"suma_{columna}"] = np.where(validos, valores, 0.0)
+            marco[f"suma2_{columna}"] = np.where(validos, valores, 0.0) ** 2
+        self.celdas = marco.groupby(["codigo", por], observed=True, dropna=False).sum().sort_index()
+        municipio = self.colegios[COLUMNA_MUNICIPIO].reindex(self.celdas.index.get_level_values("codigo"))
+        self.celdas_municipio = (self.celdas.set_axis(
+            pd.MultiIndex.from_arrays([municipio.to_numpy(), self.celdas.index.get_level_values(por)],
+                                      names=["municipio", por]))
+            .groupby(level=["municipio", por], observed=True, dropna=False).sum().sort_index())
+
+        self._construir_busqueda()
+
+    # BUSQUEDA
+
+    def _construir_busqueda(self):
+        self._lista_codigos = self.codigos.tolist()
+        self._nombres = [plegar(n) for n in self.colegios[COLUMNA_NOMBRE]]
+        self._municipios = self.colegios[COLUMNA_MUNICIPIO].to_numpy(dtype=object)
+        pares = sorted((palabra, i) for i, nombre in enumerate(self._nombres) for palabra in set(nombre.split()))
+        self._palabras = [p for p, _ in pares]
+        self._ids_palabras = np.array([i for _, i in pares], dtype=np.int64)
+        postings = {}
+        for i, nombre in enumerate(self._nombres):
+            for trigrama in _trigramas(nombre):
+                postings.setdefault(trigrama, []).append(i)
+        self._trigramas = {t: np.array(ids, dtype=np.int64) for t, ids in postings.items()}
+
+    def _por_prefijos(self, palabras):
+        candidatos = None
+        for palabra in palabras:
+            inicio = bisect.bisect_left(self._palabras, palabra)
+            fin = bisect.bisect_left(self._palabras, palabra + FIN_PREFIJO)
+            ids = set(self._ids_palabras[inicio:fin].tolist())
+            candidatos = ids if candidatos is None else candidatos & ids
+            if not candidatos:
+                break
+        return candidatos or set()
+
+    def _por_subcadena(self, consulta):
+        listas = [self._trigramas.get(t) for t in _trigramas(consulta)]
+        if not listas or any(l is None for l in listas):
+            return set()
+        # De la lista más corta a la más larga: las intersecciones se achican pronto
+        listas.sort(key=len)
+        ids = listas[0]
+        for lista in listas[1:]:
+            ids = np.intersect1d(ids, lista, assume_unique=True)
+        return {int(i) for i in ids if consulta in self._nombres[i]}
+
+    def buscar(self, consulta, municipio=None, limite=LIMITE):
+        """[{codigo, nombre, municipio, n}] de hasta `limite` colegios que coinciden con
+        `consulta` (del municipio si se da); sin consulta, los más grandes del municipio.
+        """
+        consulta = plegar(consulta or "")
+        if municipio in TODOS:
+            municipio = None
+        if not consulta:
+            if municipio is None:
+                return []
+            ids = np.flatnonzero(self._municipios == municipio)
+            ids = ids[np.argsort(-self.colegios["n"].to_numpy()[ids], kind="stable")][:limite]
+            return [self._opcion(i) for i in ids]
+
+        if consulta.isdigit():
+            inicio = bisect.bisect_left(self._lista_codigos, consulta)
+            fin = bisect.bisect_left(self._lista_codigos, consulta + FIN_PREFIJO)
+            ids = set(range(inicio, fin))
+        else:
+            ids = self._por_prefijos(consulta.split())
+            if len(ids) < limite and len(consulta) >= 3:
+                ids |= self._por_subcadena(consulta)
+        if municipio is not None:
+            ids = {i for i in ids if self._municipios[i] == municipio}
+        # Primero los que empiezan por la consulta, luego en orden alfabético
+        orden = sorted(ids, key=lambda i: (not self._nombres[i].startswith(consulta), self._nombres[i]))
+        return [self._opcion(i) for i in orden[:limite]]
+
+    def _opcion(self, i):
+        fila = self.colegios.iloc[int(i)]
+        return {"codigo": self.colegios.index[int(i)], "nombre": fila[COLUMNA_NOMBRE],
+                "municipio": fila[COLUMNA_MUNICIPIO], "n": int(fila["n"])}
+
+    def opcion(self, codigo):
+        """La opción de `codigo` (para conservar la seleccionada en el dropdown) o None."""
+        if codigo not in self.rangos:
+            return None
+        return self._opcion(self.colegios.index.get_loc(codigo))
+
+    # ESTADISTICAS
+
+    def __contains__(self, codigo):
+        return codigo in self.rangos
+
+    def filas(self, df, codigo):
+        """Filas de `df` (el mismo con que se construyó el índice) del colegio."""
+        inicio, fin = self.rangos[codigo]
+        return df.iloc[self.orden[inicio:fin]]
+
+    def estadisticas(self, codigo, columnas=None):
+        """Por columna y valor de `por` (más "Total"): n, media y desviación del
+        colegio y media de su municipio en el mismo grupo.
+        """
+        municipio = self.colegios.at[codigo, COLUMNA_MUNICIPIO]
+        propias = self.celdas.xs(codigo, level="codigo")
+        del_municipio = self.celdas_municipio.xs(municipio, level="municipio")
+        propias = pd.concat([propias, propias.sum().to_frame("Total").T])
+        del_municipio = pd.concat([del_municipio, del_municipio.sum().to_frame("Total").T])
+
+        tablas = []
+        for columna in columnas or self.columnas:
+            tabla = _resumir(propias, columna)
+            tabla["media_municipio"] = _resumir(del_municipio, columna)["media"].reindex(tabla.index)
+            tabla = tabla[tabla["n"] > 0].rename_axis(self.por).reset_index()
+            tabla.insert(0, "columna", columna)
+            tablas.append(tabla)
+        return pd.concat(tablas, ignore_index=True) if tablas else pd.DataFrame()
+
+
+def construir_indice(df, por="Area"):
+    """Índice de colegios de `df`, o None si el dataset no trae el código del colegio."""
+    if COLUMNA_CODIGO not in df.columns or COLUMNA_MUNICIPIO not in df.columns:
+        return None
+    return IndiceColegios(df, por)
+
+
+def opciones_dropdown(indice, busqueda, seleccionado=None, municipio=None, limite=LIMITE):
+    """Opciones de un `dcc.Dropdown` para `busqueda`, conservando la seleccionada."""
+    if indice is None:
+        return []
+    encontrados = indice.buscar(busqueda, municipio, limite)
+    actual = indice.opcion(seleccionado) if seleccionado else None
+    if actual is not None and all(c["codigo"] != seleccionado for c in encontrados):
+        encontrados = [actual] + encontrados
+    return [{"label": f"{c['nombre']} ({c['municipio']}, {c['n']} est.)", "value": c["codigo"]}
+            for c in encontrados]
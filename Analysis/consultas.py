@@ -0,0 +1,312 @@
+"""Fachada de consultas agregadas con backend pandas o DuckDB.
+
+Las agregaciones que usan los tableros y la API (medias y desviaciones por
+municipio y zona, brechas por naturaleza y materia, desglose por estrato,
+cruce Acceso TIC x desempeño en inglés y series anuales) se exponen aquí
+con el mismo resultado en los dos backends:
+
+- `pandas` (por defecto): agrupa sobre el DataFrame en memoria.
+- `duckdb`: ejecuta SQL sobre el Parquet limpio (`data_clean.run` lo
+  escribe junto al CSV) en una base DuckDB embebida, con varios hilos y
+  derrame a disco cuando no cabe en memoria. Sirve para escalar a datos
+  nacionales sin cargar todas las filas en RAM.
+
+Se elige con `SABER_BACKEND=pandas|duckdb`. `Benchmarks/equivalencia_backends.py`
+compara ambos sobre datos sintéticos.
+"""
+import os
+import threading
+from functools import lru_cache
+
+import pandas as pd
+
+from Analysis.data_clean import CLEAN_PATH, PARQUET_PATH
+from Analysis.logica_p2 import MAPEO_ESTRATO, MATERIAS, normalizar_estrato
+
+BACKEND = os.environ.get("SABER_BACKEND", "pandas")
+
+# Límites de DuckDB; lo que no quepa en memoria se derrama a DIRECTORIO_TEMPORAL
+MEMORIA_DUCKDB = os.environ.get("SABER_DUCKDB_MEMORIA", "2GB")
+HILOS_DUCKDB = int(os.environ.get("SABER_DUCKDB_HILOS", os.cpu_count() or 1))
+DIRECTORIO_TEMPORAL = os.path.join(".cache", "duckdb")
+
+TODOS = "TODOS"
+COLUMNAS_PUNTAJE = tuple(MATERIAS.values())
+AGRUPACIONES_SERIE = ("acceso_tic", "naturaleza", None)
+VALORES_SIN_INFORMACION = ("SIN INFORMACIÓN", "SIN INFORMACION", "NAN")
+
+
+def _validar_columna(columna):
+    # Las columnas se interpolan en SQL: solo se aceptan las de MATERIAS
+    if columna not in COLUMNAS_PUNTAJE:
+        raise ValueError(f"Columna de puntaje desconocida: {columna}")
+    return columna
+
+
+# BACKEND PANDAS
+
+def _leer_marco(ruta_parquet, ruta_csv):
+    if os.path.exists(ruta_parquet):
+        return pd.read_parquet(ruta_parquet)
+    return pd.read_csv(ruta_csv, dtype={"cole_cod_mcpio_ubicacion": str})
+
+
+def _col_area(columnas):
+    return "estu_areareside" if "estu_areareside" in columnas else "cole_area_ubicacion"
+
+
+def preparar_marco(df):
+    """Columnas derivadas comunes (mismas reglas que los cargadores de logica_*)."""
+    internet = df["fami_tieneinternet"] == "Si"
+    computador = df["fami_tienecomputador"] == "Si"
+    area = df[_col_area(df.columns)].astype(str).str.upper()
+    return df.assign(
+        municipio=df["cole_mcpio_ubicacion"].str.upper().str.strip(),
+        naturaleza=df["cole_naturaleza"].replace({"OFICIAL": "Público", "NO OFICIAL": "Privado"}),
+        anio=pd.to_numeric(df["periodo"].astype(str).str[:4], errors="coerce").astype("Int64"),
+        acceso_tic=pd.Series("Sin Acceso TIC", index=df.index)
+            .mask(computador, "Solo Computador")
+            .mask(internet, "Solo Internet")
+            .mask(internet & computador, "Internet y Computador"),
+        Area=area.str.contains("CABECERA|URBAN").map({True: "Urbano", False: "Rural"}),
+        area_valida=~area.isin(VALORES_SIN_INFORMACION),
+        estrato=normalizar_estrato(df["fami_estratovivienda"]) if "fami_estratovivienda" in df.columns else None,
+    )
+
+
+@lru_cache(maxsize=1)
+def _marco(ruta_parquet=PARQUET_PATH, ruta_csv=CLEAN_PATH):
+    return preparar_marco(_leer_marco(ruta_parquet, ruta_csv))
+
+
+def _filtrar(df, municipio=None, periodos=None):
+    mascara = pd.Series(True, index=df.index)
+    if municipio and municipio != TODOS:
+        mascara &= df["municipio"] == municipio.upper().strip()
+    if periodos:
+        mascara &= df["periodo"].isin(list(periodos))
+    return df[mascara]
+
+
+def _estrato_valido(df):
+    if "fami_estratovivienda" not in df.columns:
+        return pd.Series(True, index=df.index)
+    estrato = df["fami_estratovivienda"]
+    return estrato.notna() & ~estrato.astype(str).str.upper().isin(VALORES_SIN_INFORMACION[:2])
+
+
+class _Pandas:
+    def __init__(self, df=None):
+        self._df = df
+
+    @property
+    def df(self):
+        return self._df if self._df is not None else _marco()
+
+    def estadisticas_area(self):
+        df = self.df
+        df = df[df["area_valida"] & _estrato_valido(df) & df["punt_global"].notna()]
+        por_municipio = df.groupby(["municipio", "Area"], observed=True)["punt_global"].agg(["count", "mean", "std"])
+        total = df.groupby("Area", observed=True)["punt_global"].agg(["count", "mean", "std"])
+        total.index = pd.MultiIndex.from_product([[TODOS], total.index], names=["municipio", "Area"])
+        resultado = pd.concat([por_municipio, total]).reset_index()
+        return resultado.rename(columns={"count": "n", "mean": "media", "std": "desviacion"})
+
+    def celdas_naturaleza(self, columnas=COLUMNAS_PUNTAJE):
+        columnas = [_validar_columna(c) for c in columnas]
+        grupos = self.df.groupby(["municipio", "periodo", "naturaleza"], observed=True, dropna=False)[columnas]
+        conteos = grupos.count().add_prefix("n_")
+        sumas = grupos.sum(min_count=1).fillna(0.0).add_prefix("suma_")
+        return pd.concat([conteos, sumas], axis=1).reset_index()
+
+    def medias_estrato(self, columna, municipio=None, periodos=None):
+        columna = _validar_columna(columna)
+        df = _filtrar(self.df, municipio, periodos)
+        df = df[df["estrato"].notna() & df[columna].notna()]
+        resultado = df.groupby(["estrato", "naturaleza"], observed=True)[columna].agg(["count", "mean"]).reset_index()
+        return resultado.rename(columns={"count": "n", "mean": "media"})
+
+    def tabla_tic_ingles(self, municipio=None):
+        df = _filtrar(self.df, municipio)
+        df = df[df["desemp_ingles"].notna()]
+        return df.groupby(["acceso_tic", "desemp_ingles"], observed=True).size().rename("n").reset_index()
+
+    def serie_anual(self, columna, por="acceso_tic", municipio=None):
+        columna = _validar_columna(columna)
+        if por not in AGRUPACIONES_SERIE:
+            raise ValueError(f"Agrupación de serie desconocida: {por}")
+        df = _filtrar(self.df, municipio)
+        df = df[df["anio"].notna() & df[columna].notna()]
+        claves = ["anio"] + ([por] if por else [])
+        resultado = df.groupby(claves, observed=True)[columna].agg(["count", "mean"]).reset_index()
+        resultado["anio"] = resultado["anio"].astype(int)
+        return resultado.rename(columns={"count": "n", "mean": "media"})
+
+
+# BACKEND DUCKDB
+
+def _literal(texto):
+    return "'" + str(texto).replace("'", "''") + "'"
+
+
+def _sql_estrato(columna):
+    casos = " ".join(f"WHEN {_literal(k)} THEN {_literal(v)}" for k, v in MAPEO_ESTRATO.items())
+    return f"CASE trim(CAST({columna} AS VARCHAR)) {casos} ELSE NULL END"
+
+
+def _sql_vista(ruta, columnas):
+    col_area = _col_area(columnas)
+    area = f"upper(CAST({col_area} AS VARCHAR))"
+    sin_informacion = ", ".join(_literal(v) for v in VALORES_SIN_INFORMACION)
+    if "fami_estratovivienda" in columnas:
+        estrato = _sql_estrato("fami_estratovivienda")
+        estrato_valido = (
+            "fami_estratovivienda IS NOT NULL AND upper(CAST(fami_estratovivienda AS VARCHAR)) "
+            f"NOT IN ({_literal(VALORES_SIN_INFORMACION[0])}, {_literal(VALORES_SIN_INFORMACION[1])})"
+        )
+    else:
+        estrato, estrato_valido = "NULL", "TRUE"
+    return f"""
+        CREATE OR REPLACE VIEW saber AS
+        SELECT *,
+            upper(trim(cole_mcpio_ubicacion)) AS municipio,
+            CASE cole_naturaleza WHEN 'OFICIAL' THEN 'Público' WHEN 'NO OFICIAL' THEN 'Privado'
+                 ELSE cole_naturaleza END AS naturaleza,
+            TRY_CAST(substr(CAST(periodo AS VARCHAR), 1, 4) AS INTEGER) AS anio,
+            CASE WHEN fami_tieneinternet = 'Si' AND fami_tienecomputador = 'Si' THEN 'Internet y Computador'
+                 WHEN fami_tieneinternet = 'Si' THEN 'Solo Internet'
+                 WHEN fami_tienecomputador = 'Si' THEN 'Solo Computador'
+                 ELSE 'Sin Acceso TIC' END AS acceso_tic,
+            CASE WHEN {area} LIKE '%CABECERA%' OR {area} LIKE '%URBAN%' THEN 'Urbano' ELSE 'Rural' END AS "Area",
+            ({col_area} IS NOT NULL AND {area} NOT IN ({sin_informacion})) AS area_valida,
+            {estrato} AS estrato,
+            ({estrato_valido}) AS estrato_valido
+        FROM read_parquet({_literal(ruta)})
+    """
+
+
+class _DuckDB:
+    def __init__(self, ruta=PARQUET_PATH):
+        import duckdb
+
+        os.makedirs(DIRECTORIO_TEMPORAL, exist_ok=True)
+        self._con = duckdb.connect(config={
+            "threads": HILOS_DUCKDB,
+            "memory_limit": MEMORIA_DUCKDB,
+            "temp_directory": DIRECTORIO_TEMPORAL,
+        })
+        columnas = [fila[0] for fila in self._con.execute(
+            f"DESCRIBE SELECT * FROM read_parquet({_literal(ruta)})").fetchall()]
+        self._con.execute(_sql_vista(ruta, columnas))
+
+    def _consultar(self, sql, parametros=()):
+        # Un cursor por consulta: la conexión se comparte entre hilos
+        cursor = self._con.cursor()
+        try:
+            return cursor.execute(sql, list(parametros)).df()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _filtros(municipio=None, periodos=None):
+        condiciones, parametros = [], []
+        if municipio and municipio != TODOS:
+            condiciones.append("municipio = ?")
+            parametros.append(municipio.upper().strip())
+        if periodos:
+            condiciones.append(f"periodo IN ({', '.join('?' for _ in periodos)})")
+            parametros.extend(int(p) for p in periodos)
+        return condiciones, parametros
+
+    def estadisticas_area(self):
+        return self._consultar("""
+            SELECT CASE WHEN GROUPING(municipio) = 1 THEN 'TODOS' ELSE municipio END AS municipio,
+                   "Area", count(punt_global) AS n, avg(punt_global) AS media,
+                   stddev_samp(punt_global) AS desviacion
+            FROM saber
+            WHERE area_valida AND estrato_valido AND punt_global IS NOT NULL
+            GROUP BY GROUPING SETS ((municipio, "Area"), ("Area"))
+            HAVING GROUPING(municipio) = 1 OR municipio IS NOT NULL
+        """)
+
+    def celdas_naturaleza(self, columnas=COLUMNAS_PUNTAJE):
+        columnas = [_validar_columna(c) for c in columnas]
+        agregados = ", ".join(
+            [f"count({c}) AS n_{c}" for c in columnas]
+            + [f"COALESCE(sum({c}), 0.0) AS suma_{c}" for c in columnas]
+        )
+        return self._consultar(f"""
+            SELECT municipio, periodo, naturaleza, {agregados}
+            FROM saber GROUP BY municipio, periodo, naturaleza
+        """)
+
+    def medias_estrato(self, columna, municipio=None, periodos=None):
+        columna = _validar_columna(columna)
+        condiciones, parametros = self._filtros(municipio, periodos)
+        condiciones += ["estrato IS NOT NULL", f"{columna} IS NOT NULL"]
+        return self._consultar(f"""
+            SELECT estrato, naturaleza, count({columna}) AS n, avg({columna}) AS media
+            FROM saber WHERE {' AND '.join(condiciones)}
+            GROUP BY estrato, naturaleza
+        """, parametros)
+
+    def tabla_tic_ingles(self, municipio=None):
+        condiciones, parametros = self._filtros(municipio)
+        condiciones.append("desemp_ingles IS NOT NULL")
+        return self._consultar(f"""
+            SELECT acceso_tic, desemp_ingles, count(*) AS n
+            FROM saber WHERE {' AND '.join(condiciones)}
+            GROUP BY acceso_tic, desemp_ingles
+        """, parametros)
+
+    def serie_anual(self, columna, por="acceso_tic", municipio=None):
+        columna = _validar_columna(columna)
+        if por not in AGRUPACIONES_SERIE:
+            raise ValueError(f"Agrupación de serie desconocida: {por}")
+        condiciones, parametros = self._filtros(municipio)
+        condiciones += ["anio IS NOT NULL", f"{columna} IS NOT NULL"]
+        claves = "anio" + (f", {por}" if por else "")
+        return self._consultar(f"""
+            SELECT {claves}, count({columna}) AS n, avg({columna}) AS media
+            FROM saber WHERE {' AND '.join(condiciones)}
+            GROUP BY {claves}
+        """, parametros)
+
+
+# SELECCION DE BACKEND
+
+_lock = threading.Lock()
+_instancias = {}
+
+
+def backend(nombre=None):
+    """Instancia (única por proceso) del backend indicado o el de `SABER_BACKEND`."""
+    nombre = nombre or BACKEND
+    with _lock:
+        if nombre not in _instancias:
+            if nombre == "pandas":
+                _instancias[nombre] = _Pandas()
+            elif nombre == "duckdb":
+                _instancias[nombre] = _DuckDB()
+            else:
+                raise ValueError(f"Backend desconocido: {nombre}")
+        return _instancias[nombre]
+
+
+def marco():
+    """DataFrame con las columnas derivadas (el del backend pandas), para otros precálculos."""
+    return _marco()
+
+
+def limpiar():
+    """Olvida el DataFrame del backend pandas (se relee en la siguiente consulta)."""
+    _marco.cache_clear()
+
+
+def crear_backend(nombre, ruta_parquet):
+    """Backend sobre un Parquet específico (equivalencia y benchmarks)."""
+    if nombre == "pandas":
+        return _Pandas(preparar_marco(pd.read_parquet(ruta_parquet)))
+    if nombre == "duckdb":
+        return _DuckDB(ruta_parquet)
+    raise ValueError(f"Backend desconocido: {nombre}")
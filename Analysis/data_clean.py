@@ -4,6 +4,8 @@ import pandas as pd
 
 RAW_PATH   = os.path.join("Data", "saber11_Antioquia_raw.csv")
 CLEAN_PATH = os.path.join("Data", "saber11_Antioquia_clean.csv")
+# Misma base en columnar, para el backend DuckDB de Analysis/consultas.py
+PARQUET_PATH = os.path.join("Data", "saber11_Antioquia_clean.parquet")
 
 # Separar por rangos lógicos correctos
 SCORE_COLS_100 = [
@@ -40,7 +42,8 @@ def clean_text(df: pd.DataFrame) -> pd.DataFrame:
             
     return df
 
-def run(in_path: str = RAW_PATH, out_path: str = CLEAN_PATH) -> pd.DataFrame:
+def run(in_path: str = RAW_PATH, out_path: str = CLEAN_PATH,
+        parquet_path: str = PARQUET_PATH) -> pd.DataFrame:
     print("Iniciando proceso de limpieza...")
     df = pd.read_csv(in_path)
     print(f"[load] {df.shape[0]:,} filas × {df.shape[1]} columnas cargadas.")
@@ -87,8 +90,18 @@ def run(in_path: str = RAW_PATH, out_path: str = CLEAN_PATH) -> pd.DataFrame:
 
     # 7) Guardar
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-    df.to_csv(out_path, index=False)
+    # Escritura atómica: la app vigila este archivo y no debe verlo a medias
+    temporal = out_path + ".tmp"
+    df.to_csv(temporal, index=False)
+    os.replace(temporal, out_path)
     print(f"[save] Guardado exitosamente en: {out_path}")
+    if parquet_path:
+        try:
+            df.to_parquet(parquet_path + ".tmp", index=False)
+            os.replace(parquet_path + ".tmp", parquet_path)
+            print(f"[save] Copia Parquet en: {parquet_path}")
+        except ImportError:
+            print("[save] pyarrow no está instalado: se omite la copia Parquet.")
     print(f"[done] Base final: {df.shape[0]:,} filas × {df.shape[1]} columnas.")
 
     return df
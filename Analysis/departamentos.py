@@ -0,0 +1,295 @@
+"""Datos particionados por departamento, cargados a demanda con tope de memoria.
+
+El departamento por defecto (Antioquia) sigue en las rutas de siempre y lo
+maneja `registro_datos` (con recarga en caliente). Cualquier otro vive en
+`Data/departamentos/<Departamento>/` con los mismos archivos:
+
+    saber11_clean.csv       dataset limpio (o saber11_clean.parquet)
+    municipios_unicos.csv   coordenadas por municipio
+    PIB_municipios.csv      PIB por municipio (opcional)
+
+Las páginas piden `datos(departamento, pagina)`: la primera vez se corre
+el cargador que la página registró en `registro_datos` con las rutas del
+departamento y el resultado queda en memoria con un id de versión propio
+(`<departamento>-<huella de sus archivos>`), que también separa sus
+entradas en el caché de figuras. Los departamentos se desalojan del menos
+al más recientemente usado cuando la memoria estimada de los cargados
+supera `SABER_MEMORIA_DEPARTAMENTOS_MB` (el de por defecto no cuenta: está
+siempre cargado).
+
+Las vistas nacionales no leen filas: `python -m Analysis.departamentos
+--agregar` escribe por departamento las celdas de `series_tiempo`
+(conteo y suma por periodo, municipio, TIC, naturaleza y zona) en
+`Data/agregados/<departamento>.parquet`, y `serie_nacional` suma esas
+celdas.
+"""
+import argparse
+import gc
+import hashlib
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from Analysis import registro_datos
+
+DEPARTAMENTO_DEFECTO = "Antioquia"
+DIRECTORIO_DEPARTAMENTOS = os.path.join("Data", "departamentos")
+DIRECTORIO_AGREGADOS = os.path.join("Data", "agregados")
+PRESUPUESTO_BYTES = int(float(os.environ.get("SABER_MEMORIA_DEPARTAMENTOS_MB", "2048")) * 1024 ** 2)
+
+# Tamaño típico de los mapas de las páginas, para elegir el zoom
+ALTO_MAPA_PX, ANCHO_MAPA_PX = 450, 900
+
+RUTAS_DEFECTO = {
+    "datos": os.path.join("Data", "saber11_Antioquia_clean.csv"),
+    "coordenadas": os.path.join("Data", "municipios_unicos.csv"),
+    "pib": os.path.join("Data", "PIB_municipios.csv"),
+}
+
+
+# RUTAS Y DEPARTAMENTOS DISPONIBLES
+
+def rutas(departamento=DEPARTAMENTO_DEFECTO):
+    """Rutas de datos, coordenadas y PIB del departamento."""
+    if departamento == DEPARTAMENTO_DEFECTO:
+        return dict(RUTAS_DEFECTO)
+    directorio = os.path.join(DIRECTORIO_DEPARTAMENTOS, departamento)
+    datos = os.path.join(directorio, "saber11_clean.parquet")
+    if not os.path.exists(datos):
+        datos = os.path.join(directorio, "saber11_clean.csv")
+    return {
+        "datos": datos,
+        "coordenadas": os.path.join(directorio, "municipios_unicos.csv"),
+        "pib": os.path.join(directorio, "PIB_municipios.csv"),
+    }
+
+
+def disponibles():
+    """Departamento por defecto más los que tienen dataset en `DIRECTORIO_DEPARTAMENTOS`."""
+    otros = []
+    if os.path.isdir(DIRECTORIO_DEPARTAMENTOS):
+        otros = [d for d in sorted(os.listdir(DIRECTORIO_DEPARTAMENTOS))
+                 if d != DEPARTAMENTO_DEFECTO and os.path.exists(rutas(d)["datos"])]
+    return [DEPARTAMENTO_DEFECTO] + otros
+
+
+def validar(departamento):
+    """El departamento si está disponible; si no, el de por defecto."""
+    return departamento if departamento in disponibles() else DEPARTAMENTO_DEFECTO
+
+
+def leer_dataset(ruta, dtype=None):
+    """Dataset limpio en CSV o parquet (los de otros departamentos suelen venir en parquet)."""
+    if str(ruta).endswith(".parquet"):
+        df = pd.read_parquet(ruta)
+        return df.astype(dtype) if dtype else df
+    return pd.read_csv(ruta, dtype=dtype)
+
+
+def huella(departamento):
+    contenido = hashlib.sha1()
+    for ruta in rutas(departamento).values():
+        try:
+            info = os.stat(ruta)
+            contenido.update(f"{ruta}:{info.st_size}:{info.st_mtime_ns};".encode())
+        except FileNotFoundError:
+            contenido.update(f"{ruta}:-;".encode())
+    return f"{departamento}-{contenido.hexdigest()[:12]}"
+
+
+# REGISTRO CON DESALOJO LRU
+
+class Particion:
+    """Datos de las páginas de un departamento para una huella de sus archivos."""
+    __slots__ = ("id", "departamento", "datos", "bytes")
+
+    def __init__(self, id, departamento):
+        self.id = id
+        self.departamento = departamento
+        self.datos = {}
+        self.bytes = 0
+
+
+_lock = threading.Lock()
+# departamento -> Particion, del menos al más recientemente usado
+_cargados = OrderedDict()
+
+
+def tamano_bytes(objeto):
+    """Memoria estimada de lo que devuelve un cargador (DataFrames, arreglos, dicts)."""
+    if isinstance(objeto, (pd.DataFrame, pd.Series)):
+        uso = objeto.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(uso, pd.Series) else uso)
+    if isinstance(objeto, np.ndarray):
+        return objeto.nbytes
+    if isinstance(objeto, dict):
+        return sum(tamano_bytes(v) for v in objeto.values())
+    if isinstance(objeto, (list, tuple)):
+        return sum(tamano_bytes(v) for v in objeto)
+    return sys.getsizeof(objeto)
+
+
+def _desalojar(conservar):
+    desalojados = []
+    while sum(p.bytes for p in _cargados.values()) > PRESUPUESTO_BYTES and len(_cargados) > 1:
+        departamento = next(d for d in _cargados if d != conservar)
+        particion = _cargados.pop(departamento)
+        desalojados.append(f"{departamento} ({particion.bytes / 1024 ** 2:.0f} MB)")
+    return desalojados
+
+
+def datos(departamento, pagina):
+    """(id de versión, datos de `pagina`) del departamento, cargándolos si hace falta."""
+    # El nombre llega del store del navegador: solo se aceptan los disponibles
+    departamento = validar(departamento)
+    if departamento == DEPARTAMENTO_DEFECTO:
+        version = registro_datos.actual()
+        return version.id, version.datos[pagina]
+
+    id_actual = huella(departamento)
+    with _lock:
+        particion = _cargados.get(departamento)
+        if particion is not None and particion.id == id_actual:
+            _cargados.move_to_end(departamento)
+            if pagina in particion.datos:
+                return particion.id, particion.datos[pagina]
+
+    # Se carga fuera del lock: otros departamentos siguen respondiendo. La
+    # partición se registra solo si la carga termina bien
+    cargado = registro_datos.cargador(pagina)(departamento)
+    with _lock:
+        particion = _cargados.get(departamento)
+        if particion is None or particion.id != id_actual:
+            particion = _cargados[departamento] = Particion(id_actual, departamento)
+        _cargados.move_to_end(departamento)
+        if pagina not in particion.datos:
+            particion.datos[pagina] = cargado
+            particion.bytes += tamano_bytes(cargado)
+        desalojados = _desalojar(conservar=departamento)
+        resultado = particion.datos[pagina]
+    if desalojados:
+        gc.collect()
+        print(f"[departamentos] desalojados {', '.join(desalojados)} para cargar {departamento}")
+    return particion.id, resultado
+
+
+def buscar(version_id, pagina):
+    """Datos de `pagina` en la versión `version_id` (de cualquier departamento) o None."""
+    version = registro_datos.buscar(version_id)
+    if version is not None:
+        return version.datos.get(pagina)
+    with _lock:
+        for particion in _cargados.values():
+            if particion.id == version_id:
+                return particion.datos.get(pagina)
+    return None
+
+
+def estado():
+    """[(departamento, MB)] de los cargados, del menos al más recientemente usado."""
+    with _lock:
+        return [(d, p.bytes / 1024 ** 2) for d, p in _cargados.items()]
+
+
+# ENCUADRE DE LOS MAPAS
+
+def encuadre(lat, lon, margen=0.1):
+    """Centro, zoom de mapbox y límites a partir de las coordenadas de los municipios."""
+    lat = pd.to_numeric(pd.Series(lat), errors="coerce").dropna()
+    lon = pd.to_numeric(pd.Series(lon), errors="coerce").dropna()
+    if lat.empty or lon.empty:
+        return {"centro": {"lat": 4.6, "lon": -74.1}, "zoom": 4.5, "limites": None}
+    limites = {"sur": float(lat.min()), "norte": float(lat.max()),
+               "oeste": float(lon.min()), "este": float(lon.max())}
+    alto = max(limites["norte"] - limites["sur"], 0.05) * (1 + 2 * margen)
+    ancho = max(limites["este"] - limites["oeste"], 0.05) * (1 + 2 * margen)
+    # En zoom z un mosaico de 512 px cubre 360 / 2^z grados; se toma el zoom
+    # con el que el departamento cabe en el alto y el ancho típicos del mapa
+    zoom = min(math.log2(360 * ALTO_MAPA_PX / (512 * alto)), math.log2(360 * ANCHO_MAPA_PX / (512 * ancho)))
+    zoom = min(max(zoom, 3.0), 11.0)
+    return {
+        "centro": {"lat": (limites["sur"] + limites["norte"]) / 2,
+                   "lon": (limites["oeste"] + limites["este"]) / 2},
+        "zoom": round(zoom, 2),
+        "limites": limites,
+    }
+
+
+# AGREGADOS NACIONALES
+
+def _archivo_agregados(departamento):
+    return os.path.join(DIRECTORIO_AGREGADOS, f"{departamento}.parquet")
+
+
+def construir_agregados(departamento):
+    """Escribe las celdas de `series_tiempo` del departamento (sin filas de estudiantes)."""
+    from Analysis.series_tiempo import construir_series
+
+    df = leer_dataset(rutas(departamento)["datos"])
+    celdas = construir_series(df)
+    os.makedirs(DIRECTORIO_AGREGADOS, exist_ok=True)
+    destino = _archivo_agregados(departamento)
+    ruta_tmp = destino + ".tmp"
+    celdas.to_parquet(ruta_tmp)
+    os.replace(ruta_tmp, destino)
+    print(f"[departamentos] {departamento}: {len(celdas)} celdas -> {destino}")
+    return destino
+
+
+@lru_cache(maxsize=1)
+def agregados_nacionales(huella_archivos=None):
+    """Celdas de todos los departamentos con agregados, con nivel `departamento`."""
+    partes = {}
+    if os.path.isdir(DIRECTORIO_AGREGADOS):
+        for archivo in sorted(os.listdir(DIRECTORIO_AGREGADOS)):
+            if archivo.endswith(".parquet"):
+                partes[archivo[:-len(".parquet")]] = pd.read_parquet(os.path.join(DIRECTORIO_AGREGADOS, archivo))
+    if not partes:
+        return None
+    return pd.concat(partes, names=["departamento"])
+
+
+def _huella_agregados():
+    if not os.path.isdir(DIRECTORIO_AGREGADOS):
+        return None
+    return tuple(sorted((a, os.stat(os.path.join(DIRECTORIO_AGREGADOS, a)).st_mtime_ns)
+                        for a in os.listdir(DIRECTORIO_AGREGADOS) if a.endswith(".parquet")))
+
+
+def serie_nacional(columna, por="departamento", frecuencia="anio"):
+    """Media y conteo de `columna` por `frecuencia` y `por` (departamento o una
+    dimensión de `series_tiempo`), sumando las celdas de todos los departamentos.
+    """
+    celdas = agregados_nacionales(_huella_agregados())
+    if celdas is None:
+        return pd.DataFrame(columns=[frecuencia, por, "n", columna])
+    sumadas = celdas[[f"n_{columna}", f"suma_{columna}"]].groupby(level=[frecuencia, por], observed=True).sum()
+    sumadas = sumadas[sumadas[f"n_{columna}"] > 0]
+    return pd.DataFrame({
+        "n": sumadas[f"n_{columna}"],
+        columna: sumadas[f"suma_{columna}"] / sumadas[f"n_{columna}"],
+    }).reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agregar", nargs="*", metavar="DEPARTAMENTO",
+                        help="Escribe los agregados de los departamentos (todos si no se indican)")
+    args = parser.parse_args(argv)
+    if args.agregar is None:
+        for departamento in disponibles():
+            print(f"{departamento}: {rutas(departamento)['datos']}")
+        return 0
+    for departamento in args.agregar or disponibles():
+        construir_agregados(departamento)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
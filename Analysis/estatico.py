@@ -0,0 +1,187 @@
+"""Export estático de todas las figuras de los tableros y modo de servicio.
+
+`python -m Analysis.estatico` recorre los mismos filtros que el
+precalentamiento del caché (`Analysis/precalentar_cache.py`) y escribe cada
+salida como JSON comprimido con gzip, más un `manifest.json`:
+
+    <directorio>/
+        manifest.json
+        pregunta_1/3f2a....json.gz
+        pregunta_2/estrato/9b1c....json.gz
+        ...
+
+Con `SABER_MODO_ESTATICO=1` los callbacks buscan primero en el export (ver
+`cache_figuras.obtener`) y solo calculan las combinaciones que no están,
+como rangos de periodos poco comunes. El manifiesto guarda la versión de
+los datos y de las salidas con que se generó; si no coinciden con las
+actuales (datos refrescados o recargados en caliente, o código nuevo) el
+export se ignora hasta volver a generarlo. Los archivos se sirven además tal
+cual en `/estatico/` (ver `Server/estatico.py`), listos para un CDN.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from functools import lru_cache
+
+from plotly.io.json import to_json_plotly
+
+from Analysis.precision import recortar_salida
+
+DIRECTORIO_ESTATICO = os.environ.get("SABER_DIR_ESTATICO", os.path.join(".cache", "estatico"))
+MANIFIESTO = "manifest.json"
+
+# El resumen de /pregunta_2 son DataFrames: solo vive en el caché de figuras
+NO_EXPORTABLES = {"pregunta_2/resumen"}
+
+
+def _normalizar(valor):
+    if hasattr(valor, "item"):
+        return valor.item()
+    raise TypeError(f"No se puede usar {type(valor).__name__} como filtro")
+
+
+def clave_estatica(pagina, args):
+    return f"{pagina}:{json.dumps(list(args), default=_normalizar, ensure_ascii=False)}"
+
+
+def archivo_entrada(pagina, args):
+    huella = hashlib.sha1(clave_estatica(pagina, args).encode("utf-8")).hexdigest()[:16]
+    return f"{pagina}/{huella}.json.gz"
+
+
+# EXPORTAR
+
+def _escribir(directorio, pagina, args, salida):
+    contenido = to_json_plotly(recortar_salida(salida)).encode("utf-8")
+    comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+    relativo = archivo_entrada(pagina, args)
+    destino = os.path.join(directorio, relativo)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = destino + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(comprimido)
+    os.replace(temporal, destino)
+    return clave_estatica(pagina, args), {
+        "archivo": relativo, "bytes": len(contenido), "bytes_gz": len(comprimido)
+    }
+
+
+def _exportar_tarea(directorio, pagina, filtro):
+    from Analysis.precalentar_cache import generar_salidas
+    entradas = {}
+    for clave_pagina, args, salida in generar_salidas(pagina, filtro):
+        if clave_pagina in NO_EXPORTABLES:
+            continue
+        clave, entrada = _escribir(directorio, clave_pagina, args, salida)
+        entradas[clave] = entrada
+    return entradas
+
+
+def exportar(directorio=DIRECTORIO_ESTATICO, paginas=None, procesos=None):
+    from Analysis.cache_figuras import VERSION_SALIDAS, version_datos
+    from Analysis.precalentar_cache import PAGINAS, _iniciar_proceso, listar_tareas
+
+    paginas = tuple(paginas or PAGINAS)
+    inicio = time.perf_counter()
+    tareas = listar_tareas(paginas, incluir_eda=True)
+    procesos = procesos or os.cpu_count() or 1
+    print(f"[estatico] {len(tareas)} tareas en {procesos} procesos hacia {directorio}")
+
+    entradas = {}
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso,
+                             initargs=(paginas,)) as pool:
+        futuros = [pool.submit(_exportar_tarea, directorio, pagina, filtro) for pagina, filtro in tareas]
+        for hechas, futuro in enumerate(as_completed(futuros), start=1):
+            entradas.update(futuro.result())
+            if hechas % 25 == 0 or hechas == len(futuros):
+                print(f"[estatico] {hechas}/{len(futuros)} tareas")
+
+    datos_manifiesto = {
+        "version": version_datos(),
+        "version_salidas": VERSION_SALIDAS,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "entradas": entradas,
+    }
+    temporal = os.path.join(directorio, MANIFIESTO + ".tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos_manifiesto, f, ensure_ascii=False)
+    os.replace(temporal, os.path.join(directorio, MANIFIESTO))
+
+    total_gz = sum(e["bytes_gz"] for e in entradas.values())
+    total = sum(e["bytes"] for e in entradas.values())
+    print(f"[estatico] {len(entradas)} archivos en {time.perf_counter() - inicio:.1f}s: "
+          f"{total / 1024 ** 2:.1f} MB de JSON, {total_gz / 1024 ** 2:.1f} MB comprimidos")
+    return datos_manifiesto
+
+
+# LEER (MODO DE SERVICIO)
+
+def _firma(directorio):
+    # Un export nuevo reemplaza manifest.json: cambia su mtime y suele cambiar su tamaño
+    try:
+        info = os.stat(os.path.join(directorio, MANIFIESTO))
+    except FileNotFoundError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+@lru_cache(maxsize=4)
+def _manifiesto(directorio, firma):
+    if firma is None:
+        return {"version": None, "entradas": {}}
+    with open(os.path.join(directorio, MANIFIESTO), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def manifiesto(directorio=DIRECTORIO_ESTATICO):
+    return _manifiesto(directorio, _firma(directorio))
+
+
+@lru_cache(maxsize=128)
+def _leer_archivo(directorio, relativo, firma):
+    with gzip.open(os.path.join(directorio, relativo), "rb") as f:
+        return json.loads(f.read())
+
+
+_avisados = set()
+
+
+def vigente(directorio=DIRECTORIO_ESTATICO):
+    """True si el export es de los datos y del formato de salidas en uso."""
+    from Analysis.cache_figuras import VERSION_SALIDAS, version_datos
+    datos = manifiesto(directorio)
+    actual = (version_datos(), VERSION_SALIDAS)
+    exportado = (datos["version"], datos.get("version_salidas"))
+    if exportado == actual:
+        return True
+    if datos["version"] is not None and (directorio, actual) not in _avisados:
+        _avisados.add((directorio, actual))
+        print(f"[estatico] export de {exportado} y datos en uso {actual}: se ignora hasta regenerarlo")
+    return False
+
+
+def leer(pagina, args, directorio=DIRECTORIO_ESTATICO):
+    """Salida exportada para `pagina` y `args` (JSON ya decodificado) o None."""
+    if not vigente(directorio):
+        return None
+    firma = _firma(directorio)
+    entrada = _manifiesto(directorio, firma)["entradas"].get(clave_estatica(pagina, args))
+    if entrada is None:
+        return None
+    return _leer_archivo(directorio, entrada["archivo"], firma)
+
+
+if __name__ == "__main__":
+    from Analysis.precalentar_cache import PAGINAS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", default=DIRECTORIO_ESTATICO)
+    parser.add_argument("--paginas", nargs="+", choices=PAGINAS, default=list(PAGINAS))
+    parser.add_argument("--procesos", type=int, default=None)
+    args = parser.parse_args()
+    exportar(args.directorio, args.paginas, args.procesos)
@@ -0,0 +1,306 @@
+"""Límites municipales de Antioquia para mapas coropléticos sin conexión.
+
+El archivo de límites (`ARCHIVO_LIMITES`, GeoJSON con un polígono por
+municipio, por ejemplo el Marco Geoestadístico del DANE filtrado a
+Antioquia) se procesa una sola vez con
+
+    python -m Analysis.geometrias [--entrada ruta.geojson]
+
+que por cada nivel de `NIVELES` simplifica los anillos (Douglas-Peucker),
+cuantiza las coordenadas a pocos decimales y escribe
+`Data/geometrias/<nivel>.<huella>.json` más un `indice.json`. Cada feature
+queda con `id` = nombre normalizado del municipio, el mismo que
+`normalizar_nombre` aplica a `cole_mcpio_ubicacion`.
+
+Las figuras no incrustan la geometría: `figura_coropletica` pone en
+`geojson` la URL del archivo (ver `Server/geometrias.py`), que el navegador
+descarga una vez y guarda en caché (el nombre cambia si cambia el
+contenido). Cada actualización del mapa solo envía `locations` y `z`.
+Con `SABER_MAPA_SIN_CONEXION=1` el fondo es blanco en vez de teselas de
+carto, así que el mapa funciona sin internet.
+
+Si no se han construido las geometrías, `disponible()` es False y las
+páginas siguen con los mapas de puntos.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+
+ARCHIVO_LIMITES = os.environ.get("SABER_LIMITES_GEOJSON", "Data/antioquia_municipios.geojson")
+PROPIEDAD_NOMBRE = os.environ.get("SABER_LIMITES_PROPIEDAD", "MPIO_CNMBR")
+DIRECTORIO_GEOMETRIAS = "Data/geometrias"
+INDICE = "indice.json"
+RUTA_URL = "/geometrias"
+SIN_CONEXION = os.environ.get("SABER_MAPA_SIN_CONEXION") == "1"
+
+# Tolerancia de simplificación (grados) y decimales de las coordenadas.
+# 0.001° ~ 110 m; 3 decimales ~ 110 m, 4 ~ 11 m
+NIVELES = {
+    "baja": {"tolerancia": 0.01, "decimales": 3},
+    "media": {"tolerancia": 0.003, "decimales": 3},
+    "alta": {"tolerancia": 0.0008, "decimales": 4},
+}
+# Zoom de mapbox a partir del cual conviene cada nivel
+ZOOM_NIVELES = ((8.0, "alta"), (6.5, "media"), (0.0, "baja"))
+
+
+def normalizar_nombre(nombre):
+    """Mayúsculas, sin tildes y con espacios simples: 'Medellín' -> 'MEDELLIN'."""
+    texto = unicodedata.normalize("NFKD", str(nombre))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.upper().split())
+
+
+def nivel_para_zoom(zoom):
+    for minimo, nivel in ZOOM_NIVELES:
+        if zoom >= minimo:
+            return nivel
+    return ZOOM_NIVELES[-1][1]
+
+
+# SIMPLIFICACION Y CUANTIZACION
+
+def _douglas_peucker(puntos, tolerancia):
+    """Máscara de los puntos que se conservan de la polilínea `puntos` (n x 2)."""
+    n = len(puntos)
+    conservar = np.zeros(n, dtype=bool)
+    conservar[0] = conservar[-1] = True
+    pendientes = [(0, n - 1)]
+    while pendientes:
+        inicio, fin = pendientes.pop()
+        if fin - inicio < 2:
+            continue
+        a, b = puntos[inicio], puntos[fin]
+        tramo = puntos[inicio + 1:fin]
+        direccion = b - a
+        largo = np.hypot(*direccion)
+        if largo == 0:
+            distancias = np.hypot(*(tramo - a).T)
+        else:
+            distancias = np.abs(direccion[0] * (tramo[:, 1] - a[1]) - direccion[1] * (tramo[:, 0] - a[0])) / largo
+        mayor = int(np.argmax(distancias))
+        if distancias[mayor] > tolerancia:
+            medio = inicio + 1 + mayor
+            conservar[medio] = True
+            pendientes.append((inicio, medio))
+            pendientes.append((medio, fin))
+    return conservar
+
+
+def simplificar_anillo(anillo, tolerancia, decimales):
+    """Anillo simplificado y cuantizado, o None si se degenera (menos de 4 puntos)."""
+    puntos = np.asarray(anillo, dtype=float)[:, :2]
+    if len(puntos) < 4:
+        return None
+    # Los anillos son cerrados (primer punto == último): se parte en el punto
+    # más lejano al inicio para que Douglas-Peucker no colapse el anillo
+    lejano = int(np.argmax(np.hypot(*(puntos - puntos[0]).T)))
+    mascara = np.concatenate([
+        _douglas_peucker(puntos[:lejano + 1], tolerancia)[:-1],
+        _douglas_peucker(puntos[lejano:], tolerancia),
+    ])
+    simplificado = np.round(puntos[mascara], decimales)
+    # Al cuantizar, puntos vecinos pueden quedar iguales
+    distinto = np.ones(len(simplificado), dtype=bool)
+    distinto[1:] = np.any(simplificado[1:] != simplificado[:-1], axis=1)
+    simplificado = simplificado[distinto]
+    if len(simplificado) < 4:
+        return None
+    return simplificado.tolist()
+
+
+def simplificar_geometria(geometria, tolerancia, decimales):
+    """Polygon o MultiPolygon simplificado; los anillos degenerados se descartan."""
+    if geometria["type"] == "Polygon":
+        poligonos = [geometria["coordinates"]]
+    elif geometria["type"] == "MultiPolygon":
+        poligonos = geometria["coordinates"]
+    else:
+        raise ValueError(f"Geometría no soportada: {geometria['type']}")
+
+    resultado = []
+    for poligono in poligonos:
+        exterior = simplificar_anillo(poligono[0], tolerancia, decimales)
+        if exterior is None:
+            continue
+        huecos = [h for h in (simplificar_anillo(a, tolerancia, decimales) for a in poligono[1:]) if h]
+        resultado.append([exterior] + huecos)
+    if not resultado:
+        if tolerancia == 0:
+            raise ValueError("Polígono degenerado al cuantizar")
+        # Municipio muy pequeño para la tolerancia: se conserva solo cuantizado
+        return simplificar_geometria(geometria, 0.0, decimales)
+    if len(resultado) == 1:
+        return {"type": "Polygon", "coordinates": resultado[0]}
+    return {"type": "MultiPolygon", "coordinates": resultado}
+
+
+def simplificar_limites(limites, nivel, propiedad=PROPIEDAD_NOMBRE):
+    """FeatureCollection con `id` = municipio normalizado y solo la propiedad `nombre`."""
+    parametros = NIVELES[nivel]
+    features = []
+    for feature in limites["features"]:
+        nombre = feature["properties"][propiedad]
+        features.append({
+            "type": "Feature",
+            "id": normalizar_nombre(nombre),
+            "properties": {"nombre": nombre},
+            "geometry": simplificar_geometria(
+                feature["geometry"], parametros["tolerancia"], parametros["decimales"]
+            ),
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+# CONSTRUCCION (UNA VEZ, FUERA DE LA APP)
+
+def construir(entrada=ARCHIVO_LIMITES, directorio=DIRECTORIO_GEOMETRIAS, propiedad=PROPIEDAD_NOMBRE):
+    """Escribe un archivo por nivel y el índice {nivel: archivo}. Retorna el índice."""
+    with open(entrada, encoding="utf-8") as f:
+        limites = json.load(f)
+    os.makedirs(directorio, exist_ok=True)
+
+    archivos = {}
+    for nivel in NIVELES:
+        contenido = json.dumps(
+            simplificar_limites(limites, nivel, propiedad), separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+        # El nombre cambia con el contenido: el navegador puede cachearlo sin revalidar
+        archivo = f"{nivel}.{hashlib.sha1(contenido).hexdigest()[:12]}.json"
+        with open(os.path.join(directorio, archivo), "wb") as f:
+            f.write(contenido)
+        archivos[nivel] = archivo
+        print(f"[geometrias] {nivel}: {len(contenido) / 1024:.0f} KB -> {archivo}")
+
+    # Se quitan los archivos de construcciones anteriores
+    for anterior in os.listdir(directorio):
+        if anterior.endswith(".json") and anterior != INDICE and anterior not in archivos.values():
+            os.remove(os.path.join(directorio, anterior))
+
+    ruta_tmp = os.path.join(directorio, INDICE + ".tmp")
+    with open(ruta_tmp, "w", encoding="utf-8") as f:
+        json.dump(archivos, f, indent=2)
+    os.replace(ruta_tmp, os.path.join(directorio, INDICE))
+    limpiar()
+    return archivos
+
+
+# LECTURA (EN MEMORIA)
+
+@lru_cache(maxsize=1)
+def indice(directorio=DIRECTORIO_GEOMETRIAS):
+    try:
+        with open(os.path.join(directorio, INDICE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def disponible(nombres=None):
+    """Si hay límites construidos y, dados `nombres`, si cubren casi todos esos
+    municipios (los límites son de un departamento; los demás usan puntos).
+    """
+    if not indice():
+        return False
+    if nombres is None:
+        return True
+    nombres = {normalizar_nombre(n) for n in nombres}
+    return len(nombres & municipios("baja")) >= 0.8 * len(nombres)
+
+
+@lru_cache(maxsize=len(NIVELES))
+def geometria(nivel="media"):
+    """FeatureCollection del nivel, leída una vez por proceso."""
+    with open(os.path.join(DIRECTORIO_GEOMETRIAS, indice()[nivel]), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=len(NIVELES))
+def municipios(nivel="media"):
+    """Ids (nombres normalizados) que tienen polígono en el nivel."""
+    return frozenset(f["id"] for f in geometria(nivel)["features"])
+
+
+def url_geometria(nivel="media"):
+    return f"{RUTA_URL}/{indice()[nivel]}"
+
+
+def limpiar():
+    indice.cache_clear()
+    geometria.cache_clear()
+    municipios.cache_clear()
+
+
+# FIGURAS
+
+def figura_coropletica(df, columna, escala, rango, titulo, etiqueta=None, hover_data=None,
+                       etiquetas=None, zoom=None, centro=None, incrustar=False):
+    """Mapa coroplético de `columna` por municipio (`cole_mcpio_ubicacion` en `df`).
+
+    Los nombres van en `hovertext` igual que en los mapas de puntos, así que
+    `mapas.resaltar_municipio` y `assets/mapas.js` funcionan con ambos. Con
+    `incrustar=True` la geometría va dentro de la figura (exportes sin servidor).
+    Sin `zoom` o `centro` se encuadran las coordenadas `lat`/`lon` de `df`.
+    """
+    import plotly.graph_objects as go
+    from Analysis.departamentos import encuadre
+
+    if zoom is None or centro is None:
+        caja = encuadre(df["lat"], df["lon"]) if "lat" in df.columns else encuadre([], [])
+        zoom = caja["zoom"] if zoom is None else zoom
+        centro = centro or caja["centro"]
+
+    nivel = nivel_para_zoom(zoom)
+    df = df.reset_index(drop=True)
+    hover_data = hover_data or {}
+    etiquetas = etiquetas or {}
+    plantilla = "<b>%{hovertext}</b><br>" + f"{etiqueta or columna}: %{{z:.1f}}"
+    for i, (col, formato) in enumerate(hover_data.items()):
+        plantilla += f"<br>{etiquetas.get(col, col)}: %{{customdata[{i}]{formato}}}"
+
+    fig = go.Figure(go.Choroplethmapbox(
+        geojson=geometria(nivel) if incrustar else url_geometria(nivel),
+        featureidkey="id",
+        locations=df["cole_mcpio_ubicacion"].map(normalizar_nombre),
+        z=df[columna],
+        hovertext=df["cole_mcpio_ubicacion"],
+        customdata=df[list(hover_data)] if hover_data else None,
+        hovertemplate=plantilla + "<extra></extra>",
+        coloraxis="coloraxis",
+        marker=dict(line=dict(width=0.5, color="#ffffff")),
+    ))
+    fig.update_layout(
+        title=titulo,
+        coloraxis=dict(colorscale=escala, cmin=rango[0], cmax=rango[1],
+                       colorbar=dict(title=dict(text=etiqueta or columna))),
+        mapbox=dict(
+            style="white-bg" if SIN_CONEXION else "carto-positron",
+            zoom=zoom,
+            center=centro,
+        ),
+        margin={"r": 0, "t": 40, "l": 0, "b": 0},
+    )
+    return fig
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entrada", default=ARCHIVO_LIMITES)
+    parser.add_argument("--propiedad", default=PROPIEDAD_NOMBRE, help="Propiedad con el nombre del municipio")
+    parser.add_argument("--directorio", default=DIRECTORIO_GEOMETRIAS)
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.entrada):
+        print(f"[geometrias] No existe {args.entrada}; descargue los límites municipales de Antioquia en GeoJSON")
+        return 1
+    construir(args.entrada, args.directorio, args.propiedad)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
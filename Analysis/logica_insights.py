@@ -1,7 +1,9 @@
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 
+from Analysis import paralelo
+from Analysis.series_tiempo import construir_series, serie
+
 
 def _first_present_column(df, candidates):
     for c in candidates:
@@ -16,6 +18,85 @@ def _first_present_column(df, candidates):
     return None
 
 
+# FIGURAS DE INSIGHTS
+# Funciones de módulo para que `paralelo.construir` las corra en hilos o procesos
+
+def _histograma(df, x, color, nbins, titulo, colores):
+    import plotly.express as px
+    return px.histogram(df, x=x, color=color, nbins=nbins, title=titulo,
+                        color_discrete_sequence=colores)
+
+
+def _box_por_categoria(df, col_punt_global, box_cols):
+    import plotly.express as px
+    box_fig = go.Figure()
+    if not box_cols:
+        return box_fig
+    for i, c in enumerate(box_cols):
+        px_box = px.box(df, x=c, y=col_punt_global, points="outliers", title="Dispersión Puntaje Global")
+        # convertir trazas y agregarlas
+        for t in px_box.data:
+            t.visible = (i == 0)
+            box_fig.add_trace(t)
+
+    # Agregar menú para cambiar la categoría del boxplot
+    buttons = []
+    traces_per_group = len(px_box.data)
+    for i, c in enumerate(box_cols):
+        visible = [False] * (traces_per_group * len(box_cols))
+        start = i * traces_per_group
+        for j in range(start, start + traces_per_group):
+            visible[j] = True
+        buttons.append(dict(label=c, method="update", args=[{"visible": visible}, {"title": f"Boxplot puntaje global por {c}"}]))
+    box_fig.update_layout(updatemenus=[dict(active=0, buttons=buttons, x=0.0, y=1.15, xanchor="left")])
+    return box_fig
+
+
+def _barras_estrato(df, metrics, col_estrato):
+    import plotly.express as px
+    bar_fig = go.Figure()
+    if not metrics:
+        return bar_fig
+    for i, m in enumerate(metrics):
+        if col_estrato and m in df.columns:
+            df_g = df.groupby(col_estrato)[m].mean().reset_index().sort_values(col_estrato)
+            bar = px.bar(df_g, x=col_estrato, y=m)
+            for t in bar.data:
+                t.visible = (i == 0)
+                bar_fig.add_trace(t)
+
+    buttons = []
+    traces_per_group = len(bar.data)
+    for i, m in enumerate(metrics):
+        visible = [False] * (traces_per_group * len(metrics))
+        start = i * traces_per_group
+        for j in range(start, start + traces_per_group):
+            visible[j] = True
+        buttons.append(dict(label=m, method="update", args=[{"visible": visible}, {"title": f"Promedio {m} por {col_estrato or 'estrato'}"}]))
+    bar_fig.update_layout(updatemenus=[dict(active=0, buttons=buttons, x=0.0, y=1.15, xanchor="left")])
+    return bar_fig
+
+
+def _pie(df, names, titulo):
+    import plotly.express as px
+    return px.pie(df, names=names, title=titulo)
+
+
+def _serie_global(df, col_punt_global):
+    import plotly.express as px
+    serie_df = serie(construir_series(df, [col_punt_global]), col_punt_global)
+    if serie_df.empty:
+        return go.Figure()
+    return px.line(
+        serie_df,
+        x='anio',
+        y=col_punt_global,
+        markers=True,
+        title='Progresión Promedio del Puntaje Global a través de los Años',
+        labels={col_punt_global: 'Promedio Puntaje Global', 'anio': 'Año'}
+    )
+
+
 def obtener_figuras_eda(path="Data/saber11_Antioquia_clean.csv"):
     """Carga datos y genera varias figuras y KPIs para el dashboard de insights.
 
@@ -56,112 +137,33 @@ def obtener_figuras_eda(path="Data/saber11_Antioquia_clean.csv"):
             success[m] = float((df[m] > 300).mean() * 100)
     kp["success_pct_by_metric"] = success
 
-    figs = {}
-
-    # Histograma general
-    if col_punt_global:
-        figs["hist_global"] = px.histogram(
-            df, x=col_punt_global, nbins=40, title="Distribución Puntaje Global",
-            color_discrete_sequence=["#2C3E50"]
-        )
-    else:
-        figs["hist_global"] = go.Figure()
-
-    # Histogramas por categorías (si existen)
-    if col_area:
-        figs["hist_by_area"] = px.histogram(
-            df, x=col_punt_global, color=col_area, nbins=30,
-            title=f"Distribución Puntaje Global por {col_area}"
-        )
-
-    if col_caracter:
-        figs["hist_by_caracter"] = px.histogram(
-            df, x=col_punt_global, color=col_caracter, nbins=30,
-            title=f"Distribución Puntaje Global por {col_caracter}"
-        )
-
-    if col_genero:
-        figs["hist_by_genero"] = px.histogram(
-            df, x=col_punt_global, color=col_genero, nbins=30,
-            title=f"Distribución Puntaje Global por {col_genero}"
-        )
-
-    # Boxplots: crear varias variantes y controlar visibilidad con update menus
-    box_cols = [c for c in [col_naturaleza, col_area, col_caracter, col_genero] if c]
-    box_fig = go.Figure()
-    visible_masks = []
-    for i, c in enumerate(box_cols):
-        px_box = px.box(df, x=c, y=col_punt_global, points="outliers", title="Dispersión Puntaje Global")
-        # convertir trazas y agregarlas
-        traces = px_box.data
-        for t in traces:
-            t.visible = (i == 0)
-            box_fig.add_trace(t)
-        visible_masks.append([j >= (i * len(traces)) and j < ((i + 1) * len(traces)) for j in range(len(box_cols) * len(traces))])
-
-    # Agregar menú para cambiar la categoría del boxplot
-    if box_cols:
-        buttons = []
-        traces_per_group = len(px_box.data)
-        for i, c in enumerate(box_cols):
-            visible = [False] * (traces_per_group * len(box_cols))
-            start = i * traces_per_group
-            for j in range(start, start + traces_per_group):
-                visible[j] = True
-            buttons.append(dict(label=c, method="update", args=[{"visible": visible}, {"title": f"Boxplot puntaje global por {c}"}]))
-        box_fig.update_layout(updatemenus=[dict(active=0, buttons=buttons, x=0.0, y=1.15, xanchor="left")])
-        figs["box_global_by_category"] = box_fig
-    else:
-        figs["box_global_by_category"] = go.Figure()
-
-    # Barra por estrato con selector de métrica
+    # Figuras independientes, construidas a la vez (ver Analysis/paralelo.py); las
+    # tareas son funciones de módulo, así que también sirven con procesos
     metrics = [m for m in [col_matematicas, col_lectura, col_ciencias, col_punt_global, col_sociales, col_ingles] if m]
-    bar_fig = go.Figure()
-    for i, m in enumerate(metrics):
-        if col_estrato and m in df.columns:
-            df_g = df.groupby(col_estrato)[m].mean().reset_index().sort_values(col_estrato)
-            bar = px.bar(df_g, x=col_estrato, y=m)
-            for t in bar.data:
-                t.visible = (i == 0)
-                bar_fig.add_trace(t)
-
-    if metrics:
-        buttons = []
-        traces_per_group = len(bar.data)
-        for i, m in enumerate(metrics):
-            visible = [False] * (traces_per_group * len(metrics))
-            start = i * traces_per_group
-            for j in range(start, start + traces_per_group):
-                visible[j] = True
-            buttons.append(dict(label=m, method="update", args=[{"visible": visible}, {"title": f"Promedio {m} por {col_estrato or 'estrato'}"}]))
-        bar_fig.update_layout(updatemenus=[dict(active=0, buttons=buttons, x=0.0, y=1.15, xanchor="left")])
-        figs["bar_by_estrato_metric_select"] = bar_fig
-    else:
-        figs["bar_by_estrato_metric_select"] = go.Figure()
-
+    box_cols = [c for c in [col_naturaleza, col_area, col_caracter, col_genero] if c]
+    tareas = {
+        # Histograma general
+        "hist_global": (_histograma, df, col_punt_global, None, 40, "Distribución Puntaje Global",
+                        ["#2C3E50"]) if col_punt_global else (go.Figure,),
+        # Boxplots: varias variantes con visibilidad controlada por update menus
+        "box_global_by_category": (_box_por_categoria, df, col_punt_global, box_cols),
+        # Barra por estrato con selector de métrica
+        "bar_by_estrato_metric_select": (_barras_estrato, df, metrics, col_estrato),
+        # Serie temporal: promedio de puntajes generales por año (sin separar por TIC)
+        "serie_punt_global_por_periodo": (_serie_global, df, col_punt_global)
+        if col_punt_global and 'periodo' in df.columns else (go.Figure,),
+    }
+    # Histogramas por categorías (si existen)
+    for nombre, col in (("hist_by_area", col_area), ("hist_by_caracter", col_caracter),
+                        ("hist_by_genero", col_genero)):
+        if col:
+            tareas[nombre] = (_histograma, df, col_punt_global, col, 30,
+                              f"Distribución Puntaje Global por {col}", None)
     # Pie por genero
     if col_genero:
-        figs["pie_genero"] = px.pie(df, names=col_genero, title="Distribución por Género")
-
-    # Serie temporal: promedio de puntajes generales por año (sin separar por TIC)
-    if col_punt_global and 'periodo' in df.columns:
-        try:
-            df['year'] = df['periodo'].astype(str).str[:4]
-            df = df[df['year'].str.isnumeric()]
-            df['year'] = df['year'].astype(int)
-            serie_df = df.groupby('year')[col_punt_global].mean().reset_index().sort_values('year')
-            figs['serie_punt_global_por_periodo'] = px.line(
-                serie_df,
-                x='year',
-                y=col_punt_global,
-                markers=True,
-                title='Progresión Promedio del Puntaje Global a través de los Años',
-                labels={col_punt_global: 'Promedio Puntaje Global', 'year': 'Año'}
-            )
-        except Exception:
-            figs['serie_punt_global_por_periodo'] = go.Figure()
-    else:
-        figs['serie_punt_global_por_periodo'] = go.Figure()
+        tareas["pie_genero"] = (_pie, df, col_genero, "Distribución por Género")
+
+    figs = dict(zip(tareas, paralelo.construir(tareas.values())))
 
     # Retornar KPIs y figuras
     # También construir información auxiliar para callbacks interactivos
@@ -206,6 +208,7 @@ def build_bar_with_comparisons(df, metric, estrato_col, metrics_list):
     Devuelve `(fig, kpis)` donde `kpis` contiene `range`, `by_estrato` (DataFrame dict),
     y `comparisons` con % diferencia vs otras métricas.
     """
+    import plotly.express as px
     if estrato_col not in df.columns or metric not in df.columns:
         return go.Figure(), {"error": "column missing"}
 
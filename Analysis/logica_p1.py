@@ -1,11 +1,15 @@
 import pandas as pd
-import plotly.express as px
-from scipy import stats
 import numpy as np
+from Analysis import departamentos, geometrias, paralelo, vecinos
+from Analysis.mapas import ESTILO_MAPA_P1, resaltar_municipio
 
-def cargar_datos_p1():
+# plotly.express y scipy se importan dentro de las funciones que los usan:
+# si las figuras salen del caché, arrancar la app no los carga.
+
+def cargar_datos_p1(path='Data/saber11_Antioquia_clean.csv', ruta_pib='Data/PIB_municipios.csv',
+                    ruta_coordenadas='Data/municipios_unicos.csv', departamento='Antioquia'):
     # 1. Cargar datos de Saber 11
-    df = pd.read_csv('Data/saber11_Antioquia_clean.csv', dtype={'cole_cod_mcpio_ubicacion': str})
+    df = departamentos.leer_dataset(path, dtype={'cole_cod_mcpio_ubicacion': str})
     df['cole_mcpio_ubicacion'] = df['cole_mcpio_ubicacion'].str.upper().str.strip()
     
     # Manejar el nombre de la columna de área de residencia (puede variar según el dataset de ICFES)
@@ -30,7 +34,7 @@ def cargar_datos_p1():
     try:
         # 1. Usamos sep=';' o ',' (pandas puede auto-detectarlo con sep=None y engine='python')
         # 2. encoding='utf-8-sig' elimina los caracteres invisibles (BOM) de Excel
-        df_pib = pd.read_csv('Data/PIB_municipios.csv', sep=None, engine='python', encoding='utf-8-sig')
+        df_pib = pd.read_csv(ruta_pib, sep=None, engine='python', encoding='utf-8-sig')
         
         # 3. Limpiamos los nombres de TODAS las columnas por si tienen espacios accidentales
         df_pib.columns = df_pib.columns.str.strip()
@@ -55,7 +59,7 @@ def cargar_datos_p1():
 
     # 3. Cargar y cruzar coordenadas espaciales
     try:
-        df_coord = pd.read_csv('Data/municipios_unicos.csv')
+        df_coord = pd.read_csv(ruta_coordenadas)
         # Cruzamos usando el nombre estandarizado del municipio
         df = pd.merge(df, df_coord, on='cole_mcpio_ubicacion', how='left')
     except FileNotFoundError:
@@ -63,6 +67,8 @@ def cargar_datos_p1():
         df['lat'] = np.nan
         df['lon'] = np.nan
 
+    # El departamento y sus coordenadas viajan con el marco (etiquetas, vecinos)
+    df.attrs.update(departamento=departamento, ruta_coordenadas=ruta_coordenadas)
     return df
 
 def obtener_lista_municipios_p1(df):
@@ -71,6 +77,7 @@ def obtener_lista_municipios_p1(df):
     return ['TODOS'] + municipios
 
 def generar_boxplot_brecha(df, municipio):
+    import plotly.express as px
     dff = df.copy()
     if municipio != 'TODOS':
         dff = dff[dff['cole_mcpio_ubicacion'] == municipio]
@@ -88,6 +95,7 @@ def generar_boxplot_brecha(df, municipio):
     return fig
 
 def generar_dispersion_pib_brecha(df):
+    import plotly.express as px
     # Agrupar para calcular la brecha promedio por municipio
     agrupado = df.groupby(['cole_mcpio_ubicacion', 'Area'])['punt_global'].mean().unstack()
     
@@ -123,6 +131,7 @@ def generar_dispersion_pib_brecha(df):
     return px.scatter(title="Datos de PIB no disponibles para graficar")
 
 def calcular_estadisticas_brecha(df, municipio):
+    from scipy import stats
     dff = df.copy()
     if municipio != 'TODOS':
         dff = dff[dff['cole_mcpio_ubicacion'] == municipio]
@@ -144,8 +153,14 @@ def calcular_estadisticas_brecha(df, municipio):
 
 # ... (tu código anterior en logica_p1.py) ...
 
-def generar_barras_brecha_error(df, municipio):
-    dff = df.copy()
+def celdas_vecinos(df):
+    # Celdas municipio x zona del puntaje global para comparar con vecinos;
+    # las páginas las arman una vez al cargar (ver pages/pregunta_1.py)
+    return vecinos.celdas_municipio(df, 'punt_global')
+
+def generar_barras_brecha_error(df, municipio, celdas=None):
+    import plotly.express as px
+    dff = df
     
     # Si seleccionamos 'TODOS', mostramos el top 10 municipios con la brecha más grande
     if municipio == 'TODOS':
@@ -162,19 +177,22 @@ def generar_barras_brecha_error(df, municipio):
         titulo = "Top 10 Municipios con Mayor Brecha (Promedio y Desviación)"
         x_col = 'cole_mcpio_ubicacion'
         
-    # Si seleccionamos un municipio específico, comparamos con el promedio departamental
+    # Si seleccionamos un municipio específico, lo comparamos con sus municipios
+    # vecinos y con el promedio departamental (sumando celdas por municipio y zona)
     else:
-        # Calcular promedio departamental
-        dpto_promedio = df.groupby('Area')['punt_global'].agg(['mean', 'std']).reset_index()
-        dpto_promedio['cole_mcpio_ubicacion'] = 'PROMEDIO ANTIOQUIA'
-        
-        # Calcular promedio del municipio
-        mpio_promedio = dff[dff['cole_mcpio_ubicacion'] == municipio].groupby('Area')['punt_global'].agg(['mean', 'std']).reset_index()
-        mpio_promedio['cole_mcpio_ubicacion'] = municipio
-        
-        # Unir ambos
-        dff_plot = pd.concat([mpio_promedio, dpto_promedio])
-        titulo = f"Comparación Local vs Departamental ({municipio})"
+        if celdas is None:
+            celdas = celdas_vecinos(df)
+        cercanos = vecinos.indice(df.attrs.get('ruta_coordenadas', vecinos.RUTA_COORDENADAS)).k_vecinos(municipio)
+        etiqueta_vecinos = f"VECINOS ({len(cercanos)}, ≤ {cercanos[-1][1]:.0f} km)" if cercanos else None
+
+        dff_plot = pd.concat([
+            vecinos.estadisticas_grupo(celdas, [municipio], municipio),
+            vecinos.estadisticas_grupo(celdas, [m for m, _ in cercanos], etiqueta_vecinos)
+            if cercanos else None,
+            vecinos.estadisticas_grupo(
+                celdas, None, f"PROMEDIO {df.attrs.get('departamento', departamentos.DEPARTAMENTO_DEFECTO).upper()}"),
+        ])
+        titulo = f"Comparación Local vs Vecinos vs Departamental ({municipio})"
         x_col = 'cole_mcpio_ubicacion'
 
     # Generar la gráfica de barras con barras de error
@@ -192,25 +210,32 @@ def generar_barras_brecha_error(df, municipio):
     fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
     return fig
 
-def generar_mapa_pib_puntaje(df, municipio):
-    dff = df.copy()
-    
+def generar_mapa_pib_puntaje_base(df):
+    import plotly.express as px
     # Agrupamos por municipio para obtener el promedio del puntaje global y mantener el PIB y coordenadas
-    df_mapa = dff.groupby(['cole_mcpio_ubicacion', 'lat', 'lon']).agg(
+    df_mapa = df.groupby(['cole_mcpio_ubicacion', 'lat', 'lon']).agg(
         punt_global=('punt_global', 'mean'),
         pib=('PIB miles de millones', 'first') # El PIB es igual para todo el municipio
     ).reset_index()
     
     min_puntaje = df_mapa['punt_global'].min()
     max_puntaje = df_mapa['punt_global'].max()
+    encuadre = departamentos.encuadre(df_mapa['lat'], df_mapa['lon'])
     
-    # Lógica para resaltar el municipio seleccionado (igual que en tu P3)
-    if municipio != 'TODOS':
-        df_mapa['opacidad'] = df_mapa['cole_mcpio_ubicacion'].apply(lambda x: 1.0 if x == municipio else 0.15)
-        df_mapa['tamano'] = df_mapa['cole_mcpio_ubicacion'].apply(lambda x: 15 if x == municipio else 5)
-    else:
-        df_mapa['opacidad'] = 0.8
-        df_mapa['tamano'] = 8
+    # Con los límites municipales construidos, el mapa es coroplético
+    if geometrias.disponible(df_mapa['cole_mcpio_ubicacion']):
+        fig = geometrias.figura_coropletica(
+            df_mapa, 'punt_global', 'Viridis', [min_puntaje, max_puntaje],
+            ESTILO_MAPA_P1['titulo'].format(municipio='TODOS'),
+            etiqueta='Puntaje Global Prom.', hover_data={'pib': ':.2f'},
+            etiquetas={'pib': 'PIB (Miles de Millones)'},
+            zoom=encuadre['zoom'], centro=encuadre['centro']
+        )
+        return fig.update_traces(marker_opacity=ESTILO_MAPA_P1['op_todos'])
+
+    # Mapa base sin municipio resaltado: el resaltado se aplica después
+    # (en el navegador con assets/mapas.js o con mapas.resaltar_municipio)
+    df_mapa['tamano'] = ESTILO_MAPA_P1['tam_todos']
 
     # Crear el mapa interactivo
     fig = px.scatter_mapbox(
@@ -224,21 +249,34 @@ def generar_mapa_pib_puntaje(df, municipio):
             'pib': ':.2f',         # Mostrar PIB con 2 decimales
             'lat': False,          # Ocultar lat/lon del tooltip para mayor limpieza
             'lon': False,
-            'tamano': False,
-            'opacidad': False
+            'tamano': False
         },
         labels={'punt_global': 'Puntaje Global Prom.', 'pib': 'PIB (Miles de Millones)'},
         color_continuous_scale='Viridis',
         range_color=[min_puntaje, max_puntaje],
         mapbox_style='carto-positron',
-        zoom=6.0,
-        center={"lat": 6.2518, "lon": -75.5636}, # Centro aproximado de Antioquia
-        title=f'Mapa Espacial: Puntaje Global y PIB ({municipio})',
+        zoom=encuadre['zoom'],
+        center=encuadre['centro'], # Centro de los municipios del departamento
+        title=ESTILO_MAPA_P1['titulo'].format(municipio='TODOS'),
         size='tamano',
-        size_max=15
+        size_max=ESTILO_MAPA_P1['size_max']
     )
     
-    fig.update_traces(marker=dict(opacity=df_mapa['opacidad']))
+    fig.update_traces(marker=dict(opacity=ESTILO_MAPA_P1['op_todos']))
     fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
     
-    return fig
\ No newline at end of file
+    return fig
+
+def generar_mapa_pib_puntaje(df, municipio):
+    return resaltar_municipio(generar_mapa_pib_puntaje_base(df), municipio, ESTILO_MAPA_P1)
+
+def construir_tablero_p1(df, municipio, progreso=None, grado=None, celdas=None):
+    # Salidas del callback del tablero (boxplot, barras, texto) construidas a la
+    # vez (ver Analysis/paralelo.py); `progreso(hecho, total)` permite reportar
+    # avance desde callbacks en segundo plano y `celdas` son las de `celdas_vecinos`
+    tareas = [
+        (generar_boxplot_brecha, df, municipio),
+        (generar_barras_brecha_error, df, municipio, celdas),
+        (calcular_estadisticas_brecha, df, municipio),
+    ]
+    return tuple(paralelo.construir(tareas, grado, progreso=progreso))
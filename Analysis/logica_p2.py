@@ -1,17 +1,20 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 import os
 
+from Analysis import departamentos, geometrias
+from Analysis.mapas import ESTILO_MAPA_P2, resaltar_municipio
+
 
 # CARGA DE DATOS
-def cargar_datos(path="data/saber11_Antioquia_clean.csv"):
+def cargar_datos(path="Data/saber11_Antioquia_clean.csv", ruta_coordenadas="Data/municipios_unicos.csv",
+                 departamento="Antioquia"):
     base_path = os.path.dirname(__file__)
     full_path = os.path.join(base_path, "..", path)
     full_path = os.path.abspath(full_path)
 
-    df = pd.read_csv(full_path)
+    df = departamentos.leer_dataset(full_path)
 
     # Renombrar naturaleza del colegio para claridad
     df["cole_naturaleza"] = df["cole_naturaleza"].replace({
@@ -20,10 +23,16 @@ def cargar_datos(path="data/saber11_Antioquia_clean.csv"):
     })
 
     # Merge con coordenadas geograficas para el mapa
-    coord_path = os.path.join(base_path, "..", "data", "municipios_unicos.csv")
+    coord_path = os.path.join(base_path, "..", ruta_coordenadas)
     coord_path = os.path.abspath(coord_path)
     df_coord = pd.read_csv(coord_path)
     df = pd.merge(df, df_coord, on="cole_mcpio_ubicacion", how="left")
+    df.attrs.update(departamento=departamento, ruta_coordenadas=coord_path)
+
+    # Estrato normalizado una sola vez para todas las agregaciones
+    col_estrato = _columna_estrato(df)
+    if col_estrato:
+        df["estrato_clean"] = normalizar_estrato(df[col_estrato])
 
     return df
 
@@ -39,6 +48,37 @@ MATERIAS = {
 }
 
 
+# ESTRATO SOCIOECONOMICO
+# Columnas candidatas y normalizacion a "Estrato X" / "Sin Estrato"
+COLUMNAS_ESTRATO = ["fami_estratovivienda", "estu_estrato", "estrato"]
+
+MAPEO_ESTRATO = {
+    "1": "Estrato 1", "2": "Estrato 2", "3": "Estrato 3",
+    "4": "Estrato 4", "5": "Estrato 5", "6": "Estrato 6",
+    "Estrato 1": "Estrato 1", "Estrato 2": "Estrato 2",
+    "Estrato 3": "Estrato 3", "Estrato 4": "Estrato 4",
+    "Estrato 5": "Estrato 5", "Estrato 6": "Estrato 6",
+    "Sin Estrato": "Sin Estrato"
+}
+
+ORDEN_ESTRATOS = [
+    "Estrato 1", "Estrato 2", "Estrato 3",
+    "Estrato 4", "Estrato 5", "Estrato 6", "Sin Estrato"
+]
+
+
+def _columna_estrato(df):
+    for c in COLUMNAS_ESTRATO:
+        if c in df.columns:
+            return c
+    return None
+
+
+# Valores fuera del mapeo (vacios, "SIN INFORMACION") quedan como NaN
+def normalizar_estrato(serie):
+    return serie.astype(str).str.strip().map(MAPEO_ESTRATO)
+
+
 # CONSTANTES DE FORMATO
 FONT_FAMILY = "Segoe UI, Arial, sans-serif"
 COLOR_PUBLICO = "#1f77b4"
@@ -102,14 +142,19 @@ def _layout_base(fig, title, subtitle=None, height=500,
 
 
 # FILTRAR DATOS
-# Filtra por municipio y lista de periodos
+# Filtra por municipio y lista de periodos con una sola mascara. Sin filtro
+# devuelve una copia superficial: no copia los datos, pero agregar columnas
+# al resultado no modifica el DataFrame compartido de la versión
 def filtrar_datos(df, municipio="Todos", periodo=None):
-    df = df.copy()
+    mascara = None
     if municipio != "Todos":
-        df = df[df["cole_mcpio_ubicacion"] == municipio]
+        mascara = (df["cole_mcpio_ubicacion"] == municipio).to_numpy()
     if periodo:
-        df = df[df["periodo"].isin(periodo)]
-    return df
+        en_periodo = df["periodo"].isin(periodo).to_numpy()
+        mascara = en_periodo if mascara is None else mascara & en_periodo
+    if mascara is None:
+        return df.copy(deep=False)
+    return df[mascara]
 
 
 # CALCULAR BRECHAS
@@ -138,6 +183,208 @@ def calcular_brechas(df):
     return brechas
 
 
+# RESUMEN DE UNA PORCION DE DATOS
+# Una sola pasada de agregacion sobre la porcion filtrada alimenta las
+# tarjetas de brecha, los boxplots, la grafica por estrato y el mapa.
+# Las celdas guardan conteo y suma por (municipio, estrato, naturaleza) para
+# cada materia; los boxplots usan cuartiles y bigotes ya calculados.
+CLAVES_CELDA = ["cole_mcpio_ubicacion", "lat", "lon", "estrato_clean", "cole_naturaleza"]
+
+
+def _estadisticas_caja(df_nat):
+    # Cuartiles y bigotes (dato mas extremo dentro de 1.5 * IQR), como plotly
+    q = df_nat.quantile([0.25, 0.5, 0.75])
+    q1, mediana, q3 = q.loc[0.25], q.loc[0.5], q.loc[0.75]
+    iqr = q3 - q1
+    inferior = df_nat.where(df_nat >= q1 - 1.5 * iqr).min()
+    superior = df_nat.where(df_nat <= q3 + 1.5 * iqr).max()
+    return pd.DataFrame({
+        "n": df_nat.count(), "q1": q1, "mediana": mediana, "q3": q3,
+        "inferior": inferior, "superior": superior
+    })
+
+
+def resumir_datos(df, cajas=True):
+    columnas = [c for c in MATERIAS.values() if c in df.columns]
+
+    faltantes = {}
+    if "estrato_clean" not in df.columns:
+        col_estrato = _columna_estrato(df)
+        faltantes["estrato_clean"] = normalizar_estrato(df[col_estrato]) if col_estrato else np.nan
+    for c in ("lat", "lon"):
+        if c not in df.columns:
+            faltantes[c] = np.nan
+    if faltantes:
+        df = df.assign(**faltantes)
+
+    grupos = df.groupby(CLAVES_CELDA, dropna=False, observed=True, sort=False)[columnas]
+
+    resumen = {
+        "vacio": df.empty,
+        "tiene_estrato": df["estrato_clean"].notna().any(),
+        "conteos": grupos.count(),
+        "sumas": grupos.sum(),
+        "cajas": {},
+    }
+    if cajas:
+        for naturaleza in ("Público", "Privado"):
+            df_nat = df.loc[df["cole_naturaleza"] == naturaleza, columnas]
+            resumen["cajas"][naturaleza] = _estadisticas_caja(df_nat)
+    return resumen
+
+
+# Filtra y resume en un paso (lo usan la pagina y el precalentamiento del cache)
+def resumir_porcion(df, municipio, periodos_seleccionados):
+    df_filtrado = filtrar_datos(df, municipio=municipio, periodo=list(periodos_seleccionados))
+    return resumir_datos(df_filtrado)
+
+
+# Suma las celdas del resumen sobre los niveles indicados y retorna n y media
+def agregar_resumen(resumen, niveles, columna):
+    conteo = resumen["conteos"][columna].groupby(level=niveles).sum()
+    suma = resumen["sumas"][columna].groupby(level=niveles).sum()
+    medias = pd.DataFrame({"n": conteo, "media": suma / conteo})
+    return medias[medias["n"] > 0]
+
+
+def calcular_brechas_desde_resumen(resumen):
+    brechas = {}
+    for nombre, col in MATERIAS.items():
+        medias = pd.Series(dtype=float)
+        if col in resumen["conteos"].columns:
+            medias = agregar_resumen(resumen, "cole_naturaleza", col)["media"]
+        if "Público" in medias.index and "Privado" in medias.index:
+            media_pub = medias["Público"]
+            media_priv = medias["Privado"]
+            brechas[nombre] = {
+                "brecha": round(media_priv - media_pub, 1),
+                "media_publico": round(media_pub, 1),
+                "media_privado": round(media_priv, 1)
+            }
+        else:
+            brechas[nombre] = {
+                "brecha": None,
+                "media_publico": None,
+                "media_privado": None
+            }
+    return brechas
+
+
+# BRECHA AJUSTADA POR ESTRATO
+# La brecha cruda mezcla la diferencia entre sectores con la diferencia de
+# estratos (los privados tienen mas estudiantes de estratos altos). Se
+# estima tambien la brecha dentro de cada estrato, con dos resumenes:
+# - estandarizacion directa: brechas por estrato ponderadas por la
+#   distribucion de estratos de todos los estudiantes (publicos y privados);
+# - intra estrato: promedio de las brechas por estrato ponderado por su
+#   precision (inverso de la varianza), con el menor error estandar.
+# Solo entran los estratos con al menos 2 estudiantes en cada sector.
+# Todo sale de celdas de conteo, suma y suma de cuadrados por (municipio,
+# periodo, estrato, naturaleza), construidas una vez al cargar los datos:
+# cualquier filtro es una suma de celdas, sin volver a las filas.
+CLAVES_BRECHA = ["cole_mcpio_ubicacion", "periodo", "estrato_clean", "cole_naturaleza"]
+NATURALEZAS = ["Público", "Privado"]
+
+
+def construir_celdas_brecha(df):
+    columnas = [c for c in MATERIAS.values() if c in df.columns]
+    if "estrato_clean" not in df.columns:
+        col_estrato = _columna_estrato(df)
+        df = df.assign(estrato_clean=normalizar_estrato(df[col_estrato]) if col_estrato else np.nan)
+    valores = df[columnas]
+    marco = pd.concat([
+        df[CLAVES_BRECHA],
+        valores.notna().astype("int64").add_prefix("n_"),
+        valores.add_prefix("suma_"),
+        (valores ** 2).add_prefix("suma2_"),
+    ], axis=1)
+    return marco.groupby(CLAVES_BRECHA, observed=True, dropna=False).sum()
+
+
+def filtrar_celdas(celdas, municipio="Todos", periodos=None):
+    mascara = np.ones(len(celdas), dtype=bool)
+    if municipio != "Todos":
+        mascara &= celdas.index.get_level_values("cole_mcpio_ubicacion") == municipio
+    if periodos:
+        mascara &= celdas.index.get_level_values("periodo").isin(list(periodos))
+    return celdas[mascara]
+
+
+def _media_varianza(n, suma, suma2):
+    # Varianza muestral desde los momentos; las restas pueden dar negativos minimos
+    media = suma / n
+    varianza = (suma2 - n * media ** 2) / (n - 1)
+    return media, np.maximum(varianza, 0)
+
+
+def _brecha_materia(por_estrato, por_naturaleza, col):
+    vacia = {
+        "brecha": None, "media_publico": None, "media_privado": None, "ee_brecha": None,
+        "brecha_ajustada": None, "ee_ajustada": None, "brecha_intra": None, "ee_intra": None,
+        "estratos": 0, "cobertura": None,
+    }
+    if f"n_{col}" not in por_naturaleza.columns:
+        return vacia
+    totales = por_naturaleza.reindex(NATURALEZAS)[[f"n_{col}", f"suma_{col}", f"suma2_{col}"]].fillna(0)
+    n, suma, suma2 = (totales[c].to_numpy(dtype=float) for c in totales.columns)
+    if (n == 0).any():
+        return vacia
+
+    media = suma / n
+    resultado = dict(vacia)
+    resultado.update({
+        "brecha": round(media[1] - media[0], 1),
+        "media_publico": round(media[0], 1),
+        "media_privado": round(media[1], 1),
+    })
+    if (n < 2).any():
+        return resultado
+    _, varianza = _media_varianza(n, suma, suma2)
+    resultado["ee_brecha"] = round(float(np.sqrt((varianza / n).sum())), 2)
+
+    # Matrices estrato x naturaleza
+    def _matriz(prefijo):
+        return (por_estrato[f"{prefijo}_{col}"].unstack("cole_naturaleza")
+                .reindex(columns=NATURALEZAS).fillna(0).to_numpy(dtype=float))
+
+    n_s, suma_s, suma2_s = _matriz("n"), _matriz("suma"), _matriz("suma2")
+    comunes = (n_s >= 2).all(axis=1)
+    if not comunes.any():
+        return resultado
+    n_s, suma_s, suma2_s = n_s[comunes], suma_s[comunes], suma2_s[comunes]
+    media_s, varianza_s = _media_varianza(n_s, suma_s, suma2_s)
+    diferencia = media_s[:, 1] - media_s[:, 0]
+    varianza_dif = (varianza_s / n_s).sum(axis=1)
+
+    pesos = n_s.sum(axis=1) / n_s.sum()
+    resultado.update({
+        "brecha_ajustada": round(float(pesos @ diferencia), 1),
+        "ee_ajustada": round(float(np.sqrt(pesos ** 2 @ varianza_dif)), 2),
+        "estratos": int(comunes.sum()),
+        "cobertura": round(float(n_s.sum() / n.sum()), 3),
+    })
+
+    precision = varianza_dif > 0
+    if precision.any():
+        inversa = 1 / varianza_dif[precision]
+        resultado.update({
+            "brecha_intra": round(float(inversa @ diferencia[precision] / inversa.sum()), 1),
+            "ee_intra": round(float(np.sqrt(1 / inversa.sum())), 2),
+        })
+    return resultado
+
+
+def calcular_brechas_ajustadas(celdas, municipio="Todos", periodos=None):
+    """Brecha cruda y ajustada por estrato (con errores estandar) de cada
+    materia de `MATERIAS`, a partir de `construir_celdas_brecha`.
+    """
+    porcion = filtrar_celdas(celdas, municipio, periodos)
+    # Las celdas sin estrato cuentan en la brecha cruda pero no en las ajustadas
+    por_estrato = porcion.groupby(level=["estrato_clean", "cole_naturaleza"], observed=True).sum()
+    por_naturaleza = porcion.groupby(level="cole_naturaleza", observed=True).sum()
+    return {nombre: _brecha_materia(por_estrato, por_naturaleza, col) for nombre, col in MATERIAS.items()}
+
+
 # BOXPLOTS POR MATERIA
 # Grid de 2x3 boxplots comparando publico vs privado en cada materia
 def generar_boxplots_materias(df):
@@ -145,6 +392,34 @@ def generar_boxplots_materias(df):
     if df.empty:
         return go.Figure().update_layout(title="No hay datos disponibles")
 
+    return generar_boxplots_desde_resumen(resumir_datos(df))
+
+
+# Las cajas se dibujan con estadisticas precalculadas (q1, mediana, q3 y
+# bigotes), asi la figura no transporta el vector completo de puntajes
+def _caja(resumen, naturaleza, col, color, showlegend):
+    caja = resumen["cajas"].get(naturaleza)
+    if caja is None or col not in caja.index or caja.loc[col, "n"] == 0:
+        return go.Box(x=[], name=naturaleza, marker_color=color,
+                      showlegend=showlegend, legendgroup=naturaleza)
+    fila = caja.loc[col]
+    return go.Box(
+        x=[naturaleza],
+        q1=[fila["q1"]], median=[fila["mediana"]], q3=[fila["q3"]],
+        lowerfence=[fila["inferior"]], upperfence=[fila["superior"]],
+        name=naturaleza,
+        marker_color=color,
+        showlegend=showlegend,
+        legendgroup=naturaleza
+    )
+
+
+def generar_boxplots_desde_resumen(resumen):
+    from plotly.subplots import make_subplots
+
+    if resumen["vacio"]:
+        return go.Figure().update_layout(title="No hay datos disponibles")
+
     nombres = list(MATERIAS.keys())
     fig = make_subplots(
         rows=2, cols=3,
@@ -157,30 +432,14 @@ def generar_boxplots_materias(df):
         row = 1 if i <= 3 else 2
         col_idx = i if i <= 3 else i - 3
 
-        df_temp = df[[col, "cole_naturaleza"]].dropna()
-        public = df_temp[df_temp["cole_naturaleza"] == "Público"][col]
-        private = df_temp[df_temp["cole_naturaleza"] == "Privado"][col]
-
         # Solo mostrar leyenda en el primer subplot para no repetir
         fig.add_trace(
-            go.Box(
-                y=public,
-                name="Público",
-                marker_color=COLOR_PUBLICO,
-                showlegend=(i == 1),
-                legendgroup="Público"
-            ),
+            _caja(resumen, "Público", col, COLOR_PUBLICO, showlegend=(i == 1)),
             row=row, col=col_idx
         )
 
         fig.add_trace(
-            go.Box(
-                y=private,
-                name="Privado",
-                marker_color=COLOR_PRIVADO,
-                showlegend=(i == 1),
-                legendgroup="Privado"
-            ),
+            _caja(resumen, "Privado", col, COLOR_PRIVADO, showlegend=(i == 1)),
             row=row, col=col_idx
         )
 
@@ -212,28 +471,33 @@ def formato_periodo(p):
 
 
 # MAPA DE BRECHA POR MUNICIPIO
-# Scatter map donde cada punto es un municipio coloreado segun la brecha
-def generar_mapa_brecha(df, columna_materia, municipio_seleccionado="Todos"):
+# Scatter map donde cada punto es un municipio coloreado segun la brecha, o
+# coropletico si estan construidos los limites (Analysis/geometrias.py).
+# El mapa base no depende del municipio seleccionado: el resaltado se aplica
+# en el navegador (assets/mapas.js) con el estilo de estilo_mapa_brecha
+def generar_mapa_brecha_base(df, columna_materia):
 
     if df.empty or columna_materia not in df.columns:
         return go.Figure().update_layout(title="No hay datos disponibles")
 
-    df_temp = df[["cole_mcpio_ubicacion", "lat", "lon", columna_materia, "cole_naturaleza"]].dropna()
+    return generar_mapa_brecha_desde_resumen(resumir_datos(df, cajas=False), columna_materia)
+
+
+def generar_mapa_brecha_desde_resumen(resumen, columna_materia):
 
-    if df_temp.empty:
+    if resumen["vacio"] or columna_materia not in resumen["conteos"].columns:
         return go.Figure().update_layout(title="No hay datos disponibles")
 
-    # Promedios por municipio y tipo de colegio
-    medias = df_temp.groupby(
-        ["cole_mcpio_ubicacion", "lat", "lon", "cole_naturaleza"]
-    )[columna_materia].mean().reset_index()
+    # Promedios por municipio y tipo de colegio (celdas sin coordenadas se descartan)
+    medias = agregar_resumen(
+        resumen, ["cole_mcpio_ubicacion", "lat", "lon", "cole_naturaleza"], columna_materia
+    )
+
+    if medias.empty:
+        return go.Figure().update_layout(title="No hay datos disponibles")
 
     # Pivotar para tener publico y privado en columnas separadas
-    pivot = medias.pivot_table(
-        index=["cole_mcpio_ubicacion", "lat", "lon"],
-        columns="cole_naturaleza",
-        values=columna_materia
-    ).reset_index()
+    pivot = medias["media"].unstack("cole_naturaleza").reset_index()
 
     if "Privado" in pivot.columns and "Público" in pivot.columns:
         pivot["brecha"] = (pivot["Privado"] - pivot["Público"]).round(1)
@@ -244,31 +508,21 @@ def generar_mapa_brecha(df, columna_materia, municipio_seleccionado="Todos"):
         color_label = "Brecha (Priv - Púb)"
     else:
         # Si solo hay un tipo de colegio, mostrar promedio general
-        agg = df_temp.groupby(
-            ["cole_mcpio_ubicacion", "lat", "lon"]
-        )[columna_materia].mean().reset_index()
+        agg = agregar_resumen(
+            resumen, ["cole_mcpio_ubicacion", "lat", "lon"], columna_materia
+        )["media"].rename("promedio").reset_index()
         pivot = pivot.merge(agg, on=["cole_mcpio_ubicacion", "lat", "lon"], how="left")
-        pivot.rename(columns={columna_materia: "promedio"}, inplace=True)
         color_col = "promedio"
         color_label = "Puntaje promedio"
 
     if pivot.empty:
         return go.Figure().update_layout(title="No hay datos suficientes")
 
-    # Resaltar municipio seleccionado, atenuar el resto
-    if municipio_seleccionado != "Todos":
-        pivot["tamano"] = pivot["cole_mcpio_ubicacion"].apply(
-            lambda x: 18 if x == municipio_seleccionado else 6
-        )
-        pivot["opacidad"] = pivot["cole_mcpio_ubicacion"].apply(
-            lambda x: 1.0 if x == municipio_seleccionado else 0.15
-        )
-    else:
-        pivot["tamano"] = 10
-        pivot["opacidad"] = 0.85
+    return _figura_mapa_brecha(pivot, color_col, color_label, columna_materia)
 
-    nombre_materia = [k for k, v in MATERIAS.items() if v == columna_materia]
-    nombre_materia = nombre_materia[0] if nombre_materia else columna_materia
+
+def _figura_mapa_brecha(pivot, color_col, color_label, columna_materia):
+    pivot["tamano"] = ESTILO_MAPA_P2["tam_todos"]
 
     # Escala simetrica centrada en 0
     max_abs = max(abs(pivot[color_col].min()), abs(pivot[color_col].max()))
@@ -280,7 +534,6 @@ def generar_mapa_brecha(df, columna_materia, municipio_seleccionado="Todos"):
         "lat": False,
         "lon": False,
         "tamano": False,
-        "opacidad": False,
         color_col: ":.1f",
     }
     if "media_pub" in pivot.columns:
@@ -288,37 +541,28 @@ def generar_mapa_brecha(df, columna_materia, municipio_seleccionado="Todos"):
     if "media_priv" in pivot.columns:
         hover_data_dict["media_priv"] = ":.1f"
 
-    fig = px.scatter_mapbox(
-        pivot,
-        lat="lat",
-        lon="lon",
-        color=color_col,
-        hover_name="cole_mcpio_ubicacion",
-        hover_data=hover_data_dict,
-        color_continuous_scale=[
-            [0, "#2166ac"],
-            [0.5, "#f7f7f7"],
-            [1, "#b2182b"]
-        ],
-        range_color=[-max_abs, max_abs],
-        size="tamano",
-        size_max=18,
-        mapbox_style="carto-positron",
-        zoom=6.0,
-        center={"lat": 6.85, "lon": -75.56},
-    )
-
-    fig.update_traces(marker=dict(opacity=pivot["opacidad"].tolist()))
-
-    filtro_label = municipio_seleccionado if municipio_seleccionado != "Todos" else "Todos los municipios"
+    escala = [
+        [0, "#2166ac"],
+        [0.5, "#f7f7f7"],
+        [1, "#b2182b"]
+    ]
+    estilo = estilo_mapa_brecha(columna_materia)
+    titulo = estilo["titulo"].format(municipio=estilo["etiqueta_todos"])
+    encuadre = departamentos.encuadre(pivot["lat"], pivot["lon"])
+
+    if geometrias.disponible(pivot["cole_mcpio_ubicacion"]):
+        hover = {c: ":.1f" for c in ("media_pub", "media_priv") if c in pivot.columns}
+        fig = geometrias.figura_coropletica(
+            pivot, color_col, escala, [-max_abs, max_abs], titulo, etiqueta=color_label,
+            hover_data=hover, zoom=encuadre["zoom"], centro=encuadre["centro"]
+        )
+        fig.update_traces(marker_opacity=ESTILO_MAPA_P2["op_todos"])
+    else:
+        fig = _puntos_mapa_brecha(pivot, color_col, escala, max_abs, hover_data_dict, encuadre)
 
     fig.update_layout(
         title=dict(
-            text=(
-                f"<b>Brecha educativa por municipio — {nombre_materia}</b>"
-                f"<br><span style='font-size:12px;color:#666'>"
-                f"Filtro: {filtro_label} | Azul: público supera | Rojo: privado supera</span>"
-            ),
+            text=titulo,
             x=0.5,
             xanchor="center",
             font=dict(size=16, family=FONT_FAMILY, color="#222")
@@ -335,6 +579,47 @@ def generar_mapa_brecha(df, columna_materia, municipio_seleccionado="Todos"):
     return fig
 
 
+def _puntos_mapa_brecha(pivot, color_col, escala, max_abs, hover_data_dict, encuadre):
+    import plotly.express as px
+
+    fig = px.scatter_mapbox(
+        pivot,
+        lat="lat",
+        lon="lon",
+        color=color_col,
+        hover_name="cole_mcpio_ubicacion",
+        hover_data=hover_data_dict,
+        color_continuous_scale=escala,
+        range_color=[-max_abs, max_abs],
+        size="tamano",
+        size_max=ESTILO_MAPA_P2["size_max"],
+        mapbox_style="carto-positron",
+        zoom=encuadre["zoom"],
+        center=encuadre["centro"],
+    )
+
+    return fig.update_traces(marker=dict(opacity=ESTILO_MAPA_P2["op_todos"]))
+
+
+# Estilo de resaltado del mapa de brecha, con el titulo de la materia
+def estilo_mapa_brecha(columna_materia):
+    nombre_materia = [k for k, v in MATERIAS.items() if v == columna_materia]
+    nombre_materia = nombre_materia[0] if nombre_materia else columna_materia
+
+    estilo = dict(ESTILO_MAPA_P2)
+    estilo["titulo"] = (
+        f"<b>Brecha educativa por municipio — {nombre_materia}</b>"
+        f"<br><span style='font-size:12px;color:#666'>"
+        f"Filtro: {{municipio}} | Azul: público supera | Rojo: privado supera</span>"
+    )
+    return estilo
+
+
+def generar_mapa_brecha(df, columna_materia, municipio_seleccionado="Todos"):
+    fig = generar_mapa_brecha_base(df, columna_materia)
+    return resaltar_municipio(fig, municipio_seleccionado, estilo_mapa_brecha(columna_materia))
+
+
 # BRECHA POR ESTRATO SOCIOECONOMICO
 # Barras agrupadas publico vs privado por cada estrato
 def generar_brecha_por_estrato(df, columna_materia):
@@ -342,57 +627,34 @@ def generar_brecha_por_estrato(df, columna_materia):
     if df.empty or columna_materia not in df.columns:
         return go.Figure().update_layout(title="No hay datos disponibles")
 
-    # Detectar la columna de estrato en el dataset
-    col_estrato = None
-    for c in ["fami_estratovivienda", "estu_estrato", "estrato"]:
-        if c in df.columns:
-            col_estrato = c
-            break
-
-    if col_estrato is None:
+    if "estrato_clean" not in df.columns and _columna_estrato(df) is None:
         return go.Figure().update_layout(
             title="No se encontró variable de estrato en los datos"
         )
 
-    df_temp = df[[col_estrato, columna_materia, "cole_naturaleza"]].dropna()
+    return generar_brecha_por_estrato_desde_resumen(resumir_datos(df, cajas=False), columna_materia)
+
 
-    if df_temp.empty:
+def generar_brecha_por_estrato_desde_resumen(resumen, columna_materia):
+
+    if resumen["vacio"] or columna_materia not in resumen["conteos"].columns:
         return go.Figure().update_layout(title="No hay datos disponibles")
 
-    df_temp[col_estrato] = df_temp[col_estrato].astype(str).str.strip()
+    if not resumen["tiene_estrato"]:
+        return go.Figure().update_layout(title="No hay datos de estrato válidos")
 
-    # Filtrar solo valores de estrato validos
-    valores_validos = [
-        "Estrato 1", "Estrato 2", "Estrato 3",
-        "Estrato 4", "Estrato 5", "Estrato 6",
-        "1", "2", "3", "4", "5", "6", "Sin Estrato"
-    ]
-    df_temp = df_temp[df_temp[col_estrato].isin(valores_validos)]
+    # Promedios agrupados por estrato y tipo de colegio
+    medias = agregar_resumen(
+        resumen, ["estrato_clean", "cole_naturaleza"], columna_materia
+    )["media"].rename(columna_materia).reset_index()
 
-    if df_temp.empty:
+    if medias.empty:
         return go.Figure().update_layout(title="No hay datos de estrato válidos")
 
-    # Normalizar nombres para que todos digan "Estrato X"
-    mapeo_estrato = {
-        "1": "Estrato 1", "2": "Estrato 2", "3": "Estrato 3",
-        "4": "Estrato 4", "5": "Estrato 5", "6": "Estrato 6",
-        "Estrato 1": "Estrato 1", "Estrato 2": "Estrato 2",
-        "Estrato 3": "Estrato 3", "Estrato 4": "Estrato 4",
-        "Estrato 5": "Estrato 5", "Estrato 6": "Estrato 6",
-        "Sin Estrato": "Sin Estrato"
-    }
-    df_temp["estrato_clean"] = df_temp[col_estrato].map(mapeo_estrato)
-    df_temp = df_temp.dropna(subset=["estrato_clean"])
+    return _figura_brecha_estrato(medias, columna_materia)
 
-    orden_estratos = [
-        "Estrato 1", "Estrato 2", "Estrato 3",
-        "Estrato 4", "Estrato 5", "Estrato 6", "Sin Estrato"
-    ]
 
-    # Promedios agrupados por estrato y tipo de colegio
-    medias = df_temp.groupby(
-        ["estrato_clean", "cole_naturaleza"]
-    )[columna_materia].mean().reset_index()
+def _figura_brecha_estrato(medias, columna_materia):
 
     nombre_materia = [k for k, v in MATERIAS.items() if v == columna_materia]
     nombre_materia = nombre_materia[0] if nombre_materia else columna_materia
@@ -402,7 +664,7 @@ def generar_brecha_por_estrato(df, columna_materia):
     # Barras de colegios publicos
     pub = medias[medias["cole_naturaleza"] == "Público"].copy()
     pub["estrato_clean"] = pd.Categorical(
-        pub["estrato_clean"], categories=orden_estratos, ordered=True
+        pub["estrato_clean"], categories=ORDEN_ESTRATOS, ordered=True
     )
     pub = pub.sort_values("estrato_clean")
 
@@ -420,7 +682,7 @@ def generar_brecha_por_estrato(df, columna_materia):
     # Barras de colegios privados
     priv = medias[medias["cole_naturaleza"] == "Privado"].copy()
     priv["estrato_clean"] = pd.Categorical(
-        priv["estrato_clean"], categories=orden_estratos, ordered=True
+        priv["estrato_clean"], categories=ORDEN_ESTRATOS, ordered=True
     )
     priv = priv.sort_values("estrato_clean")
 
@@ -439,10 +701,9 @@ def generar_brecha_por_estrato(df, columna_materia):
         barmode="group",
         xaxis=dict(
             categoryorder="array",
-            categoryarray=orden_estratos,
+            categoryarray=ORDEN_ESTRATOS,
         ),
     )
-
     _layout_base(
         fig,
         title=f"Puntaje promedio por estrato — {nombre_materia}",
@@ -1,19 +1,22 @@
+import math
+import weakref
+from statistics import NormalDist
+
 import pandas as pd
-import plotly.express as px
+from Analysis import departamentos, geometrias, paralelo, vecinos
+from Analysis.mapas import ESTILO_MAPA_P3, resaltar_municipio
+from Analysis.series_tiempo import acceso_tic, construir_series, serie
 
-def cargar_datos_p3():
-    df = pd.read_csv('Data/saber11_Antioquia_clean.csv', dtype={'cole_cod_mcpio_ubicacion': str})
+def cargar_datos_p3(path='Data/saber11_Antioquia_clean.csv', ruta_coordenadas='Data/municipios_unicos.csv',
+                    departamento='Antioquia'):
+    df = departamentos.leer_dataset(path, dtype={'cole_cod_mcpio_ubicacion': str})
     df['cole_mcpio_ubicacion'] = df['cole_mcpio_ubicacion'].str.upper().str.strip()
     
-    df['Acceso_TIC'] = df.apply(
-        lambda x: 'Internet y Computador' if x['fami_tieneinternet'] == 'Si' and x['fami_tienecomputador'] == 'Si'
-        else ('Solo Internet' if x['fami_tieneinternet'] == 'Si'
-              else ('Solo Computador' if x['fami_tienecomputador'] == 'Si' else 'Sin Acceso TIC')),
-        axis=1
-    )
+    df['Acceso_TIC'] = acceso_tic(df)
     
-    df_coord = pd.read_csv('Data/municipios_unicos.csv')
+    df_coord = pd.read_csv(ruta_coordenadas)
     df = pd.merge(df, df_coord, on='cole_mcpio_ubicacion', how='left')
+    df.attrs.update(departamento=departamento, ruta_coordenadas=ruta_coordenadas)
     
     return df
 
@@ -22,19 +25,23 @@ def obtener_lista_municipios(df):
     municipios.sort()
     return ['TODOS'] + municipios
 
-def generar_mapa_antioquia(df, municipio):
-    dff = df.copy()
-    
-    df_mapa = dff.groupby(['cole_mcpio_ubicacion', 'lat', 'lon'])['punt_ingles'].mean().reset_index()
+def generar_mapa_antioquia_base(df):
+    import plotly.express as px
+    df_mapa = df.groupby(['cole_mcpio_ubicacion', 'lat', 'lon'])['punt_ingles'].mean().reset_index()
     min_ingles = df_mapa['punt_ingles'].min()
     max_ingles = df_mapa['punt_ingles'].max()
+    encuadre = departamentos.encuadre(df_mapa['lat'], df_mapa['lon'])
+
+    if geometrias.disponible(df_mapa['cole_mcpio_ubicacion']):
+        fig = geometrias.figura_coropletica(
+            df_mapa, 'punt_ingles', 'Viridis', [min_ingles, max_ingles],
+            ESTILO_MAPA_P3['titulo'].format(municipio='TODOS'), etiqueta='punt_ingles',
+            zoom=encuadre['zoom'], centro=encuadre['centro']
+        )
+        return fig.update_traces(marker_opacity=ESTILO_MAPA_P3['op_todos'])
     
-    if municipio != 'TODOS':
-        df_mapa['opacidad'] = df_mapa['cole_mcpio_ubicacion'].apply(lambda x: 1.0 if x == municipio else 0.1)
-        df_mapa['tamano'] = df_mapa['cole_mcpio_ubicacion'].apply(lambda x: 15 if x == municipio else 5)
-    else:
-        df_mapa['opacidad'] = 0.8
-        df_mapa['tamano'] = 8
+    # El municipio seleccionado se resalta después (assets/mapas.js)
+    df_mapa['tamano'] = ESTILO_MAPA_P3['tam_todos']
 
     fig = px.scatter_mapbox(
         df_mapa,
@@ -45,17 +52,21 @@ def generar_mapa_antioquia(df, municipio):
         color_continuous_scale='Viridis',
         range_color=[min_ingles, max_ingles],
         mapbox_style='carto-positron',
-        zoom=6.0,
-        center={"lat": 6.2518, "lon": -75.5636},
-        title=f'Promedio de Puntaje en Inglés por Municipio ({municipio})',
+        zoom=encuadre['zoom'],
+        center=encuadre['centro'],
+        title=ESTILO_MAPA_P3['titulo'].format(municipio='TODOS'),
         size='tamano',
-        size_max=15
+        size_max=ESTILO_MAPA_P3['size_max']
     )
-    fig.update_traces(marker=dict(opacity=df_mapa['opacidad']))
+    fig.update_traces(marker=dict(opacity=ESTILO_MAPA_P3['op_todos']))
     fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
     return fig
 
+def generar_mapa_antioquia(df, municipio):
+    return resaltar_municipio(generar_mapa_antioquia_base(df), municipio, ESTILO_MAPA_P3)
+
 def generar_ranking_municipios_estatico(df):
+    import plotly.express as px
     dff = df.copy()
     df_rank = dff.groupby('cole_mcpio_ubicacion', as_index=False)['punt_ingles'].mean()
     df_rank = df_rank.sort_values('punt_ingles', ascending=True)
@@ -73,29 +84,60 @@ def generar_ranking_municipios_estatico(df):
     fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0}, height=900)
     return fig
 
-def generar_histograma_tic(df, municipio):
-    dff = df.copy()
-    if municipio != 'TODOS':
-        dff = dff[dff['cole_mcpio_ubicacion'] == municipio]
+# TABLA DE CONTINGENCIA TIC / INGLES
+# Conteo de estudiantes por municipio x periodo x Acceso_TIC x internet x
+# nivel de inglés, calculado una vez al cargar. El histograma y el
+# diferencial B1 suman porciones de esta tabla en lugar de recorrer filas.
+DIMENSIONES_TENSOR = ['cole_mcpio_ubicacion', 'periodo', 'Acceso_TIC', 'fami_tieneinternet', 'desemp_ingles']
+NIVELES_INGLES = ["A-", "A1", "A2", "B1", "B+"]
+NIVELES_B1 = ["B1", "B+"]
+COLORES_TIC = {
+    'Internet y Computador': '#2ca02c',
+    'Solo Internet': '#1f77b4',
+    'Solo Computador': '#ff7f0e',
+    'Sin Acceso TIC': '#d62728'
+}
 
-    fig = px.histogram(
-        dff,
+
+def construir_tensor_tic(df):
+    """Serie de conteos con índice `DIMENSIONES_TENSOR` (incluye nulos)."""
+    return df.groupby(DIMENSIONES_TENSOR, observed=True, dropna=False).size().rename('n')
+
+
+def _porcion_municipio(tensor, municipio):
+    # `municipio` puede ser un nombre o una lista (p. ej. los vecinos)
+    if isinstance(municipio, (list, tuple)):
+        return tensor[tensor.index.get_level_values('cole_mcpio_ubicacion').isin(municipio)]
+    if municipio == 'TODOS':
+        return tensor
+    return tensor[tensor.index.get_level_values('cole_mcpio_ubicacion') == municipio]
+
+
+def generar_histograma_tic_desde_tensor(tensor, municipio):
+    import plotly.express as px
+    conteos = _porcion_municipio(tensor, municipio)
+    conteos = conteos.groupby(level=['Acceso_TIC', 'desemp_ingles'], observed=True).sum().reset_index()
+
+    fig = px.bar(
+        conteos,
         x='desemp_ingles',
+        y='n',
         color='Acceso_TIC',
         barmode='group',
-        category_orders={"desemp_ingles": ["A-", "A1", "A2", "B1", "B+"]},
+        category_orders={"desemp_ingles": NIVELES_INGLES, "Acceso_TIC": list(COLORES_TIC)},
         title=f'Distribución del Nivel de Inglés vs. Acceso TIC ({municipio})',
-        labels={'desemp_ingles': 'Nivel de Inglés', 'count': 'Frecuencia'},
-        color_discrete_map={
-            'Internet y Computador': '#2ca02c',
-            'Solo Internet': '#1f77b4',
-            'Solo Computador': '#ff7f0e',
-            'Sin Acceso TIC': '#d62728'
-        }
+        labels={'desemp_ingles': 'Nivel de Inglés', 'n': 'Frecuencia'},
+        color_discrete_map=COLORES_TIC
     )
     return fig
 
+
+def generar_histograma_tic(df, municipio):
+    return generar_histograma_tic_desde_tensor(precalculos_de(df)["tensor"], municipio)
+
+
 def generar_dispersion_regresion(df, municipio):
+    import plotly.express as px
     dff = df.copy()
     if municipio != 'TODOS':
         dff = dff[dff['cole_mcpio_ubicacion'] == municipio]
@@ -113,6 +155,7 @@ def generar_dispersion_regresion(df, municipio):
     return fig
 
 def generar_dispersion_clusters(df, municipio):
+    import plotly.express as px
     dff = df.copy()
     if municipio != 'TODOS':
         dff = dff[dff['cole_mcpio_ubicacion'] == municipio]
@@ -141,70 +184,158 @@ def generar_dispersion_clusters(df, municipio):
     fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
     return fig
 
-def calcular_probabilidad_b1(df, municipio):
-    dff = df.copy()
-    if municipio != 'TODOS':
-        dff = dff[dff['cole_mcpio_ubicacion'] == municipio]
+def _intervalo_wilson(exitos, n, z):
+    p = exitos / n
+    denominador = 1 + z ** 2 / n
+    centro = (p + z ** 2 / (2 * n)) / denominador
+    radio = z / denominador * math.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2))
+    return p, centro - radio, centro + radio
 
-    con_internet = dff[dff['fami_tieneinternet'] == 'Si']
-    sin_internet = dff[dff['fami_tieneinternet'] == 'No']
 
-    if len(con_internet) == 0 or len(sin_internet) == 0:
-        return 0.0
+def intervalo_diferencia(exitos_1, n_1, exitos_2, n_2, confianza=0.95):
+    """Diferencia de proporciones p1 - p2 con intervalo de Newcombe (Wilson híbrido)."""
+    z = NormalDist().inv_cdf(1 - (1 - confianza) / 2)
+    p1, l1, u1 = _intervalo_wilson(exitos_1, n_1, z)
+    p2, l2, u2 = _intervalo_wilson(exitos_2, n_2, z)
+    diferencia = p1 - p2
+    inferior = diferencia - math.sqrt((p1 - l1) ** 2 + (u2 - p2) ** 2)
+    superior = diferencia + math.sqrt((u1 - p1) ** 2 + (p2 - l2) ** 2)
+    return diferencia, inferior, superior
+
+
+def diferencial_b1(tensor, municipio, confianza=0.95):
+    """Diferencial de probabilidad de nivel B1/B+ con y sin internet, en puntos
+    porcentuales, con su intervalo de confianza.
+    """
+    conteos = _porcion_municipio(tensor, municipio)
+    internet = conteos.index.get_level_values('fami_tieneinternet')
+    es_b1 = conteos.index.get_level_values('desemp_ingles').isin(NIVELES_B1)
+    n = conteos.groupby(internet).sum()
+    b1 = conteos[es_b1].groupby(internet[es_b1]).sum()
+
+    n_con, n_sin = int(n.get('Si', 0)), int(n.get('No', 0))
+    resultado = {
+        "diferencial": 0.0, "ic_inferior": None, "ic_superior": None, "confianza": confianza,
+        "prob_con_internet": None, "prob_sin_internet": None,
+        "n_con_internet": n_con, "n_sin_internet": n_sin,
+    }
+    if n_con == 0 or n_sin == 0:
+        return resultado
 
     # Cálculo de probabilidad marginal P(B1 U B+ | Internet)
-    prob_con = len(con_internet[con_internet['desemp_ingles'].isin(['B1', 'B+'])]) / len(con_internet) * 100
-    prob_sin = len(sin_internet[sin_internet['desemp_ingles'].isin(['B1', 'B+'])]) / len(sin_internet) * 100
+    b1_con, b1_sin = int(b1.get('Si', 0)), int(b1.get('No', 0))
+    diferencia, inferior, superior = intervalo_diferencia(b1_con, n_con, b1_sin, n_sin, confianza)
+    resultado.update({
+        "diferencial": round(diferencia * 100, 2),
+        "ic_inferior": round(inferior * 100, 2),
+        "ic_superior": round(superior * 100, 2),
+        "prob_con_internet": round(b1_con / n_con * 100, 2),
+        "prob_sin_internet": round(b1_sin / n_sin * 100, 2),
+    })
+    return resultado
 
+
+def calcular_probabilidad_b1(df, municipio):
     # Diferencial de probabilidad (Z%)
-    diferencia_z = prob_con - prob_sin
-    return round(diferencia_z, 2)
+    return diferencial_b1(precalculos_de(df)["tensor"], municipio)["diferencial"]
+
+
+def texto_probabilidad_b1(resultado, resultado_vecinos=None, n_vecinos=0):
+    texto = (f"Insight: El acceso a internet altera la probabilidad de alcanzar nivel B1/B+ "
+             f"en un {resultado['diferencial']}%")
+    if resultado["ic_inferior"] is not None:
+        texto += (f" (IC {resultado['confianza']:.0%}: {resultado['ic_inferior']}% "
+                  f"a {resultado['ic_superior']}%)")
+    if resultado_vecinos is not None and resultado_vecinos["ic_inferior"] is not None:
+        texto += (f". En sus {n_vecinos} municipios vecinos: {resultado_vecinos['diferencial']}% "
+                  f"(IC {resultado_vecinos['ic_inferior']}% a {resultado_vecinos['ic_superior']}%)")
+    return texto
+
+
+def diferencial_b1_vecinos(tensor, municipio, k=vecinos.K_VECINOS, ruta_coordenadas=vecinos.RUTA_COORDENADAS):
+    """(diferencial B1 del conjunto de vecinos de `municipio`, número de vecinos)."""
+    if municipio == 'TODOS':
+        return None, 0
+    cercanos = vecinos.nombres_vecinos(municipio, k, ruta=ruta_coordenadas)
+    if not cercanos:
+        return None, 0
+    return diferencial_b1(tensor, cercanos), len(cercanos)
+
+
+def generar_serie_tic_ingles_desde_series(series, municipio='TODOS'):
+    """Serie temporal del promedio de `punt_ingles` por año, separada por
+    categorías de `Acceso_TIC`, a partir de las celdas de `construir_series`.
+    """
+    import plotly.express as px
+    df_g = serie(series, 'punt_ingles', por='Acceso_TIC', municipio=municipio)
+    if df_g.empty:
+        return px.line(title='No hay datos de periodo para construir la serie temporal')
+
+    fig = px.line(
+        df_g,
+        x='anio',
+        y='punt_ingles',
+        color='Acceso_TIC',
+        markers=True,
+        title=f'Promedio Puntaje Inglés por Año y Acceso TIC ({municipio})',
+        labels={'punt_ingles': 'Promedio Puntaje Inglés', 'anio': 'Año'}
+    )
+    fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
+    return fig
 
 
 def generar_serie_tic_ingles_por_periodo(df, municipio='TODOS'):
-    """Genera una serie temporal del promedio de `punt_ingles` por año,
-    separada por categorías de `Acceso_TIC`.
+    return generar_serie_tic_ingles_desde_series(precalculos_de(df)["series"], municipio)
+
+
+def precalcular_p3(df):
+    """Tablas que se calculan una vez al cargar: contingencia TIC/inglés y series."""
+    return {"tensor": construir_tensor_tic(df), "series": construir_series(df)}
+
+
+# Precálculos por DataFrame cargado (cada versión de los datos es otro objeto)
+_precalculados = {}
+
+
+def precalculos_de(df):
+    """`precalcular_p3(df)` calculado una sola vez mientras `df` exista.
 
-    Se asume que `df` tiene la columna `periodo` y se usan los primeros 4
-    caracteres como año (ej: '2019-1' -> 2019).
+    Lo usan las funciones que reciben el DataFrame completo, para no
+    reconstruir la contingencia y las series en cada llamada; supone que
+    `df` no se modifica después de cargarlo, como en el tablero.
     """
-    dff = df.copy()
-    # Asegurar que exista la columna Acceso_TIC (si no, derivarla)
-    if 'Acceso_TIC' not in dff.columns:
-        dff['Acceso_TIC'] = dff.apply(
-            lambda x: 'Internet y Computador' if x.get('fami_tieneinternet') == 'Si' and x.get('fami_tienecomputador') == 'Si'
-            else ('Solo Internet' if x.get('fami_tieneinternet') == 'Si'
-                  else ('Solo Computador' if x.get('fami_tienecomputador') == 'Si' else 'Sin Acceso TIC')),
-            axis=1
-        )
+    clave = id(df)
+    precalculos = _precalculados.get(clave)
+    if precalculos is None:
+        precalculos = _precalculados[clave] = precalcular_p3(df)
+        weakref.finalize(df, _precalculados.pop, clave, None)
+    return precalculos
 
-    # Extraer año de la columna periodo (primeros 4 dígitos)
-    if 'periodo' in dff.columns:
-        dff['year'] = dff['periodo'].astype(str).str[:4]
-        # filtrar años válidos numéricos
-        dff = dff[dff['year'].str.isnumeric()]
-        dff['year'] = dff['year'].astype(int)
-    else:
-        dff['year'] = None
 
-    if municipio != 'TODOS':
-        dff = dff[dff['cole_mcpio_ubicacion'] == municipio]
+def texto_b1_con_vecinos(tensor, municipio, ruta_coordenadas=vecinos.RUTA_COORDENADAS):
+    """Texto del diferencial B1 del municipio y de sus vecinos."""
+    return texto_probabilidad_b1(
+        diferencial_b1(tensor, municipio),
+        *diferencial_b1_vecinos(tensor, municipio, ruta_coordenadas=ruta_coordenadas)
+    )
 
-    # Agrupar por año y acceso TIC
-    if dff['year'].notna().any():
-        df_g = dff.groupby(['year', 'Acceso_TIC'], as_index=False)['punt_ingles'].mean()
-        df_g = df_g.sort_values('year')
-        fig = px.line(
-            df_g,
-            x='year',
-            y='punt_ingles',
-            color='Acceso_TIC',
-            markers=True,
-            title=f'Promedio Puntaje Inglés por Año y Acceso TIC ({municipio})',
-            labels={'punt_ingles': 'Promedio Puntaje Inglés', 'year': 'Año'}
-        )
-        fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
-    else:
-        fig = px.line(title='No hay datos de periodo para construir la serie temporal')
 
-    return fig
\ No newline at end of file
+def construir_tablero_p3(df, municipio, progreso=None, precalculos=None, grado=None):
+    """Salidas del tablero de /pregunta_3 (histograma, dispersión, texto, serie).
+
+    Las cuatro se construyen a la vez (ver `Analysis/paralelo.py`; `grado`
+    es el número de tareas simultáneas). `progreso(hecho, total)` permite
+    reportar avance desde callbacks en segundo plano; la misma función la
+    usa el precalentamiento del caché. `precalculos` es el de
+    `precalcular_p3(df)`, si ya se calculó al cargar.
+    """
+    if precalculos is None:
+        precalculos = precalculos_de(df)
+    tensor = precalculos["tensor"]
+    ruta_coordenadas = df.attrs.get('ruta_coordenadas', vecinos.RUTA_COORDENADAS)
+    return tuple(paralelo.construir([
+        (generar_histograma_tic_desde_tensor, tensor, municipio),
+        (generar_dispersion_clusters, df, municipio),
+        (texto_b1_con_vecinos, tensor, municipio, ruta_coordenadas),
+        (generar_serie_tic_ingles_desde_series, precalculos["series"], municipio),
+    ], grado, progreso=progreso))
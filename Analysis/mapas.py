@@ -0,0 +1,82 @@
+import numpy as np
+
+# RESALTADO DE MUNICIPIOS EN LOS MAPAS
+# Los mapas se construyen una sola vez por porción de datos (mapa "base") y el
+# municipio seleccionado se resalta cambiando solo los arreglos de tamaño y
+# opacidad de los marcadores. En el navegador lo hace `assets/mapas.js`
+# (callback clientside); `resaltar_municipio` replica la misma lógica en
+# Python para quien necesite la figura completa (exportes, benchmarks).
+# En los mapas coropléticos (Analysis/geometrias.py) no hay tamaño: el
+# municipio se resalta con la opacidad y el grosor del borde del polígono.
+
+ESTILO_MAPA_P1 = {
+    "todos": "TODOS",
+    "etiqueta_todos": "TODOS",
+    "tam_sel": 15, "tam_otros": 5, "tam_todos": 8,
+    "op_sel": 1.0, "op_otros": 0.15, "op_todos": 0.8,
+    "size_max": 15,
+    "linea_sel": 2.5, "linea_otros": 0.5,
+    "titulo": "Mapa Espacial: Puntaje Global y PIB ({municipio})",
+}
+
+ESTILO_MAPA_P3 = {
+    "todos": "TODOS",
+    "etiqueta_todos": "TODOS",
+    "tam_sel": 15, "tam_otros": 5, "tam_todos": 8,
+    "op_sel": 1.0, "op_otros": 0.1, "op_todos": 0.8,
+    "size_max": 15,
+    "linea_sel": 2.5, "linea_otros": 0.5,
+    "titulo": "Promedio de Puntaje en Inglés por Municipio ({municipio})",
+}
+
+ESTILO_MAPA_P2 = {
+    "todos": "Todos",
+    "etiqueta_todos": "Todos los municipios",
+    "tam_sel": 18, "tam_otros": 6, "tam_todos": 10,
+    "op_sel": 1.0, "op_otros": 0.15, "op_todos": 0.85,
+    "size_max": 18,
+    "linea_sel": 2.5, "linea_otros": 0.5,
+    # El título lo completa logica_p2 con la materia
+    "titulo": "{municipio}",
+}
+
+
+def resaltar_municipio(fig, municipio, estilo):
+    """Aplica tamaño, opacidad y título del municipio seleccionado a un mapa base.
+
+    El mapa base debe tener los nombres de municipio en `hovertext` de la
+    primera traza (lo que produce `hover_name` en plotly express y lo que
+    pone `geometrias.figura_coropletica`).
+    """
+    if not fig.data or fig.data[0].hovertext is None:
+        return fig
+
+    traza = fig.data[0]
+    nombres = np.asarray(traza.hovertext)
+    if municipio is None or municipio == estilo["todos"]:
+        tamanos = np.full(len(nombres), estilo["tam_todos"])
+        opacidades = np.full(len(nombres), estilo["op_todos"])
+        etiqueta = estilo["etiqueta_todos"]
+    else:
+        seleccion = nombres == municipio
+        tamanos = np.where(seleccion, estilo["tam_sel"], estilo["tam_otros"])
+        opacidades = np.where(seleccion, estilo["op_sel"], estilo["op_otros"])
+        etiqueta = municipio
+
+    traza.marker.opacity = opacidades
+    if traza.type == "choroplethmapbox":
+        if municipio is None or municipio == estilo["todos"]:
+            traza.marker.line.width = np.full(len(nombres), estilo["linea_otros"])
+        else:
+            traza.marker.line.width = np.where(seleccion, estilo["linea_sel"], estilo["linea_otros"])
+    else:
+        traza.marker.size = tamanos
+        # Mismo sizeref que calcula plotly express con `size` y `size_max`
+        traza.marker.sizeref = tamanos.max() / estilo["size_max"] ** 2
+    fig.update_layout(title_text=estilo["titulo"].format(municipio=etiqueta))
+    return fig
+
+
+def mapa_para_store(fig, estilo):
+    """Empaqueta el mapa base y su estilo para un `dcc.Store` que lee el clientside."""
+    return {"figura": fig, "estilo": estilo}
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+InfoCache = namedtuple("InfoCache", ["hits", "misses", "maxsize", "currsize"])
+
+
+def memo_compartido(maxsize=64):
+    """LRU como `functools.lru_cache`, pero con una sola evaluación por clave.
+
+    Los callbacks de una misma página suelen dispararse a la vez con los
+    mismos filtros; si varias peticiones piden la misma clave al mismo
+    tiempo, solo una calcula y las demás esperan su resultado.
+    Expone `cache_info()` y `cache_clear()` igual que `lru_cache`.
+    """
+    def decorador(funcion):
+        resultados = OrderedDict()
+        en_curso = {}
+        lock = threading.Lock()
+        conteo = {"hits": 0, "misses": 0}
+
+        @wraps(funcion)
+        def envoltura(*args):
+            with lock:
+                if args in resultados:
+                    resultados.move_to_end(args)
+                    conteo["hits"] += 1
+                    return resultados[args]
+                evento = en_curso.get(args)
+                calcular = evento is None
+                if calcular:
+                    evento = en_curso[args] = threading.Event()
+                    conteo["misses"] += 1
+                else:
+                    conteo["hits"] += 1
+
+            if not calcular:
+                evento.wait()
+                with lock:
+                    if args in resultados:
+                        return resultados[args]
+                # El cálculo en curso falló o ya fue desalojado: calcular aquí
+                return funcion(*args)
+
+            try:
+                valor = funcion(*args)
+                with lock:
+                    resultados[args] = valor
+                    while len(resultados) > maxsize:
+                        resultados.popitem(last=False)
+                return valor
+            finally:
+                with lock:
+                    en_curso.pop(args, None)
+                evento.set()
+
+        def cache_info():
+            with lock:
+                return InfoCache(conteo["hits"], conteo["misses"], maxsize, len(resultados))
+
+        def cache_clear():
+            with lock:
+                resultados.clear()
+                conteo["hits"] = conteo["misses"] = 0
+
+        envoltura.cache_info = cache_info
+        envoltura.cache_clear = cache_clear
+        return envoltura
+    return decorador
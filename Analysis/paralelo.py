@@ -0,0 +1,105 @@
+"""Construcción concurrente de las salidas de un callback.
+
+Los tableros arman varias figuras independientes con los mismos datos
+(boxplot, barras, prueba t en /pregunta_1; histograma, dispersión, texto y
+serie en /pregunta_3; unas diez figuras en insights). `construir(tareas)`
+las corre a la vez y devuelve los resultados en el orden de `tareas`, así
+que la latencia se acerca a la de la figura más lenta y no a la suma.
+
+Dos modos (`SABER_PARALELO_MODO`):
+
+- `hilos` (por defecto): un pool de hilos compartido por el proceso. Las
+  agregaciones de pandas/NumPy sueltan el GIL y se solapan; la parte en
+  Python puro de Plotly (validación de trazas) no.
+- `procesos`: un pool de procesos, para cuando domina la construcción en
+  Python puro de Plotly. Las funciones deben ser de módulo y los
+  argumentos se serializan en cada llamada (el DataFrame incluido), así
+  que solo compensa con figuras lentas. Si el proceso no puede tener hijos
+  (p. ej. un worker daemon de los callbacks en segundo plano) se usan hilos.
+
+`SABER_PARALELISMO` fija el número de tareas simultáneas (1 = secuencial,
+como antes). Ver `Benchmarks/bench_paralelo.py` para medir la ganancia.
+"""
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+GRADO = int(os.environ.get("SABER_PARALELISMO", min(4, os.cpu_count() or 1)))
+MODO = os.environ.get("SABER_PARALELO_MODO", "hilos")
+MODOS = ("hilos", "procesos")
+
+_lock = threading.Lock()
+_pools = {}
+
+
+def _pool(modo, grado):
+    # Un pool por (modo, grado) y proceso; se crea con la primera tarea
+    with _lock:
+        pool = _pools.get((modo, grado))
+        if pool is None:
+            clase = ProcessPoolExecutor if modo == "procesos" else ThreadPoolExecutor
+            nombre = {} if modo == "procesos" else {"thread_name_prefix": "saber-figuras"}
+            pool = _pools[(modo, grado)] = clase(max_workers=grado, **nombre)
+        return pool
+
+
+def cerrar():
+    """Cierra los pools (al terminar un benchmark o un worker)."""
+    with _lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=True, cancel_futures=True)
+        _pools.clear()
+
+
+def _llamar(tarea):
+    funcion, *args = tarea
+    return funcion(*args)
+
+
+def _secuencial(tareas, progreso):
+    resultados = []
+    for i, tarea in enumerate(tareas):
+        if progreso:
+            progreso(i, len(tareas))
+        resultados.append(_llamar(tarea))
+    if progreso:
+        progreso(len(tareas), len(tareas))
+    return resultados
+
+
+def construir(tareas, grado=None, modo=None, progreso=None):
+    """Resultados de `tareas` ([(funcion, *args)]) en el mismo orden.
+
+    `progreso(hechas, total)` se llama desde el hilo que espera, a medida
+    que terminan. Una excepción en una tarea se propaga igual que en serie.
+    """
+    tareas = list(tareas)
+    grado = min(GRADO if grado is None else grado, len(tareas))
+    modo = modo or MODO
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconocido: {modo} (use uno de {', '.join(MODOS)})")
+    if grado <= 1:
+        return _secuencial(tareas, progreso)
+
+    try:
+        pool = _pool(modo, grado)
+        futuros = {pool.submit(_llamar, tarea): i for i, tarea in enumerate(tareas)}
+    except (AssertionError, OSError, BrokenProcessPool) as e:
+        # Procesos daemon no pueden crear hijos: se sigue con hilos
+        if modo != "procesos":
+            raise
+        print(f"[paralelo] sin pool de procesos ({e}); se usan hilos")
+        return construir(tareas, grado, "hilos", progreso)
+
+    resultados = [None] * len(tareas)
+    pendientes = set(futuros)
+    if progreso:
+        progreso(0, len(tareas))
+    while pendientes:
+        hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+        for futuro in hechos:
+            resultados[futuros[futuro]] = futuro.result()
+        if progreso:
+            progreso(len(tareas) - len(pendientes), len(tareas))
+    return resultados
@@ -0,0 +1,191 @@
+"""Precalentamiento del caché de figuras para todos los filtros.
+
+Los desplegables solo ofrecen 'TODOS' más ~125 municipios y `MATERIAS` tiene
+seis materias, así que el espacio de salidas es pequeño. Este comando
+construye en paralelo (un proceso por núcleo) todas las salidas de:
+
+- /pregunta_1 y /pregunta_3: tablero por municipio,
+- /pregunta_2: resumen, boxplots y brechas por municipio, gráfica por
+  estrato por (municipio, materia) y mapa base por materia, con el rango
+  completo de periodos (el valor inicial del slider),
+- /insights: barras y KPIs por métrica,
+
+y las guarda en `Analysis/cache_figuras.py` con la versión actual de los
+datos. Se corre después de cada refresco de datos y antes de abrir tráfico:
+
+    python -m Analysis.precalentar_cache
+    python -m Analysis.precalentar_cache --paginas pregunta_1 --procesos 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Analysis import cache_figuras
+
+PAGINAS = ("pregunta_1", "pregunta_2", "pregunta_3", "insights")
+
+# Datos cargados una vez por proceso del pool
+_datos = {}
+
+
+def _iniciar_proceso(paginas):
+    if "pregunta_1" in paginas:
+        from Analysis.logica_p1 import cargar_datos_p1, celdas_vecinos
+        _datos["pregunta_1"] = cargar_datos_p1()
+        _datos["pregunta_1/celdas_vecinos"] = celdas_vecinos(_datos["pregunta_1"])
+    if "pregunta_2" in paginas:
+        from Analysis.logica_p2 import cargar_datos, construir_celdas_brecha
+        _datos["pregunta_2"] = cargar_datos()
+        _datos["pregunta_2/celdas_brecha"] = construir_celdas_brecha(_datos["pregunta_2"])
+    if "pregunta_3" in paginas:
+        from Analysis.logica_p3 import cargar_datos_p3, precalcular_p3
+        _datos["pregunta_3"] = cargar_datos_p3()
+        _datos["pregunta_3/precalculos"] = precalcular_p3(_datos["pregunta_3"])
+    if "insights" in paginas:
+        from Analysis.logica_insights import obtener_figuras_eda
+        _datos["insights"] = obtener_figuras_eda()
+
+
+def _periodos_p2(df):
+    # Mismo orden que el slider de /pregunta_2
+    return tuple(sorted(df["periodo"].dropna().unique()))
+
+
+def listar_tareas(paginas, incluir_eda=False):
+    """Tareas (pagina, filtro) a repartir entre procesos.
+
+    `incluir_eda` agrega las figuras fijas de /insights, que la página
+    calcula al importar y solo se necesitan en el export estático.
+    """
+    tareas = []
+    if "pregunta_1" in paginas:
+        from Analysis.logica_p1 import cargar_datos_p1, obtener_lista_municipios_p1
+        tareas += [("pregunta_1", m) for m in obtener_lista_municipios_p1(cargar_datos_p1())]
+    if "pregunta_2" in paginas:
+        from Analysis.logica_p2 import cargar_datos
+        df = cargar_datos()
+        tareas += [("pregunta_2", m) for m in ["Todos"] + sorted(df["cole_mcpio_ubicacion"].dropna().unique())]
+    if "pregunta_3" in paginas:
+        from Analysis.logica_p3 import cargar_datos_p3, obtener_lista_municipios
+        tareas += [("pregunta_3", m) for m in obtener_lista_municipios(cargar_datos_p3())]
+    if "insights" in paginas:
+        from Analysis.logica_insights import obtener_figuras_eda
+        _, _, aux = obtener_figuras_eda()
+        if incluir_eda:
+            tareas.append(("insights/eda", None))
+        if aux.get("detected", {}).get("col_estrato"):
+            tareas += [("insights", m) for m in aux.get("metrics_list", [])]
+    return tareas
+
+
+def generar_salidas(pagina, filtro):
+    """Produce (clave de página, argumentos, salida) para una tarea."""
+    if pagina == "pregunta_1":
+        from Analysis.logica_p1 import (
+            construir_tablero_p1, generar_dispersion_pib_brecha, generar_mapa_pib_puntaje_base
+        )
+        from Analysis.mapas import ESTILO_MAPA_P1, mapa_para_store
+        df = _datos[pagina]
+        # grado=1: el pool ya ocupa un proceso por núcleo
+        yield pagina, (filtro,), construir_tablero_p1(df, filtro, grado=1,
+                                                      celdas=_datos["pregunta_1/celdas_vecinos"])
+        # Figuras que la página arma al importarse
+        if filtro == "TODOS":
+            yield "pregunta_1/estaticas", (), (
+                generar_dispersion_pib_brecha(df),
+                mapa_para_store(generar_mapa_pib_puntaje_base(df), ESTILO_MAPA_P1))
+
+    elif pagina == "pregunta_3":
+        from Analysis.logica_p3 import (
+            construir_tablero_p3, generar_mapa_antioquia_base, generar_ranking_municipios_estatico
+        )
+        from Analysis.mapas import ESTILO_MAPA_P3, mapa_para_store
+        df = _datos[pagina]
+        yield pagina, (filtro,), construir_tablero_p3(df, filtro, precalculos=_datos["pregunta_3/precalculos"],
+                                                      grado=1)
+        if filtro == "TODOS":
+            yield "pregunta_3/estaticas", (), (
+                generar_ranking_municipios_estatico(df),
+                mapa_para_store(generar_mapa_antioquia_base(df), ESTILO_MAPA_P3))
+
+    elif pagina == "pregunta_2":
+        from Analysis.logica_p2 import (
+            MATERIAS, resumir_porcion, estilo_mapa_brecha, calcular_brechas_ajustadas,
+            generar_boxplots_desde_resumen, generar_brecha_por_estrato_desde_resumen,
+            generar_mapa_brecha_desde_resumen
+        )
+        from Analysis.mapas import mapa_para_store
+        df = _datos[pagina]
+        periodos = _periodos_p2(df)
+        resumen = resumir_porcion(df, filtro, periodos)
+        yield "pregunta_2/resumen", (filtro, periodos), resumen
+        yield "pregunta_2/principales", (filtro, periodos), (
+            generar_boxplots_desde_resumen(resumen),
+            calcular_brechas_ajustadas(_datos["pregunta_2/celdas_brecha"], filtro, periodos))
+        for columna in MATERIAS.values():
+            yield ("pregunta_2/estrato", (filtro, periodos, columna),
+                   generar_brecha_por_estrato_desde_resumen(resumen, columna))
+            # El mapa base solo depende de periodos y materia
+            if filtro == "Todos":
+                fig = generar_mapa_brecha_desde_resumen(resumen, columna)
+                yield "pregunta_2/mapa", (periodos, columna), mapa_para_store(fig, estilo_mapa_brecha(columna))
+
+    elif pagina == "insights":
+        from Analysis.logica_insights import build_bar_with_comparisons
+        _, _, aux = _datos[pagina]
+        yield pagina, (filtro,), build_bar_with_comparisons(
+            aux["df"], filtro, aux["detected"]["col_estrato"], aux["metrics_list"])
+
+    elif pagina == "insights/eda":
+        kp, figs, aux = _datos["insights"]
+        yield pagina, (), {"kpis": kp, "figuras": figs, "metricas": aux.get("metrics_list", [])}
+
+
+def _calentar(pagina, filtro):
+    inicio = time.perf_counter()
+    escritas = 0
+    for clave_pagina, args, salida in generar_salidas(pagina, filtro):
+        cache_figuras.guardar(clave_pagina, args, salida)
+        escritas += 1
+    return pagina, filtro, escritas, time.perf_counter() - inicio
+
+
+def precalentar(paginas=PAGINAS, procesos=None, limpiar=False):
+    inicio = time.perf_counter()
+    if limpiar:
+        borradas = cache_figuras.limpiar_versiones_viejas()
+        print(f"[cache] {borradas} entradas de versiones anteriores borradas")
+
+    tareas = listar_tareas(paginas)
+    procesos = procesos or os.cpu_count() or 1
+    print(f"[cache] {len(tareas)} tareas en {procesos} procesos (versión {cache_figuras.version_datos()})")
+
+    escritas = 0
+    lentas = []
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso,
+                             initargs=(tuple(paginas),)) as pool:
+        futuros = [pool.submit(_calentar, pagina, filtro) for pagina, filtro in tareas]
+        for hechas, futuro in enumerate(as_completed(futuros), start=1):
+            pagina, filtro, n, segundos = futuro.result()
+            escritas += n
+            lentas.append((segundos, pagina, filtro))
+            if hechas % 25 == 0 or hechas == len(futuros):
+                print(f"[cache] {hechas}/{len(futuros)} tareas")
+
+    total = time.perf_counter() - inicio
+    resumen = cache_figuras.resumen_cache()
+    print(f"[cache] {escritas} entradas escritas en {total:.1f}s")
+    print(f"[cache] {resumen['entradas']} entradas, {resumen['megabytes']:.1f} MB en {resumen['directorio']}")
+    for segundos, pagina, filtro in sorted(lentas, key=lambda t: t[0], reverse=True)[:5]:
+        print(f"[cache]   más lenta: {pagina} {filtro} {segundos:.2f}s")
+    return {"segundos": total, "escritas": escritas, **resumen}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", nargs="+", choices=PAGINAS, default=list(PAGINAS))
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, núcleos)")
+    parser.add_argument("--limpiar", action="store_true", help="Borrar antes las entradas de otras versiones")
+    args = parser.parse_args()
+    precalentar(args.paginas, args.procesos, args.limpiar)
@@ -0,0 +1,41 @@
+import numpy as np
+from plotly.basedatatypes import BaseFigure
+
+# RECORTE DE PRECISION EN FIGURAS
+# Los puntajes y promedios no necesitan 15 decimales; redondear los arreglos
+# numericos de las trazas reduce bastante el JSON que viaja al navegador
+# (sobre todo en histogramas y dispersiones con datos crudos). Las
+# coordenadas (lat/lon) y los tamanos de marcador no se tocan.
+DECIMALES_PUNTAJE = 2
+
+CAMPOS_NUMERICOS = (
+    "x", "y", "z",
+    "q1", "median", "q3", "lowerfence", "upperfence", "mean", "sd",
+)
+
+
+def recortar_figura(fig, decimales=DECIMALES_PUNTAJE):
+    for traza in fig.data:
+        for campo in CAMPOS_NUMERICOS:
+            if campo not in traza:
+                continue
+            valores = traza[campo]
+            if valores is None:
+                continue
+            arreglo = np.asarray(valores)
+            if arreglo.dtype.kind == "f" and arreglo.size:
+                traza[campo] = np.round(arreglo, decimales)
+    return fig
+
+
+# Recorre las salidas de un callback (tuplas, listas, dicts) y recorta las figuras
+def recortar_salida(valor, decimales=DECIMALES_PUNTAJE):
+    if isinstance(valor, BaseFigure):
+        return recortar_figura(valor, decimales)
+    if isinstance(valor, tuple):
+        return tuple(recortar_salida(v, decimales) for v in valor)
+    if isinstance(valor, list):
+        return [recortar_salida(v, decimales) for v in valor]
+    if isinstance(valor, dict):
+        return {k: recortar_salida(v, decimales) for k, v in valor.items()}
+    return valor
@@ -0,0 +1,149 @@
+"""Registro de versiones del dataset con recarga en caliente.
+
+Cada página registra un cargador (`registrar`) que lee, valida y
+precalcula lo que necesita; el conjunto de lo que devuelven es una
+`Version` identificada por la huella de los archivos de `Data/`. Los
+callbacks y layouts toman la versión activa con `actual()` al empezar y la
+usan hasta terminar.
+
+Con `iniciar_vigilancia()` un hilo revisa los archivos cada
+`SABER_RECARGA_SEGUNDOS` (0 lo desactiva). Cuando la huella cambia y se
+mantiene estable entre dos revisiones, carga la nueva versión en segundo
+plano, la valida y la activa de un solo golpe:
+
+- las peticiones en curso terminan con la versión anterior (la tienen
+  referenciada); las nuevas ven la nueva;
+- `cache_figuras` pasa a usar la nueva huella en sus claves y se llaman
+  las funciones registradas con `al_cambiar` (cachés en memoria);
+- la versión anterior se libera en cuanto termina la última petición que
+  la usaba, así que solo conviven dos copias durante el cambio.
+
+Si un cargador falla, la versión nueva se descarta y sigue la activa.
+"""
+import gc
+import os
+import threading
+import time
+import weakref
+
+from Analysis import cache_figuras
+
+INTERVALO_VIGILANCIA = int(os.environ.get("SABER_RECARGA_SEGUNDOS", "30"))
+
+
+class Version:
+    """Datos de todas las páginas para una huella de los archivos."""
+    __slots__ = ("id", "fecha", "datos", "__weakref__")
+
+    def __init__(self, id, fecha, datos):
+        self.id = id
+        self.fecha = fecha
+        self.datos = datos
+
+
+_lock = threading.Lock()
+_cargadores = {}
+_al_cambiar = []
+_activa = None
+# Versiones aún referenciadas por alguna petición (la activa y las que terminan)
+_versiones = weakref.WeakValueDictionary()
+_hilo = None
+
+
+def validar_marco(df, columnas, minimo_filas=1):
+    """Lanza ValueError si `df` no tiene las columnas o las filas mínimas."""
+    faltantes = [c for c in columnas if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas: {', '.join(faltantes)}")
+    if len(df) < minimo_filas:
+        raise ValueError(f"{len(df)} filas, se esperaban al menos {minimo_filas}")
+
+
+def _activar(version):
+    global _activa
+    with _lock:
+        _activa = version
+        _versiones[version.id] = version
+        cache_figuras.fijar_version(version.id, version.fecha)
+
+
+def registrar(nombre, cargar):
+    """Registra el cargador de `nombre` y carga su parte en la versión activa."""
+    with _lock:
+        _cargadores[nombre] = cargar
+        activa = _activa
+    if activa is None:
+        activa = Version(cache_figuras.huella_archivos(), cache_figuras.fecha_archivos(), {})
+        _activar(activa)
+    if nombre not in activa.datos:
+        activa.datos[nombre] = cargar()
+    return activa.datos[nombre]
+
+
+def cargador(nombre):
+    """Cargador registrado de `nombre` (lo usa `departamentos` con otras rutas)."""
+    return _cargadores[nombre]
+
+
+def al_cambiar(funcion):
+    """Llama `funcion()` cada vez que se activa una versión nueva."""
+    _al_cambiar.append(funcion)
+    return funcion
+
+
+def actual():
+    """Versión activa; quien la toma la mantiene viva hasta soltarla."""
+    return _activa
+
+
+def buscar(version_id):
+    """Versión `version_id` si alguna petición aún la usa, si no None."""
+    return _versiones.get(version_id)
+
+
+def datos(nombre):
+    return _activa.datos[nombre]
+
+
+def recargar(forzar=False):
+    """Carga y activa la versión actual de los archivos. Retorna True si cambió."""
+    huella = cache_figuras.huella_archivos()
+    if not forzar and _activa is not None and huella == _activa.id:
+        return False
+
+    inicio = time.perf_counter()
+    nuevos = {nombre: cargar() for nombre, cargar in list(_cargadores.items())}
+    nueva = Version(huella, cache_figuras.fecha_archivos(), nuevos)
+    anterior = _activa.id if _activa is not None else None
+    _activar(nueva)
+    for funcion in _al_cambiar:
+        funcion()
+    del nuevos, nueva
+    gc.collect()
+    print(f"[datos] versión {huella} activa (antes {anterior}) en {time.perf_counter() - inicio:.1f}s")
+    return True
+
+
+def _vigilar(intervalo):
+    vista, rechazada = None, None
+    while True:
+        time.sleep(intervalo)
+        huella = cache_figuras.huella_archivos()
+        # Se espera a que la huella se repita: los archivos ya no se están escribiendo
+        if huella != _activa.id and huella == vista and huella != rechazada:
+            try:
+                recargar()
+            except Exception as e:
+                rechazada = huella
+                print(f"[datos] versión {huella} descartada, sigue {_activa.id}: {e}")
+        vista = huella
+
+
+def iniciar_vigilancia(intervalo=INTERVALO_VIGILANCIA):
+    """Arranca (una vez por proceso) el hilo que recarga los datos al cambiar."""
+    global _hilo
+    if intervalo <= 0 or _hilo is not None:
+        return None
+    _hilo = threading.Thread(target=_vigilar, args=(intervalo,), daemon=True, name="saber-recarga")
+    _hilo.start()
+    return _hilo
@@ -0,0 +1,115 @@
+"""Series de tiempo precalculadas de los puntajes.
+
+Celdas de conteo y suma de cada puntaje por periodo (con su año como
+entero) x municipio x Acceso_TIC x naturaleza x Area, construidas una vez
+al cargar los datos. Cualquier serie (por año o por periodo, total o
+separada por una dimensión, de un municipio o de todos) es una suma de
+celdas: no se vuelven a derivar columnas ni a recorrer filas en cada
+callback. Los periodos nuevos se agregan con `agregar_periodos` sin
+reconstruir los anteriores.
+"""
+import numpy as np
+import pandas as pd
+
+TODOS = "TODOS"
+COLUMNAS_PUNTAJE = (
+    "punt_global", "punt_matematicas", "punt_lectura_critica",
+    "punt_c_naturales", "punt_sociales_ciudadanas", "punt_ingles",
+)
+DIMENSIONES = ("cole_mcpio_ubicacion", "Acceso_TIC", "naturaleza", "Area")
+CLAVES = ("periodo", "anio") + DIMENSIONES
+FRECUENCIAS = ("anio", "periodo")
+
+
+# COLUMNAS DERIVADAS (VECTORIZADAS)
+
+def acceso_tic(df):
+    """Categoría de acceso TIC a partir de `fami_tieneinternet` y `fami_tienecomputador`."""
+    internet = df["fami_tieneinternet"].eq("Si").to_numpy()
+    computador = df["fami_tienecomputador"].eq("Si").to_numpy()
+    categorias = np.select(
+        [internet & computador, internet, computador],
+        ["Internet y Computador", "Solo Internet", "Solo Computador"],
+        default="Sin Acceso TIC",
+    )
+    return pd.Series(categorias, index=df.index)
+
+
+def anio_de_periodo(periodo):
+    """Año entero de `periodo` (primeros 4 caracteres: 20191 o '2019-1' -> 2019)."""
+    texto = periodo.astype(str).str[:4]
+    return pd.to_numeric(texto.where(texto.str.isnumeric()), errors="coerce").astype("Int64")
+
+
+def _area(df):
+    col_area = "estu_areareside" if "estu_areareside" in df.columns else "cole_area_ubicacion"
+    if col_area not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    area = df[col_area].astype(str).str.upper()
+    zona = np.where(area.str.contains("CABECERA|URBAN"), "Urbano", "Rural")
+    sin_informacion = area.isin(["SIN INFORMACIÓN", "SIN INFORMACION", "NAN"])
+    return pd.Series(zona, index=df.index).where(~sin_informacion)
+
+
+def _marco_series(df, columnas):
+    # Solo claves y puntajes, sin modificar el DataFrame original
+    vacia = pd.Series(np.nan, index=df.index, dtype=object)
+    tiene_tic = {"fami_tieneinternet", "fami_tienecomputador"} <= set(df.columns)
+    marco = pd.DataFrame({
+        "periodo": df["periodo"],
+        "anio": anio_de_periodo(df["periodo"]),
+        "cole_mcpio_ubicacion": df["cole_mcpio_ubicacion"].str.upper().str.strip()
+            if "cole_mcpio_ubicacion" in df.columns else vacia,
+        "Acceso_TIC": df["Acceso_TIC"] if "Acceso_TIC" in df.columns
+            else (acceso_tic(df) if tiene_tic else vacia),
+        "naturaleza": df["cole_naturaleza"].replace({"OFICIAL": "Público", "NO OFICIAL": "Privado"})
+            if "cole_naturaleza" in df.columns else vacia,
+        "Area": _area(df),
+    })
+    for columna in columnas:
+        marco[columna] = df[columna]
+    return marco[marco["anio"].notna()]
+
+
+# CONSTRUCCION Y ACTUALIZACION
+
+def construir_series(df, columnas=None):
+    """Celdas con índice `CLAVES` y columnas `n_<puntaje>` / `suma_<puntaje>`."""
+    columnas = [c for c in (columnas or COLUMNAS_PUNTAJE) if c in df.columns]
+    marco = _marco_series(df, columnas)
+    grupos = marco.groupby(list(CLAVES), observed=True, dropna=False)[columnas]
+    return pd.concat([grupos.count().add_prefix("n_"), grupos.sum().add_prefix("suma_")], axis=1)
+
+
+def agregar_periodos(celdas, df_nuevo):
+    """Incorpora las filas de `df_nuevo`; sus periodos reemplazan a los que ya estaban."""
+    columnas = [c[2:] for c in celdas.columns if c.startswith("n_")]
+    nuevas = construir_series(df_nuevo, columnas)
+    periodos_nuevos = nuevas.index.unique("periodo")
+    conservadas = celdas[~celdas.index.get_level_values("periodo").isin(periodos_nuevos)]
+    return pd.concat([conservadas, nuevas]).sort_index()
+
+
+# CONSULTAS
+
+def serie(celdas, columna, por=None, municipio=TODOS, frecuencia="anio"):
+    """Media y conteo de `columna` por `frecuencia` ('anio' o 'periodo') y,
+    opcionalmente, por una de `DIMENSIONES`.
+    """
+    if frecuencia not in FRECUENCIAS:
+        raise ValueError(f"Frecuencia desconocida: {frecuencia}")
+    if por is not None and por not in DIMENSIONES:
+        raise ValueError(f"Dimensión desconocida: {por}")
+    if municipio != TODOS:
+        celdas = celdas[celdas.index.get_level_values("cole_mcpio_ubicacion") == municipio]
+
+    niveles = [frecuencia] + ([por] if por else [])
+    sumadas = celdas[[f"n_{columna}", f"suma_{columna}"]].groupby(level=niveles, observed=True).sum()
+    sumadas = sumadas[sumadas[f"n_{columna}"] > 0]
+    resultado = pd.DataFrame({
+        "n": sumadas[f"n_{columna}"],
+        columna: sumadas[f"suma_{columna}"] / sumadas[f"n_{columna}"],
+    }).reset_index()
+    if frecuencia == "anio":
+        resultado["anio"] = resultado["anio"].astype(int)
+    return resultado.sort_values(niveles).reset_index(drop=True)
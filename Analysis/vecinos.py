@@ -0,0 +1,131 @@
+"""Índice espacial de municipios para comparar uno contra sus vecinos.
+
+Las coordenadas de `Data/municipios_unicos.csv` se pasan a vectores
+unitarios en 3D y se indexan con un `cKDTree` de scipy. En la esfera la
+distancia euclídea entre vectores (cuerda) crece con la distancia de
+círculo máximo, así que los k más cercanos y los que caen en un radio son
+exactamente los de la métrica haversine; el radio en km solo se convierte
+a cuerda. El índice se construye una vez por proceso (135 municipios) y
+cada consulta toma microsegundos, así que puede correr en cada cambio del
+dropdown.
+
+Para la comparación "vs. vecinos" no se filtran filas: `celdas_municipio`
+resume cada puntaje por municipio x zona en conteo, suma y suma de
+cuadrados, y `estadisticas_grupo` suma las celdas del conjunto de vecinos
+para obtener su media y desviación estándar.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+RUTA_COORDENADAS = "Data/municipios_unicos.csv"
+RADIO_TIERRA_KM = 6371.0088
+K_VECINOS = 5
+
+
+def _vectores(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _cuerda_a_km(cuerda):
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.clip(cuerda / 2, 0, 1))
+
+
+class IndiceVecinos:
+    """k vecinos más cercanos y vecinos en un radio (km) de cada municipio."""
+
+    def __init__(self, municipios, lat, lon):
+        from scipy.spatial import cKDTree
+
+        self.municipios = np.asarray(municipios, dtype=object)
+        self.posicion = {m: i for i, m in enumerate(self.municipios)}
+        self.puntos = _vectores(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+        self.arbol = cKDTree(self.puntos)
+
+    def __contains__(self, municipio):
+        return municipio in self.posicion
+
+    def k_vecinos(self, municipio, k=K_VECINOS):
+        """[(municipio, km)] de los `k` más cercanos, sin incluir al municipio."""
+        if municipio not in self.posicion or k <= 0:
+            return []
+        k = min(k + 1, len(self.municipios))
+        cuerdas, indices = self.arbol.query(self.puntos[self.posicion[municipio]], k=k)
+        cuerdas, indices = np.atleast_1d(cuerdas), np.atleast_1d(indices)
+        return [(self.municipios[i], float(km))
+                for i, km in zip(indices, _cuerda_a_km(cuerdas))
+                if self.municipios[i] != municipio]
+
+    def en_radio(self, municipio, km):
+        """[(municipio, km)] a menos de `km`, ordenados por distancia, sin el municipio."""
+        if municipio not in self.posicion:
+            return []
+        centro = self.puntos[self.posicion[municipio]]
+        cuerda = 2 * math.sin(min(km / RADIO_TIERRA_KM, math.pi) / 2)
+        indices = [i for i in self.arbol.query_ball_point(centro, cuerda) if self.municipios[i] != municipio]
+        if not indices:
+            return []
+        distancias = _cuerda_a_km(np.linalg.norm(self.puntos[indices] - centro, axis=1))
+        orden = np.argsort(distancias, kind="stable")
+        return [(self.municipios[indices[i]], float(distancias[i])) for i in orden]
+
+
+@lru_cache(maxsize=8)
+def indice(ruta=RUTA_COORDENADAS):
+    """Índice de los municipios con coordenadas, construido una vez por proceso
+    y archivo (uno por departamento cargado).
+    """
+    coordenadas = pd.read_csv(ruta).dropna(subset=["lat", "lon"])
+    coordenadas["cole_mcpio_ubicacion"] = coordenadas["cole_mcpio_ubicacion"].str.upper().str.strip()
+    coordenadas = coordenadas.drop_duplicates("cole_mcpio_ubicacion")
+    return IndiceVecinos(coordenadas["cole_mcpio_ubicacion"], coordenadas["lat"], coordenadas["lon"])
+
+
+def limpiar():
+    indice.cache_clear()
+
+
+def nombres_vecinos(municipio, k=K_VECINOS, radio_km=None, ruta=RUTA_COORDENADAS):
+    """Nombres de los vecinos: los de `radio_km` si se da, si no los `k` más cercanos."""
+    if radio_km is not None:
+        return [m for m, _ in indice(ruta).en_radio(municipio, radio_km)]
+    return [m for m, _ in indice(ruta).k_vecinos(municipio, k)]
+
+
+# ESTADISTICAS POR CONJUNTO DE MUNICIPIOS
+
+def celdas_municipio(df, columna, por="Area"):
+    """Conteo, suma y suma de cuadrados de `columna` por municipio y `por`."""
+    valores = df[columna]
+    marco = pd.DataFrame({
+        "cole_mcpio_ubicacion": df["cole_mcpio_ubicacion"],
+        por: df[por],
+        "n": valores.notna().astype(int),
+        "suma": valores.fillna(0),
+        "suma2": valores.fillna(0) ** 2,
+    })
+    return marco.groupby(["cole_mcpio_ubicacion", por], observed=True).sum()
+
+
+def estadisticas_grupo(celdas, municipios=None, etiqueta=None):
+    """Media y desviación estándar (muestral) por `por` sumando las celdas de
+    `municipios` (todas si es None), con `cole_mcpio_ubicacion` = `etiqueta`.
+    """
+    if municipios is not None:
+        celdas = celdas[celdas.index.get_level_values("cole_mcpio_ubicacion").isin(list(municipios))]
+    por = celdas.index.names[1]
+    sumas = celdas.groupby(level=por, observed=True).sum()
+    sumas = sumas[sumas["n"] > 0]
+    media = sumas["suma"] / sumas["n"]
+    varianza = (sumas["suma2"] - sumas["n"] * media ** 2) / (sumas["n"] - 1)
+    resultado = pd.DataFrame({
+        "mean": media,
+        # Con n = 1 no hay desviación; las restas pueden dar negativos mínimos
+        "std": np.sqrt(varianza.clip(lower=0)).where(sumas["n"] > 1),
+        "n": sumas["n"],
+    }).reset_index()
+    resultado["cole_mcpio_ubicacion"] = etiqueta
+    return resultado
@@ -0,0 +1,341 @@
+"""Suite de benchmarks para la carga, limpieza y construcción de figuras.
+
+Mide tiempo (mínimo y mediana de varias repeticiones), memoria pico
+(tracemalloc), tamaño de la figura serializada y, para las figuras, tiempo
+de codificación JSON por motor (json/orjson) y bytes en red con gzip y
+brotli, con y sin recorte de precisión, para cada función de
+`data_clean`, los cuatro cargadores y los `generar_*` / `calcular_*` de
+`logica_p1`, `logica_p2`, `logica_p3` y `logica_insights` (más las consultas
+de `vecinos`, el índice de colegios y el bootstrap), sobre datasets
+sintéticos de varios tamaños y para la selección 'TODOS' y un municipio.
+
+Uso (desde la raíz del repositorio):
+
+    python -m Benchmarks.bench_analisis --tamanos 10000 50000 200000
+    python -m Benchmarks.bench_analisis --comparar base.json nuevo.json
+
+Los resultados se guardan en `Benchmarks/resultados/<commit>.json`.
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+# Los cargadores usan rutas relativas a la raíz ('Data/...')
+os.chdir(RAIZ)
+
+from plotly.io.json import to_json_plotly  # noqa: E402
+
+from Analysis import bootstrap, colegios, data_clean, logica_p1, logica_p2, logica_p3, logica_insights, vecinos  # noqa: E402
+from Analysis.precision import recortar_figura  # noqa: E402
+from Benchmarks.datos_sinteticos import escribir_dataset  # noqa: E402
+
+try:
+    import orjson  # noqa: F401
+    MOTORES_JSON = ("json", "orjson")
+except ImportError:
+    MOTORES_JSON = ("json",)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESULTADOS_DIR = os.path.join(RAIZ, "Benchmarks", "resultados")
+MUNICIPIO_DEFECTO = "MEDELLIN"
+
+
+# UTILIDADES DE MEDICION
+
+def _figuras(resultado):
+    """Figuras contenidas en `resultado` (figura, tupla, lista o dict)."""
+    if hasattr(resultado, "to_plotly_json") and hasattr(resultado, "to_json"):
+        yield resultado
+    elif isinstance(resultado, dict):
+        for v in resultado.values():
+            yield from _figuras(v)
+    elif isinstance(resultado, (list, tuple)):
+        for v in resultado:
+            yield from _figuras(v)
+
+
+def _bytes_figuras(resultado):
+    """Suma el tamaño JSON de todas las figuras contenidas en `resultado`."""
+    return sum(len(fig.to_json()) for fig in _figuras(resultado))
+
+
+def _bytes_red(crudo):
+    medida = {"bytes_red_gzip": len(gzip.compress(crudo, compresslevel=6))}
+    if brotli is not None:
+        medida["bytes_red_br"] = len(brotli.compress(crudo, quality=4))
+    return medida
+
+
+def medir_serializacion(resultado, repeticiones=3):
+    """Tiempo de codificación por motor JSON y bytes en red de las figuras."""
+    figuras = list(_figuras(resultado))
+    if not figuras:
+        return {}
+
+    medicion = {}
+    for motor in MOTORES_JSON:
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for fig in figuras:
+                to_json_plotly(fig, engine=motor)
+            tiempos.append(time.perf_counter() - inicio)
+        medicion[f"segundos_json_{motor}"] = min(tiempos)
+
+    crudo = b"".join(to_json_plotly(fig).encode("utf-8") for fig in figuras)
+    medicion.update(_bytes_red(crudo))
+
+    # Misma medida con la precisión recortada (sobre copias de las figuras)
+    recortado = b"".join(
+        to_json_plotly(recortar_figura(type(fig)(fig))).encode("utf-8") for fig in figuras)
+    medicion["bytes_recortado"] = len(recortado)
+    medicion.update({f"{k}_recortado": v for k, v in _bytes_red(recortado).items()})
+    return medicion
+
+
+def medir(funcion, args, repeticiones=3):
+    """Ejecuta `funcion(*args)` y retorna tiempos, memoria pico y bytes."""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+
+    # Corrida aparte para memoria: tracemalloc agrega overhead al tiempo
+    tracemalloc.start()
+    funcion(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "segundos_min": min(tiempos),
+        "segundos_mediana": statistics.median(tiempos),
+        "memoria_pico_mb": pico / 1e6,
+        "bytes_figura": _bytes_figuras(resultado),
+        **medir_serializacion(resultado, repeticiones),
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True,
+            stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+
+
+# CASOS DE BENCHMARK
+# Cada caso es (nombre, funcion, constructor de argumentos, usa_filtro). El
+# constructor recibe la selección de municipio ('TODOS' o un municipio); las
+# funciones que no dependen del filtro se miden una sola vez.
+
+def _p2(seleccion):
+    # logica_p2 usa 'Todos' como centinela en lugar de 'TODOS'
+    return "Todos" if seleccion == "TODOS" else seleccion
+
+
+def casos_figuras(df_p1, df_p2, df_p3, df_insights, aux):
+    periodos = sorted(df_p2["periodo"].dropna().unique())
+    estrato_col = aux["detected"]["col_estrato"]
+    metrics_list = aux["metrics_list"]
+    celdas_brecha = logica_p2.construir_celdas_brecha(df_p2)
+    indice_colegios = colegios.construir_indice(df_p2, por="cole_naturaleza")
+    codigo_colegio = indice_colegios.codigos[0]
+    precalculos_p3 = logica_p3.precalcular_p3(df_p3)
+
+    return [
+        ("logica_p1.generar_boxplot_brecha", logica_p1.generar_boxplot_brecha,
+         lambda m: (df_p1, m), True),
+        ("logica_p1.generar_dispersion_pib_brecha", logica_p1.generar_dispersion_pib_brecha,
+         lambda m: (df_p1,), False),
+        ("logica_p1.calcular_estadisticas_brecha", logica_p1.calcular_estadisticas_brecha,
+         lambda m: (df_p1, m), True),
+        ("logica_p1.generar_barras_brecha_error", logica_p1.generar_barras_brecha_error,
+         lambda m: (df_p1, m), True),
+        ("logica_p1.generar_mapa_pib_puntaje", logica_p1.generar_mapa_pib_puntaje,
+         lambda m: (df_p1, m), True),
+        ("logica_p1.generar_mapa_pib_puntaje_base", logica_p1.generar_mapa_pib_puntaje_base,
+         lambda m: (df_p1,), False),
+
+        ("logica_p2.filtrar_datos", logica_p2.filtrar_datos,
+         lambda m: (df_p2, _p2(m), periodos), True),
+        ("logica_p2.calcular_brechas", logica_p2.calcular_brechas,
+         lambda m: (logica_p2.filtrar_datos(df_p2, _p2(m), periodos),), True),
+        ("logica_p2.construir_celdas_brecha", logica_p2.construir_celdas_brecha,
+         lambda m: (df_p2,), False),
+        ("logica_p2.calcular_brechas_ajustadas", logica_p2.calcular_brechas_ajustadas,
+         lambda m: (celdas_brecha, _p2(m), periodos), True),
+        ("logica_p2.generar_boxplots_materias", logica_p2.generar_boxplots_materias,
+         lambda m: (logica_p2.filtrar_datos(df_p2, _p2(m), periodos),), True),
+        ("logica_p2.generar_brecha_por_estrato", logica_p2.generar_brecha_por_estrato,
+         lambda m: (logica_p2.filtrar_datos(df_p2, _p2(m), periodos), "punt_global"), True),
+        ("logica_p2.generar_mapa_brecha", logica_p2.generar_mapa_brecha,
+         lambda m: (df_p2, "punt_global", _p2(m)), True),
+        ("logica_p2.generar_mapa_brecha_base", logica_p2.generar_mapa_brecha_base,
+         lambda m: (df_p2, "punt_global"), False),
+
+        ("logica_p3.generar_mapa_antioquia", logica_p3.generar_mapa_antioquia,
+         lambda m: (df_p3, m), True),
+        ("logica_p3.generar_mapa_antioquia_base", logica_p3.generar_mapa_antioquia_base,
+         lambda m: (df_p3,), False),
+        ("logica_p3.generar_ranking_municipios_estatico", logica_p3.generar_ranking_municipios_estatico,
+         lambda m: (df_p3,), False),
+        ("logica_p3.generar_histograma_tic", logica_p3.generar_histograma_tic,
+         lambda m: (df_p3, m), True),
+        ("logica_p3.generar_dispersion_regresion", logica_p3.generar_dispersion_regresion,
+         lambda m: (df_p3, m), True),
+        ("logica_p3.generar_dispersion_clusters", logica_p3.generar_dispersion_clusters,
+         lambda m: (df_p3, m), True),
+        ("logica_p3.calcular_probabilidad_b1", logica_p3.calcular_probabilidad_b1,
+         lambda m: (df_p3, m), True),
+        ("logica_p3.generar_serie_tic_ingles_por_periodo", logica_p3.generar_serie_tic_ingles_por_periodo,
+         lambda m: (df_p3, m), True),
+        # Lo que corre el tablero: contingencia y series calculadas al cargar
+        ("logica_p3.precalcular_p3", logica_p3.precalcular_p3,
+         lambda m: (df_p3,), False),
+        ("logica_p3.generar_histograma_tic_desde_tensor", logica_p3.generar_histograma_tic_desde_tensor,
+         lambda m: (precalculos_p3["tensor"], m), True),
+        ("logica_p3.diferencial_b1", logica_p3.diferencial_b1,
+         lambda m: (precalculos_p3["tensor"], m), True),
+        ("logica_p3.generar_serie_tic_ingles_desde_series", logica_p3.generar_serie_tic_ingles_desde_series,
+         lambda m: (precalculos_p3["series"], m), True),
+
+        # Consultas del índice de vecinos (se corren en cada cambio del dropdown)
+        ("vecinos.k_vecinos", lambda m: vecinos.indice().k_vecinos(m),
+         lambda m: (m,), True),
+        ("vecinos.en_radio", lambda m: vecinos.indice().en_radio(m, 30),
+         lambda m: (m,), True),
+
+        # Índice de colegios (al cargar) y consultas del dropdown y del detalle
+        ("colegios.construir_indice", colegios.construir_indice,
+         lambda m: (df_p2, "cole_naturaleza"), False),
+        ("colegios.buscar", lambda m: indice_colegios.buscar("INSTITUCION EDU", _p2(m)),
+         lambda m: (m,), True),
+        ("colegios.buscar_subcadena", lambda m: indice_colegios.buscar("EDUCATIVA", _p2(m)),
+         lambda m: (m,), True),
+        ("colegios.estadisticas", indice_colegios.estadisticas,
+         lambda m: (codigo_colegio,), False),
+
+        # Intervalos bootstrap de las tres brechas para todos los municipios
+        ("bootstrap.calcular_intervalos", bootstrap.calcular_intervalos,
+         lambda m: (df_p1, df_p2, logica_p3.construir_tensor_tic(df_p3)), False),
+
+        ("logica_insights.build_bar_with_comparisons", logica_insights.build_bar_with_comparisons,
+         lambda m: (df_insights, metrics_list[0], estrato_col, metrics_list), False),
+    ]
+
+
+def correr_tamano(n_filas, directorio, repeticiones, municipio):
+    limpio, crudo = escribir_dataset(directorio, n_filas)
+    salida_limpieza = os.path.join(directorio, f"limpieza_{n_filas}.csv")
+    resultados = []
+
+    def registrar(nombre, funcion, args, seleccion):
+        print(f"  {nombre} [{seleccion or '-'}]", flush=True)
+        medicion = medir(funcion, args, repeticiones)
+        medicion.update({"funcion": nombre, "filas": n_filas, "seleccion": seleccion})
+        resultados.append(medicion)
+
+    # Limpieza y cargadores
+    registrar("data_clean.run", data_clean.run, (crudo, salida_limpieza), None)
+    registrar("logica_p1.cargar_datos_p1", logica_p1.cargar_datos_p1, (limpio,), None)
+    registrar("logica_p2.cargar_datos", logica_p2.cargar_datos, (limpio,), None)
+    registrar("logica_p3.cargar_datos_p3", logica_p3.cargar_datos_p3, (limpio,), None)
+    registrar("logica_insights.obtener_figuras_eda", logica_insights.obtener_figuras_eda, (limpio,), None)
+
+    df_p1 = logica_p1.cargar_datos_p1(limpio)
+    df_p2 = logica_p2.cargar_datos(limpio)
+    df_p3 = logica_p3.cargar_datos_p3(limpio)
+    _, _, aux = logica_insights.obtener_figuras_eda(limpio)
+
+    for nombre, funcion, construir_args, usa_filtro in casos_figuras(df_p1, df_p2, df_p3, aux["df"], aux):
+        if not usa_filtro:
+            registrar(nombre, funcion, construir_args(None), None)
+            continue
+        for seleccion in ("TODOS", municipio):
+            registrar(nombre, funcion, construir_args(seleccion), seleccion)
+
+    return resultados
+
+
+# COMPARACION ENTRE COMMITS
+
+def comparar(ruta_base, ruta_nueva):
+    with open(ruta_base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(ruta_nueva, encoding="utf-8") as f:
+        nueva = json.load(f)
+
+    def _clave(r):
+        return (r["funcion"], r["filas"], r["seleccion"])
+
+    indice_base = {_clave(r): r for r in base["resultados"]}
+    print(f"Base: {base['commit']}  ->  Nuevo: {nueva['commit']}")
+    print(f"{'funcion':55} {'filas':>8} {'seleccion':>10} {'tiempo':>8} {'memoria':>8} {'bytes':>8} {'gzip':>8}")
+    for r in nueva["resultados"]:
+        b = indice_base.get(_clave(r))
+        if b is None:
+            continue
+
+        def _ratio(campo):
+            return f"{r[campo] / b[campo]:.2f}x" if b.get(campo) and campo in r else "-"
+
+        print(f"{r['funcion']:55} {r['filas']:>8} {str(r['seleccion'] or '-'):>10} "
+              f"{_ratio('segundos_mediana'):>8} {_ratio('memoria_pico_mb'):>8} {_ratio('bytes_figura'):>8} "
+              f"{_ratio('bytes_red_gzip'):>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--municipio", default=MUNICIPIO_DEFECTO)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"))
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for n_filas in args.tamanos:
+            print(f"[bench] {n_filas:,} filas")
+            resultados.extend(correr_tamano(n_filas, directorio, args.repeticiones, args.municipio))
+
+    commit = _commit_actual()
+    salida = args.salida or os.path.join(RESULTADOS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(salida), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "resultados": resultados,
+        }, f, indent=2)
+    print(f"[bench] Resultados guardados en: {salida}")
+
+
+if __name__ == "__main__":
+    main()
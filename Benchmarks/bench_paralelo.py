@@ -0,0 +1,128 @@
+"""Tiempo de pared de los tableros con construcción concurrente de figuras.
+
+Para `construir_tablero_p1`, `construir_tablero_p3` (con 'TODOS' y un
+municipio) y `obtener_figuras_eda` mide la mediana del tiempo de pared con
+cada modo (`hilos`, `procesos`) y grado de paralelismo de
+`Analysis/paralelo.py`, sobre un dataset sintético. Para los tableros
+también mide cada figura por separado: la meta es que el tiempo se acerque
+al de la figura más lenta y no a la suma.
+
+Uso (desde la raíz del repositorio, en una máquina con varios núcleos):
+
+    python -m Benchmarks.bench_paralelo --filas 200000 --grados 1 2 4
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+
+from Analysis import logica_insights, logica_p1, logica_p3, paralelo  # noqa: E402
+from Benchmarks.datos_sinteticos import escribir_dataset  # noqa: E402
+
+MUNICIPIO_DEFECTO = "MEDELLIN"
+
+
+def _mediana(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def casos(limpio, municipio):
+    """(nombre, función sin argumentos, [(figura, función)] o None) de cada caso."""
+    df_p1 = logica_p1.cargar_datos_p1(limpio)
+    df_p3 = logica_p3.cargar_datos_p3(limpio)
+    precalculos = logica_p3.precalcular_p3(df_p3)
+    tensor = precalculos["tensor"]
+
+    resultado = []
+    for seleccion in ("TODOS", municipio):
+        resultado.append((
+            f"tablero_p1[{seleccion}]",
+            lambda s=seleccion: logica_p1.construir_tablero_p1(df_p1, s),
+            [(f.__name__, lambda f=f, s=seleccion: f(df_p1, s)) for f in (
+                logica_p1.generar_boxplot_brecha, logica_p1.generar_barras_brecha_error,
+                logica_p1.calcular_estadisticas_brecha)],
+        ))
+        resultado.append((
+            f"tablero_p3[{seleccion}]",
+            lambda s=seleccion: logica_p3.construir_tablero_p3(df_p3, s, precalculos=precalculos),
+            [
+                ("histograma", lambda s=seleccion: logica_p3.generar_histograma_tic_desde_tensor(tensor, s)),
+                ("dispersion", lambda s=seleccion: logica_p3.generar_dispersion_clusters(df_p3, s)),
+                ("texto_b1", lambda s=seleccion: logica_p3.texto_b1_con_vecinos(tensor, s)),
+                ("serie", lambda s=seleccion: logica_p3.generar_serie_tic_ingles_desde_series(
+                    precalculos["series"], s)),
+            ],
+        ))
+    resultado.append(("obtener_figuras_eda", lambda: logica_insights.obtener_figuras_eda(limpio), None))
+    return resultado
+
+
+def correr(n_filas, grados, modos, repeticiones, municipio):
+    filas = []
+    with tempfile.TemporaryDirectory() as directorio:
+        limpio, _ = escribir_dataset(directorio, n_filas)
+        for nombre, funcion, figuras in casos(limpio, municipio):
+            # Calentamiento: imports de plotly/scipy, índice de vecinos, pools
+            funcion()
+            fila = {"caso": nombre, "filas": n_filas, "tiempos": {}}
+            if figuras:
+                por_figura = {f: _mediana(g, repeticiones) for f, g in figuras}
+                fila.update(suma_figuras=sum(por_figura.values()), max_figura=max(por_figura.values()),
+                            por_figura=por_figura)
+            for modo in modos:
+                for grado in grados:
+                    paralelo.GRADO, paralelo.MODO = grado, modo
+                    fila["tiempos"][f"{modo}/{grado}"] = _mediana(funcion, repeticiones)
+            filas.append(fila)
+            _imprimir(fila)
+    paralelo.cerrar()
+    return filas
+
+
+def _imprimir(fila):
+    base = fila["tiempos"].get(next(iter(fila["tiempos"])))
+    print(f"\n{fila['caso']} ({fila['filas']:,} filas)")
+    if "suma_figuras" in fila:
+        print(f"  figuras por separado: suma {fila['suma_figuras']:.3f}s, "
+              f"la más lenta {fila['max_figura']:.3f}s")
+    for clave, segundos in fila["tiempos"].items():
+        extra = f"  / más lenta {segundos / fila['max_figura']:.2f}x" if "max_figura" in fila else ""
+        print(f"  {clave:12} {segundos:8.3f}s  aceleración {base / segundos:5.2f}x{extra}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[200000])
+    parser.add_argument("--grados", type=int, nargs="+", default=sorted({1, 2, min(4, os.cpu_count() or 1)}))
+    parser.add_argument("--modos", nargs="+", choices=paralelo.MODOS, default=list(paralelo.MODOS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--municipio", default=MUNICIPIO_DEFECTO)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    print(f"[bench] {os.cpu_count()} núcleos")
+    resultados = []
+    for n_filas in args.filas:
+        resultados.extend(correr(n_filas, args.grados, args.modos, args.repeticiones, args.municipio))
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"nucleos": os.cpu_count(), "resultados": resultados}, f, indent=2)
+        print(f"[bench] Resultados guardados en: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+"""Generador de carga que reproduce sesiones realistas contra `app.server`.
+
+Cada usuario virtual abre una página, dispara los callbacks iniciales como
+lo haría el navegador y luego interactúa: cambios de municipio en
+/pregunta_1 y /pregunta_3, arrastres del slider de periodos y cambios de
+materia en /pregunta_2 y cambios de métrica en /insights. Todo se arma a
+partir de `/_dash-dependencies` y del layout que devuelve el servidor, así
+que no hay que mantener los payloads a mano.
+
+Los callbacks en segundo plano (`background=True`) se siguen como lo hace
+el navegador: la primera respuesta trae `cacheKey` y `job` y se sondea el
+mismo endpoint hasta que llega el resultado. Cada sondeo se registra como
+`sondeo:<callback>` y el tiempo hasta el resultado como `<callback>:total`.
+
+Reporta latencias p50/p95/p99 por tipo de petición, throughput y RSS de
+los workers de Gunicorn. Funciona sin conexión a internet.
+
+Uso (desde la raíz del repositorio):
+
+    # Lanza Gunicorn con 4 workers y 16 usuarios concurrentes por 2 minutos
+    python -m Benchmarks.carga_dashboard --lanzar --workers 4 --concurrencia 16 --duracion 120
+
+    # Contra un servidor ya levantado (para RSS indicar el PID del master)
+    python -m Benchmarks.carga_dashboard --url http://127.0.0.1:8050 --pid-gunicorn 1234
+"""
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode, urlparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS_DIR = os.path.join(RAIZ, "Benchmarks", "resultados")
+
+PAGINAS = ["/pregunta_1", "/pregunta_2", "/pregunta_3", "/insights"]
+PESO_PAGINAS = [0.3, 0.35, 0.25, 0.1]
+
+
+# CLIENTE HTTP
+
+def _descomprimir(contenido, codificacion):
+    if codificacion == "gzip":
+        return gzip.decompress(contenido)
+    if codificacion == "br":
+        return brotli.decompress(contenido)
+    return contenido
+
+
+class Cliente:
+    """Conexión keep-alive a un servidor Dash que registra latencias."""
+
+    def __init__(self, url, registro):
+        destino = urlparse(url)
+        self.host = destino.hostname
+        self.port = destino.port or 80
+        self.registro = registro
+        self.conexion = None
+
+    def _conectar(self):
+        self.conexion = http.client.HTTPConnection(self.host, self.port, timeout=300)
+
+    def pedir(self, metodo, ruta, tipo, cuerpo=None):
+        if self.conexion is None:
+            self._conectar()
+        encabezados = {"Accept-Encoding": "gzip, br" if brotli is not None else "gzip"}
+        datos = None
+        if cuerpo is not None:
+            datos = json.dumps(cuerpo).encode("utf-8")
+            encabezados["Content-Type"] = "application/json"
+
+        inicio = time.perf_counter()
+        try:
+            self.conexion.request(metodo, ruta, body=datos, headers=encabezados)
+            respuesta = self.conexion.getresponse()
+            contenido = respuesta.read()
+            estado = respuesta.status
+            codificacion = respuesta.getheader("Content-Encoding", "")
+        except (OSError, http.client.HTTPException):
+            self.conexion.close()
+            self.conexion = None
+            self.registro.anotar(tipo, time.perf_counter() - inicio, 0, ok=False)
+            return None, None
+        duracion = time.perf_counter() - inicio
+        # Se registran los bytes en red (comprimidos); se devuelve el cuerpo descomprimido
+        self.registro.anotar(tipo, duracion, len(contenido), ok=200 <= estado < 300 or estado == 204)
+        return estado, _descomprimir(contenido, codificacion)
+
+    def json(self, metodo, ruta, tipo, cuerpo=None):
+        estado, contenido = self.pedir(metodo, ruta, tipo, cuerpo)
+        if estado != 200 or not contenido:
+            return None
+        return json.loads(contenido)
+
+
+class Registro:
+    """Acumula latencias y bytes por tipo de petición de forma segura entre hilos."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = {}
+        self.bytes = {}
+        self.errores = {}
+
+    def anotar(self, tipo, duracion, tamano, ok=True):
+        with self.lock:
+            self.latencias.setdefault(tipo, []).append(duracion)
+            self.bytes[tipo] = self.bytes.get(tipo, 0) + tamano
+            if not ok:
+                self.errores[tipo] = self.errores.get(tipo, 0) + 1
+
+
+# MODELO DE CALLBACKS DE DASH
+
+def _separar_salida(salida):
+    """Convierte '..a.figure...b.children..' en [{'id': 'a', 'property': 'figure'}, ...]."""
+    multi = salida.startswith("..")
+    partes = salida.strip(".").split("...") if multi else [salida]
+    salidas = []
+    for parte in partes:
+        id_, prop = parte.rsplit(".", 1)
+        salidas.append({"id": id_, "property": prop})
+    return salidas if multi else salidas[0]
+
+
+def _ids_salida(dep):
+    salidas = _separar_salida(dep["output"])
+    return [s["id"] for s in (salidas if isinstance(salidas, list) else [salidas])]
+
+
+def _recorrer_componentes(nodo, encontrados):
+    """Recolecta las props de todos los componentes con id dentro de un layout."""
+    if isinstance(nodo, list):
+        for hijo in nodo:
+            _recorrer_componentes(hijo, encontrados)
+        return
+    if not isinstance(nodo, dict):
+        return
+    props = nodo.get("props")
+    if isinstance(props, dict):
+        if isinstance(props.get("id"), str):
+            encontrados[props["id"]] = props
+        _recorrer_componentes(props.get("children"), encontrados)
+    else:
+        for valor in nodo.values():
+            _recorrer_componentes(valor, encontrados)
+
+
+class ModeloDash:
+    """Dependencias de callbacks del servidor, consultadas una sola vez."""
+
+    def __init__(self, dependencias):
+        self.servidor = [d for d in dependencias if not d.get("clientside_function")]
+        self.ruteo = next(d for d in self.servidor if "_pages_content.children" in d["output"])
+
+    @staticmethod
+    def _en_pagina(dep, ids_pagina):
+        # Como hace el navegador: entradas y salidas deben existir en la página actual
+        return (all(i["id"] in ids_pagina for i in dep["inputs"])
+                and all(id_ in ids_pagina for id_ in _ids_salida(dep)))
+
+    def por_entrada(self, id_componente, ids_pagina):
+        return [
+            d for d in self.servidor
+            if any(i["id"] == id_componente for i in d["inputs"])
+            and self._en_pagina(d, ids_pagina)
+        ]
+
+    def iniciales(self, ids_pagina):
+        return [
+            d for d in self.servidor
+            if d is not self.ruteo
+            and not d.get("prevent_initial_call")
+            and self._en_pagina(d, ids_pagina)
+        ]
+
+
+def _payload(dep, estado, cambiados):
+    def _valores(lista):
+        return [
+            {"id": i["id"], "property": i["property"], "value": estado.get((i["id"], i["property"]))}
+            for i in lista
+        ]
+    return {
+        "output": dep["output"],
+        "outputs": _separar_salida(dep["output"]),
+        "inputs": _valores(dep["inputs"]),
+        "state": _valores(dep.get("state", [])),
+        "changedPropIds": cambiados,
+    }
+
+
+def _tipo(dep):
+    salida = _separar_salida(dep["output"])
+    primera = salida[0] if isinstance(salida, list) else salida
+    return f"callback:{primera['id']}"
+
+
+# SESIONES
+
+class Sesion:
+    """Un usuario virtual navegando una página del tablero."""
+
+    def __init__(self, cliente, modelo, azar, pausa, sondeo=0.5, espera_maxima=120):
+        self.cliente = cliente
+        self.modelo = modelo
+        self.azar = azar
+        self.pausa = pausa
+        self.sondeo = sondeo
+        self.espera_maxima = espera_maxima
+        self.estado = {}
+        self.componentes = {}
+
+    def _pensar(self):
+        if self.pausa > 0:
+            time.sleep(self.azar.uniform(0.2, 1.0) * self.pausa)
+
+    def _disparar(self, dep, cambiados):
+        tipo = _tipo(dep)
+        cuerpo = _payload(dep, self.estado, cambiados)
+        inicio = time.perf_counter()
+        respuesta = self.cliente.json("POST", "/_dash-update-component", tipo, cuerpo)
+        if respuesta and "cacheKey" in respuesta and "job" in respuesta:
+            self._esperar_trabajo(tipo, cuerpo, respuesta, inicio)
+
+    def _esperar_trabajo(self, tipo, cuerpo, trabajo, inicio):
+        # Protocolo de callbacks en segundo plano: sondear hasta tener `response`
+        ruta = "/_dash-update-component?" + urlencode(
+            {"cacheKey": trabajo["cacheKey"], "job": trabajo["job"]})
+        limite = inicio + self.espera_maxima
+        while time.perf_counter() < limite:
+            time.sleep(self.sondeo)
+            respuesta = self.cliente.json("POST", ruta, f"sondeo:{tipo}", cuerpo)
+            if respuesta is None or "response" in respuesta:
+                break
+        else:
+            self.cliente.registro.anotar(f"{tipo}:total", time.perf_counter() - inicio, 0, ok=False)
+            return
+        self.cliente.registro.anotar(f"{tipo}:total", time.perf_counter() - inicio, 0,
+                                     ok=respuesta is not None)
+
+    def abrir(self, ruta):
+        self.cliente.pedir("GET", ruta, "pagina:html")
+        self.cliente.pedir("GET", "/_dash-layout", "pagina:layout")
+        self.estado = {
+            (i["id"], i["property"]): None for i in self.modelo.ruteo["inputs"]
+        }
+        self.estado[("_pages_location", "pathname")] = ruta
+        self.estado[("_pages_location", "search")] = ""
+        respuesta = self.cliente.json(
+            "POST", "/_dash-update-component", "pagina:ruteo",
+            _payload(self.modelo.ruteo, self.estado, ["_pages_location.pathname"])
+        )
+        self.componentes = {}
+        if respuesta:
+            _recorrer_componentes(respuesta.get("response"), self.componentes)
+        for id_, props in self.componentes.items():
+            for prop, valor in props.items():
+                if prop != "children":
+                    self.estado[(id_, prop)] = valor
+        for dep in self.modelo.iniciales(self.componentes):
+            self._disparar(dep, [f"{i['id']}.{i['property']}" for i in dep["inputs"]])
+
+    def cambiar(self, id_componente, valor, prop="value"):
+        self._pensar()
+        self.estado[(id_componente, prop)] = valor
+        for dep in self.modelo.por_entrada(id_componente, self.componentes):
+            self._disparar(dep, [f"{id_componente}.{prop}"])
+
+    def _opciones(self, id_componente):
+        opciones = self.componentes.get(id_componente, {}).get("options") or []
+        return [o["value"] if isinstance(o, dict) else o for o in opciones]
+
+    def recorrer(self, ruta, interacciones):
+        self.abrir(ruta)
+        if ruta in ("/pregunta_1", "/pregunta_3"):
+            id_filtro = "filtro-municipio-p1" if ruta == "/pregunta_1" else "filtro-municipio"
+            municipios = self._opciones(id_filtro)
+            for _ in range(interacciones):
+                if municipios:
+                    self.cambiar(id_filtro, self.azar.choice(municipios))
+        elif ruta == "/pregunta_2":
+            municipios = self._opciones("filtro-municipio")
+            materias = self._opciones("filtro-materia-estrato")
+            tope = self.componentes.get("filtro-periodo-timeline", {}).get("max", 0)
+            for _ in range(interacciones):
+                accion = self.azar.random()
+                if accion < 0.4 and municipios:
+                    self.cambiar("filtro-municipio", self.azar.choice(municipios))
+                elif accion < 0.8 and tope:
+                    # Un arrastre del slider emite varios valores seguidos
+                    inicio = self.azar.randint(0, tope)
+                    for fin in range(inicio, min(tope, inicio + self.azar.randint(1, 4)) + 1):
+                        self.cambiar("filtro-periodo-timeline", [inicio, fin])
+                elif materias:
+                    self.cambiar(self.azar.choice(["filtro-materia-estrato", "filtro-materia-mapa"]),
+                                 self.azar.choice(materias))
+        elif ruta == "/insights":
+            metricas = self._opciones("metric-select")
+            for _ in range(interacciones):
+                if metricas:
+                    self.cambiar("metric-select", self.azar.choice(metricas))
+
+
+# RSS DE WORKERS
+
+def _hijos(pid):
+    hijos = []
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                campos = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(campos[1]) == pid:
+            hijos.append(int(entrada))
+    return hijos
+
+
+def _rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def monitorear_rss(pid_master, detener, muestras):
+    while not detener.is_set():
+        for pid in _hijos(pid_master):
+            rss = _rss_mb(pid)
+            if rss is not None:
+                muestras.setdefault(pid, []).append(rss)
+        detener.wait(1.0)
+
+
+# ORQUESTACION
+
+def lanzar_gunicorn(puerto, workers, espera=600):
+    proceso = subprocess.Popen(
+        ["gunicorn", "app:server", "-w", str(workers), "-b", f"127.0.0.1:{puerto}", "--timeout", "600"],
+        cwd=RAIZ
+    )
+    limite = time.time() + espera
+    while time.time() < limite:
+        try:
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=5)
+            conexion.request("GET", "/")
+            if conexion.getresponse().status == 200:
+                return proceso
+        except OSError:
+            pass
+        if proceso.poll() is not None:
+            raise RuntimeError("Gunicorn terminó antes de aceptar conexiones")
+        time.sleep(1)
+    proceso.terminate()
+    raise RuntimeError("Gunicorn no respondió a tiempo")
+
+
+def _percentil(valores, q):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, int(round(q * (len(ordenados) - 1))))]
+
+
+def resumir(registro, segundos, muestras_rss):
+    filas = []
+    for tipo, latencias in sorted(registro.latencias.items()):
+        filas.append({
+            "tipo": tipo,
+            "peticiones": len(latencias),
+            "errores": registro.errores.get(tipo, 0),
+            "p50_ms": _percentil(latencias, 0.50) * 1000,
+            "p95_ms": _percentil(latencias, 0.95) * 1000,
+            "p99_ms": _percentil(latencias, 0.99) * 1000,
+            "media_ms": statistics.mean(latencias) * 1000,
+            "kb_promedio": registro.bytes.get(tipo, 0) / len(latencias) / 1024,
+        })
+    total = sum(f["peticiones"] for f in filas)
+    return {
+        "segundos": segundos,
+        "peticiones": total,
+        "throughput_rps": total / segundos if segundos else 0.0,
+        "por_tipo": filas,
+        "rss_workers_mb": {
+            str(pid): {"max": max(m), "final": m[-1]} for pid, m in muestras_rss.items() if m
+        },
+    }
+
+
+def imprimir(resumen):
+    print(f"\n{'tipo':42} {'n':>7} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'KB':>8}")
+    for f in resumen["por_tipo"]:
+        print(f"{f['tipo']:42} {f['peticiones']:>7} {f['errores']:>5} {f['p50_ms']:>7.0f}ms "
+              f"{f['p95_ms']:>7.0f}ms {f['p99_ms']:>7.0f}ms {f['kb_promedio']:>8.1f}")
+    print(f"\nThroughput: {resumen['throughput_rps']:.1f} peticiones/s "
+          f"({resumen['peticiones']:,} en {resumen['segundos']:.0f}s)")
+    for pid, rss in resumen["rss_workers_mb"].items():
+        print(f"Worker {pid}: RSS máx {rss['max']:.0f} MB, final {rss['final']:.0f} MB")
+
+
+def correr(args):
+    registro = Registro()
+    descubrimiento = Cliente(args.url, registro)
+    dependencias = descubrimiento.json("GET", "/_dash-dependencies", "pagina:dependencias")
+    if dependencias is None:
+        sys.exit(f"No se pudo leer /_dash-dependencies en {args.url}")
+    modelo = ModeloDash(dependencias)
+
+    detener = threading.Event()
+    muestras_rss = {}
+    if args.pid_gunicorn:
+        threading.Thread(target=monitorear_rss, args=(args.pid_gunicorn, detener, muestras_rss),
+                         daemon=True).start()
+
+    fin = time.time() + args.duracion
+
+    def usuario(numero):
+        azar = random.Random(args.semilla + numero)
+        cliente = Cliente(args.url, registro)
+        while time.time() < fin:
+            ruta = azar.choices(PAGINAS, weights=PESO_PAGINAS)[0]
+            Sesion(cliente, modelo, azar, args.pausa, args.sondeo).recorrer(ruta, args.interacciones)
+
+    print(f"[carga] {args.concurrencia} usuarios durante {args.duracion:.0f}s contra {args.url}")
+    inicio = time.time()
+    hilos = [threading.Thread(target=usuario, args=(i,), daemon=True) for i in range(args.concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.time() - inicio
+    detener.set()
+
+    resumen = resumir(registro, segundos, muestras_rss)
+    resumen.update({
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "url": args.url,
+        "concurrencia": args.concurrencia,
+        "workers": args.workers if args.lanzar else None,
+    })
+    imprimir(resumen)
+
+    salida = args.salida or os.path.join(
+        RESULTADOS_DIR, f"carga_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(salida), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resumen, f, indent=2)
+    print(f"[carga] Resultados guardados en: {salida}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8050")
+    parser.add_argument("--concurrencia", type=int, default=8, help="Usuarios virtuales simultáneos")
+    parser.add_argument("--duracion", type=float, default=60, help="Segundos de prueba")
+    parser.add_argument("--interacciones", type=int, default=6, help="Interacciones por sesión")
+    parser.add_argument("--pausa", type=float, default=1.0, help="Escala del tiempo de pensar (0 = sin pausa)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--sondeo", type=float, default=0.5,
+                        help="Segundos entre sondeos de callbacks en segundo plano")
+    parser.add_argument("--lanzar", action="store_true", help="Levantar Gunicorn en localhost")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--pid-gunicorn", type=int, default=None, help="PID del master para medir RSS")
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    proceso = None
+    if args.lanzar:
+        puerto = urlparse(args.url).port or 8050
+        print(f"[carga] Lanzando Gunicorn ({args.workers} workers) en el puerto {puerto}...")
+        proceso = lanzar_gunicorn(puerto, args.workers)
+        args.pid_gunicorn = proceso.pid
+
+    # El Gunicorn lanzado se detiene también si la prueba falla
+    try:
+        correr(args)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Generador de datasets sintéticos con el mismo esquema del Saber 11 limpio.
+# El CSV real se versiona con Git LFS, así que para medir rendimiento
+# generamos datos de tamaño controlado con los municipios reales de Antioquia.
+
+MUNICIPIOS_PATH = os.path.join("Data", "municipios_unicos.csv")
+
+PERIODOS = [20151, 20152, 20161, 20162, 20171, 20172, 20181, 20182,
+            20191, 20192, 20201, 20202, 20211, 20212, 20221, 20222]
+ESTRATOS = ["Estrato 1", "Estrato 2", "Estrato 3", "Estrato 4",
+            "Estrato 5", "Estrato 6", "Sin Estrato"]
+PESO_ESTRATOS = [0.28, 0.32, 0.22, 0.08, 0.04, 0.02, 0.04]
+NIVELES_INGLES = ["A-", "A1", "A2", "B1", "B+"]
+
+
+def _municipios():
+    df_coord = pd.read_csv(MUNICIPIOS_PATH, encoding="utf-8-sig")
+    nombres = df_coord["cole_mcpio_ubicacion"].tolist()
+    # Medellín concentra buena parte de los estudiantes, como en los datos reales
+    pesos = np.ones(len(nombres))
+    if "MEDELLIN" in nombres:
+        pesos[nombres.index("MEDELLIN")] = len(nombres) * 0.6
+    return nombres, pesos / pesos.sum()
+
+
+def generar_limpio(n_filas, semilla=0):
+    """Genera un DataFrame con el esquema de `saber11_Antioquia_clean.csv`.
+
+    Los puntajes dependen del estrato, la naturaleza del colegio, la zona y
+    el acceso a TIC para que las brechas y regresiones tengan forma realista.
+    """
+    rng = np.random.default_rng(semilla)
+    nombres, pesos = _municipios()
+
+    idx_mpio = rng.choice(len(nombres), size=n_filas, p=pesos)
+    municipio = np.array(nombres, dtype=object)[idx_mpio]
+    estrato_idx = rng.choice(len(ESTRATOS), size=n_filas, p=PESO_ESTRATOS)
+    privado = rng.random(n_filas) < (0.08 + 0.07 * np.minimum(estrato_idx, 5))
+    prob_urbano = np.full(n_filas, 0.55)
+    if "MEDELLIN" in nombres:
+        prob_urbano[idx_mpio == nombres.index("MEDELLIN")] = 0.95
+    urbano = rng.random(n_filas) < prob_urbano
+    internet = rng.random(n_filas) < (0.35 + 0.1 * np.minimum(estrato_idx, 5) + 0.15 * urbano)
+    computador = rng.random(n_filas) < (0.25 + 0.1 * np.minimum(estrato_idx, 5) + 0.1 * internet)
+
+    # Efecto base compartido por todas las materias
+    efecto = (
+        2.0 * np.minimum(estrato_idx, 5)
+        + 5.0 * privado
+        + 3.0 * urbano
+        + 2.0 * internet
+        + rng.normal(0, 8, n_filas)
+    )
+
+    def _puntaje(base, dispersion):
+        valores = base + efecto + rng.normal(0, dispersion, n_filas)
+        return np.clip(np.round(valores), 0, 100).astype(int)
+
+    punt_ingles = _puntaje(45, 10)
+    punt_matematicas = _puntaje(47, 10)
+    punt_sociales = _puntaje(44, 9)
+    punt_naturales = _puntaje(46, 8)
+    punt_lectura = _puntaje(50, 8)
+    punt_global = np.round(
+        (3 * punt_matematicas + 3 * punt_sociales + 3 * punt_naturales
+         + 3 * punt_lectura + punt_ingles) / 13 * 5
+    ).astype(int)
+
+    desemp_ingles = np.array(NIVELES_INGLES, dtype=object)[
+        np.digitize(punt_ingles, [36, 48, 58, 70])
+    ]
+
+    # Códigos de colegio: unos cuantos colegios por municipio
+    colegio_idx = idx_mpio * 40 + rng.integers(0, 40, n_filas)
+
+    return pd.DataFrame({
+        "estu_consecutivo": [f"SB{i:011d}" for i in range(n_filas)],
+        "periodo": rng.choice(PERIODOS, size=n_filas),
+        "cole_cod_dane_establecimiento": (105000000000 + colegio_idx).astype(str),
+        "cole_nombre_establecimiento": [
+            f"INSTITUCION EDUCATIVA {m} {c % 40}" for m, c in zip(municipio, colegio_idx)
+        ],
+        "cole_cod_mcpio_ubicacion": (5000 + idx_mpio).astype(str),
+        "cole_mcpio_ubicacion": municipio,
+        "cole_depto_ubicacion": "ANTIOQUIA",
+        "cole_naturaleza": np.where(privado, "NO OFICIAL", "OFICIAL"),
+        "cole_area_ubicacion": np.where(urbano, "URBANO", "RURAL"),
+        "cole_caracter": rng.choice(["ACADEMICO", "TECNICO", "TECNICO/ACADEMICO"], size=n_filas),
+        "cole_genero": rng.choice(["MIXTO", "FEMENINO", "MASCULINO"], size=n_filas, p=[0.9, 0.06, 0.04]),
+        "cole_bilingue": np.where(privado & (rng.random(n_filas) < 0.2), "S", "N"),
+        "fami_estratovivienda": np.array(ESTRATOS, dtype=object)[estrato_idx],
+        "fami_tieneinternet": np.where(internet, "Si", "No"),
+        "fami_tienecomputador": np.where(computador, "Si", "No"),
+        "desemp_ingles": desemp_ingles,
+        "punt_ingles": punt_ingles,
+        "punt_matematicas": punt_matematicas,
+        "punt_sociales_ciudadanas": punt_sociales,
+        "punt_c_naturales": punt_naturales,
+        "punt_lectura_critica": punt_lectura,
+        "punt_global": punt_global,
+    })
+
+
+def generar_crudo(n_filas, semilla=0):
+    """Versión "sucia" del dataset para medir `data_clean.run`: tildes,
+    comillas, bilingüe vacío, puntajes fuera de rango y duplicados."""
+    rng = np.random.default_rng(semilla + 1)
+    df = generar_limpio(n_filas, semilla)
+
+    df["cole_naturaleza"] = df["cole_naturaleza"].str.replace("NO OFICIAL", '"NO OFICIAL"')
+    df["cole_caracter"] = df["cole_caracter"].str.replace("ACADEMICO", "ACADÉMICO")
+    df["cole_mcpio_ubicacion"] = " " + df["cole_mcpio_ubicacion"] + " "
+    df.loc[rng.random(n_filas) < 0.3, "cole_bilingue"] = np.nan
+    df.loc[rng.random(n_filas) < 0.01, "fami_estratovivienda"] = "SIN INFORMACION"
+    df.loc[rng.random(n_filas) < 0.005, "punt_matematicas"] = 999
+    df.loc[rng.random(n_filas) < 0.005, "punt_global"] = np.nan
+
+    duplicados = df.sample(frac=0.01, random_state=semilla)
+    return pd.concat([df, duplicados], ignore_index=True)
+
+
+def escribir_dataset(directorio, n_filas, semilla=0):
+    """Escribe los CSV limpio y crudo en `directorio` y retorna sus rutas."""
+    os.makedirs(directorio, exist_ok=True)
+    limpio = os.path.join(directorio, f"saber11_sintetico_{n_filas}_clean.csv")
+    crudo = os.path.join(directorio, f"saber11_sintetico_{n_filas}_raw.csv")
+    generar_limpio(n_filas, semilla).to_csv(limpio, index=False)
+    generar_crudo(n_filas, semilla).to_csv(crudo, index=False)
+    return limpio, crudo
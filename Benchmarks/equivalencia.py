@@ -0,0 +1,520 @@
+"""Salidas de referencia contra salidas optimizadas de las funciones de análisis.
+
+Corre los cargadores y los `generar_*` / `calcular_*` de `logica_p1`,
+`logica_p2`, `logica_p3` y `logica_insights` con dos versiones del código:
+
+- referencia: `Analysis/` en un commit (`--referencia`, por defecto `HEAD`)
+  o un archivo dorado guardado antes con `--guardar-dorado`;
+- optimizado: el árbol de trabajo (o `--optimizado <commit>`).
+
+Cada versión corre en su propio proceso, sobre el mismo dataset sintético
+(y una muestra del dataset real con `--muestra`), para 'TODOS' y cada
+municipio. Cada versión corre desde una raíz con `Data/` donde el dataset
+limpio es el de la corrida, así que también se comparan los cargadores
+viejos que no reciben la ruta. De cada resultado se extraen los números de
+fondo: índices y columnas de las tablas, arreglos de las trazas de las
+figuras (x, y, z, lat, lon, customdata, barras de error...), textos y
+valores del layout sin la plantilla. Las columnas que solo devuelve una de
+las versiones no se comparan. Los números se comparan con tolerancia
+(`--rtol`, `--atol`) y los textos con los números que contienen también
+con tolerancia. El reporte da, por función, cuántos filtros difieren y la
+aceleración total. Las funciones que no existen en la referencia salen
+como SIN REFERENCIA; las que existen y fallan en cualquiera de las dos
+versiones cuentan como diferencia. Los cambios de salida intencionales
+están en `DIFERENCIAS_ESPERADAS`: se muestran pero no cuentan como
+diferencia.
+
+Uso (desde la raíz del repositorio, con los cambios sin commitear):
+
+    python -m Benchmarks.equivalencia --filas 50000
+    python -m Benchmarks.equivalencia --referencia main --muestra 50000 --municipios 10
+    python -m Benchmarks.equivalencia --guardar-dorado dorado.pkl   # y luego --dorado dorado.pkl
+
+Sale con código 1 si alguna función difiere (fuera de las esperadas).
+"""
+import argparse
+import base64
+import inspect
+import io
+import json
+import math
+import os
+import pickle
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import traceback
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+# Los cargadores usan rutas relativas a la raíz ('Data/...')
+os.chdir(RAIZ)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from Benchmarks.datos_sinteticos import generar_limpio  # noqa: E402
+
+RUTAS_REALES = (os.path.join("Data", "saber11_Antioquia_clean.parquet"),
+                os.path.join("Data", "saber11_Antioquia_clean.csv"))
+COLUMNA_MUNICIPIO = "cole_mcpio_ubicacion"
+COLUMNA_MATERIA = "punt_global"
+NUMERO = re.compile(r"-?\d+(?:[.,]\d+)?(?:[eE][-+]?\d+)?")
+MAX_DIFERENCIAS = 3
+
+
+# CASOS
+# Cada caso es (nombre, filtro, argumentos). `filtro` es None (se corre una
+# vez), "municipio" ('TODOS' o un municipio) o "municipio_p2" ('Todos' o un
+# municipio); `argumentos(m, ctx, valor)` recibe los módulos de la versión
+# que corre, los datos cargados y el valor del filtro, y no se mide.
+
+def _filtrado_p2(m, ctx, valor):
+    return m["logica_p2"].filtrar_datos(ctx["df_p2"], valor, ctx["periodos"])
+
+
+def _cargador(modulo, funcion):
+    # Los cargadores anteriores a las optimizaciones no reciben la ruta: leen
+    # 'Data/saber11_Antioquia_clean.csv' del directorio actual, que en cada
+    # versión es una raíz de datos con el dataset de la corrida (`_raiz_datos`)
+    def argumentos(m, ctx, valor):
+        parametros = inspect.signature(getattr(m[modulo], funcion)).parameters
+        return (ctx["ruta"],) if parametros else ()
+    return argumentos
+
+
+CASOS = [
+    ("logica_p1.cargar_datos_p1", None, _cargador("logica_p1", "cargar_datos_p1")),
+    ("logica_p1.generar_boxplot_brecha", "municipio", lambda m, ctx, v: (ctx["df_p1"], v)),
+    ("logica_p1.generar_dispersion_pib_brecha", None, lambda m, ctx, v: (ctx["df_p1"],)),
+    ("logica_p1.calcular_estadisticas_brecha", "municipio", lambda m, ctx, v: (ctx["df_p1"], v)),
+    ("logica_p1.generar_barras_brecha_error", "municipio", lambda m, ctx, v: (ctx["df_p1"], v)),
+    ("logica_p1.generar_mapa_pib_puntaje", "municipio", lambda m, ctx, v: (ctx["df_p1"], v)),
+    ("logica_p1.generar_mapa_pib_puntaje_base", None, lambda m, ctx, v: (ctx["df_p1"],)),
+
+    ("logica_p2.cargar_datos", None, _cargador("logica_p2", "cargar_datos")),
+    ("logica_p2.filtrar_datos", "municipio_p2", lambda m, ctx, v: (ctx["df_p2"], v, ctx["periodos"])),
+    ("logica_p2.calcular_brechas", "municipio_p2", lambda m, ctx, v: (_filtrado_p2(m, ctx, v),)),
+    ("logica_p2.construir_celdas_brecha", None, lambda m, ctx, v: (ctx["df_p2"],)),
+    ("logica_p2.calcular_brechas_ajustadas", "municipio_p2",
+     lambda m, ctx, v: (ctx["celdas_p2"], v, ctx["periodos"])),
+    ("logica_p2.generar_boxplots_materias", "municipio_p2", lambda m, ctx, v: (_filtrado_p2(m, ctx, v),)),
+    ("logica_p2.generar_brecha_por_estrato", "municipio_p2",
+     lambda m, ctx, v: (_filtrado_p2(m, ctx, v), COLUMNA_MATERIA)),
+    ("logica_p2.generar_mapa_brecha", "municipio_p2", lambda m, ctx, v: (ctx["df_p2"], COLUMNA_MATERIA, v)),
+    ("logica_p2.generar_mapa_brecha_base", None, lambda m, ctx, v: (ctx["df_p2"], COLUMNA_MATERIA)),
+
+    ("logica_p3.cargar_datos_p3", None, _cargador("logica_p3", "cargar_datos_p3")),
+    ("logica_p3.generar_mapa_antioquia", "municipio", lambda m, ctx, v: (ctx["df_p3"], v)),
+    ("logica_p3.generar_mapa_antioquia_base", None, lambda m, ctx, v: (ctx["df_p3"],)),
+    ("logica_p3.generar_ranking_municipios_estatico", None, lambda m, ctx, v: (ctx["df_p3"],)),
+    ("logica_p3.construir_tensor_tic", None, lambda m, ctx, v: (ctx["df_p3"],)),
+    ("logica_p3.generar_histograma_tic", "municipio", lambda m, ctx, v: (ctx["df_p3"], v)),
+    ("logica_p3.generar_dispersion_regresion", "municipio", lambda m, ctx, v: (ctx["df_p3"], v)),
+    ("logica_p3.generar_dispersion_clusters", "municipio", lambda m, ctx, v: (ctx["df_p3"], v)),
+    ("logica_p3.calcular_probabilidad_b1", "municipio", lambda m, ctx, v: (ctx["df_p3"], v)),
+    ("logica_p3.generar_serie_tic_ingles_por_periodo", "municipio", lambda m, ctx, v: (ctx["df_p3"], v)),
+
+    ("logica_insights.obtener_figuras_eda", None, _cargador("logica_insights", "obtener_figuras_eda")),
+    ("logica_insights.build_bar_with_comparisons", None,
+     lambda m, ctx, v: (ctx["aux"]["df"], ctx["aux"]["metrics_list"][0], ctx["aux"]["detected"]["col_estrato"],
+                        ctx["aux"]["metrics_list"])),
+]
+MODULOS = ("logica_p1", "logica_p2", "logica_p3", "logica_insights")
+
+# Cambios de salida intencionales respecto del código original: se reportan
+# como "DIFERENTE (esperado)", con el motivo, y no cuentan como falla
+_ENCUADRE = "centro y zoom del mapa calculados de las coordenadas del departamento (departamentos.encuadre)"
+DIFERENCIAS_ESPERADAS = {
+    "logica_p1.generar_mapa_pib_puntaje": _ENCUADRE,
+    "logica_p2.generar_mapa_brecha": _ENCUADRE,
+    "logica_p3.generar_mapa_antioquia": _ENCUADRE,
+    "logica_p3.generar_histograma_tic": "barras (px.bar) con los conteos de la tabla de contingencia en lugar "
+                                        "de un histograma sobre las filas: mismas alturas, otras trazas",
+    "logica_insights.obtener_figuras_eda": "la serie anual sale de series_tiempo (eje 'anio') y el DataFrame "
+                                           "auxiliar ya no recibe la columna 'year' ni se filtra",
+}
+
+
+def valores_filtro(filtro, municipios):
+    if filtro is None:
+        return [None]
+    return ["Todos" if filtro == "municipio_p2" else "TODOS"] + municipios
+
+
+# HUELLA NUMERICA DE UN RESULTADO
+
+def _arreglo(valores):
+    arreglo = np.asarray(valores)
+    if arreglo.dtype.kind in "biuf":
+        return arreglo.astype(float)
+    if arreglo.dtype.kind in "mM":
+        return arreglo.astype("int64").astype(float)
+    return np.array([None if _es_nulo(v) else str(v) for v in arreglo.ravel()], dtype=object).reshape(arreglo.shape)
+
+
+def _es_nulo(valor):
+    return valor is None or (isinstance(valor, float) and math.isnan(valor)) or valor is pd.NA or valor is pd.NaT
+
+
+def _escalar(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    # Objetos sin repr propio traen su dirección de memoria: solo cuenta el tipo
+    if type(valor).__repr__ is object.__repr__:
+        return f"<{type(valor).__name__}>"
+    return str(valor)
+
+
+def _decodificar(arreglo_tipado):
+    # Plotly >= 6 guarda los arreglos numéricos como {"dtype", "bdata" (base64), "shape"}
+    valores = np.frombuffer(base64.b64decode(arreglo_tipado["bdata"]), dtype=arreglo_tipado["dtype"])
+    forma = arreglo_tipado.get("shape")
+    if isinstance(forma, str):
+        forma = [int(n) for n in forma.split(",")]
+    return valores.reshape(forma) if forma else valores
+
+
+def huella(objeto, ruta="r", salida=None):
+    """{ruta: arreglo o escalar} con los números y textos de fondo de `objeto`."""
+    salida = {} if salida is None else salida
+    if hasattr(objeto, "to_plotly_json"):
+        # Figuras de Plotly y componentes de Dash
+        objeto = objeto.to_plotly_json()
+    if isinstance(objeto, pd.DataFrame):
+        salida[f"{ruta}.columnas"] = [str(c) for c in objeto.columns]
+        salida[f"{ruta}.indice"] = _arreglo(objeto.index.to_numpy())
+        for columna in objeto.columns:
+            salida[f"{ruta}[{columna}]"] = _arreglo(objeto[columna].to_numpy())
+    elif isinstance(objeto, pd.Series):
+        salida[f"{ruta}.indice"] = _arreglo(objeto.index.to_numpy())
+        salida[ruta] = _arreglo(objeto.to_numpy())
+    elif isinstance(objeto, (np.ndarray, pd.Index)):
+        salida[ruta] = _arreglo(objeto)
+    elif isinstance(objeto, dict) and "bdata" in objeto and "dtype" in objeto:
+        salida[ruta] = _arreglo(_decodificar(objeto))
+    elif isinstance(objeto, dict):
+        for clave, valor in objeto.items():
+            if ruta.endswith("layout") and clave == "template":
+                continue
+            huella(valor, f"{ruta}.{clave}", salida)
+    elif isinstance(objeto, (list, tuple)):
+        if objeto and all(np.isscalar(v) or v is None for v in objeto):
+            salida[ruta] = _arreglo(np.array(objeto, dtype=object) if any(isinstance(v, str) for v in objeto)
+                                    else objeto)
+        else:
+            for i, valor in enumerate(objeto):
+                huella(valor, f"{ruta}[{i}]", salida)
+    else:
+        salida[ruta] = _escalar(objeto)
+    return salida
+
+
+# COMPARACION
+
+def _iguales(a, b, rtol, atol):
+    if _es_nulo(a) or _es_nulo(b):
+        return _es_nulo(a) and _es_nulo(b)
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return math.isclose(a, b, rel_tol=rtol, abs_tol=atol)
+    if isinstance(a, str) and isinstance(b, str):
+        # Textos con cifras (anotaciones, hovers): lo demás exacto, las cifras con tolerancia
+        numeros_a, numeros_b = NUMERO.findall(a), NUMERO.findall(b)
+        if NUMERO.sub("#", a) != NUMERO.sub("#", b) or len(numeros_a) != len(numeros_b):
+            return False
+        return all(x == y or _iguales(float(x.replace(",", ".")), float(y.replace(",", ".")), rtol, atol)
+                   for x, y in zip(numeros_a, numeros_b))
+    return a == b
+
+
+def _columna_de_tabla(ruta, otra):
+    # Columnas que solo devuelve una versión (p. ej. auxiliares que la otra ya
+    # no deja en el DataFrame) no son cifras de la salida: se comparan las comunes
+    if not ruta.endswith("]") or "[" not in ruta:
+        return False
+    return f"{ruta[:ruta.rindex('[')]}.columnas" in otra
+
+
+def comparar(referencia, optimizado, rtol, atol):
+    """Lista de diferencias (vacía si las huellas coinciden)."""
+    diferencias = []
+    solo_ref = {r for r in referencia.keys() - optimizado.keys() if not _columna_de_tabla(r, optimizado)}
+    solo_opt = {r for r in optimizado.keys() - referencia.keys() if not _columna_de_tabla(r, referencia)}
+    if solo_ref:
+        diferencias.append(f"solo en referencia: {', '.join(sorted(solo_ref)[:MAX_DIFERENCIAS])}")
+    if solo_opt:
+        diferencias.append(f"solo en optimizado: {', '.join(sorted(solo_opt)[:MAX_DIFERENCIAS])}")
+    for ruta in referencia.keys() & optimizado.keys():
+        if ruta.endswith(".columnas"):
+            continue
+        a, b = referencia[ruta], optimizado[ruta]
+        if not isinstance(a, np.ndarray) and not isinstance(b, np.ndarray):
+            if not (a == b if isinstance(a, list) or isinstance(b, list) else _iguales(a, b, rtol, atol)):
+                diferencias.append(f"{ruta}: {a!r} != {b!r}")
+            continue
+        a, b = np.asarray(a), np.asarray(b)
+        if a.shape != b.shape:
+            diferencias.append(f"{ruta}: forma {a.shape} != {b.shape}")
+        elif a.dtype.kind == "f" and b.dtype.kind == "f":
+            iguales = np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
+            if not iguales.all():
+                i = np.unravel_index(np.argmin(iguales), a.shape)
+                diferencias.append(f"{ruta}: {int((~iguales).sum())} valores difieren, "
+                                   f"p. ej. [{', '.join(map(str, i))}] {a[i]!r} != {b[i]!r}")
+        else:
+            distintos = [i for i, (x, y) in enumerate(zip(a.ravel(), b.ravel()))
+                         if not _iguales(_escalar(x), _escalar(y), rtol, atol)]
+            if distintos:
+                i = distintos[0]
+                diferencias.append(f"{ruta}: {len(distintos)} valores difieren, "
+                                   f"p. ej. [{i}] {a.ravel()[i]!r} != {b.ravel()[i]!r}")
+    return sorted(diferencias)
+
+
+# EJECUCION DE UNA VERSION (EN SU PROPIO PROCESO)
+
+def _medir(funcion, args, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, statistics.median(tiempos)
+
+
+def ejecutar_version(raiz_codigo, datasets, n_municipios, repeticiones):
+    """{dataset: {(funcion, valor): {huella, segundos, error[, falta]}}} con `Analysis` de `raiz_codigo`."""
+    import importlib
+    sys.path.insert(0, raiz_codigo)
+    m = {nombre: importlib.import_module(f"Analysis.{nombre}") for nombre in MODULOS}
+
+    salida = {}
+    for nombre_datos, ruta in datasets.items():
+        os.chdir(_raiz_datos(ruta))
+        ctx = {"ruta": ruta}
+        conteos = pd.read_csv(ruta, usecols=[COLUMNA_MUNICIPIO])[COLUMNA_MUNICIPIO].value_counts()
+        municipios = conteos.index.tolist()[:n_municipios] if n_municipios else sorted(conteos.index)
+        registros = salida[nombre_datos] = {}
+        for nombre, filtro, argumentos in CASOS:
+            modulo, funcion = nombre.split(".")
+            print(f"  [{nombre_datos}] {nombre}", flush=True)
+            llamable = getattr(m[modulo], funcion, None)
+            for valor in valores_filtro(filtro, municipios):
+                if llamable is None:
+                    # La función no existe en esta versión: no es un error de la versión
+                    registros[(nombre, valor)] = {"huella": None, "segundos": None, "error": None, "falta": True}
+                    continue
+                try:
+                    resultado, segundos = _medir(llamable, argumentos(m, ctx, valor), repeticiones)
+                    registros[(nombre, valor)] = {"huella": huella(resultado), "segundos": segundos, "error": None}
+                except Exception as e:
+                    registros[(nombre, valor)] = {"huella": None, "segundos": None,
+                                                  "error": f"{type(e).__name__}: {e}"}
+                    traceback.print_exc(limit=2)
+                    continue
+                # Lo que usan los casos siguientes sale de los cargadores de esta versión
+                if nombre == "logica_p1.cargar_datos_p1":
+                    ctx["df_p1"] = resultado
+                elif nombre == "logica_p2.cargar_datos":
+                    ctx["df_p2"] = resultado
+                    ctx["periodos"] = sorted(resultado["periodo"].dropna().unique())
+                elif nombre == "logica_p2.construir_celdas_brecha":
+                    ctx["celdas_p2"] = resultado
+                elif nombre == "logica_p3.cargar_datos_p3":
+                    ctx["df_p3"] = resultado
+                elif nombre == "logica_insights.obtener_figuras_eda":
+                    ctx["aux"] = resultado[2]
+    return salida
+
+
+def _raiz_datos(ruta):
+    """Directorio con `Data/` igual al del repositorio salvo el dataset limpio, que es `ruta`."""
+    raiz = f"{ruta}.raiz"
+    datos = os.path.join(raiz, "Data")
+    if not os.path.isdir(datos):
+        os.makedirs(datos)
+        for archivo in os.listdir(os.path.join(RAIZ, "Data")):
+            if not archivo.startswith("saber11_Antioquia_clean."):
+                os.symlink(os.path.join(RAIZ, "Data", archivo), os.path.join(datos, archivo))
+        os.symlink(ruta, os.path.join(datos, "saber11_Antioquia_clean.csv"))
+        _alias_minusculas(raiz)
+    return raiz
+
+
+def _alias_minusculas(raiz):
+    # El cargador original de /pregunta_2 lee 'data/...' en minúsculas
+    alias = os.path.join(raiz, "data")
+    if not os.path.exists(alias):
+        os.symlink("Data", alias)
+
+
+def _exportar(commit, destino):
+    """Copia `Analysis/` de `commit` en `destino` (sin tocar el árbol de trabajo), con `Data/` enlazado."""
+    archivo = subprocess.run(["git", "archive", "--format=tar", commit, "Analysis"],
+                             cwd=RAIZ, check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archivo)) as tar:
+        tar.extractall(destino)
+    # Las rutas por defecto de los cargadores son relativas a la raíz del código
+    os.symlink(os.path.join(RAIZ, "Data"), os.path.join(destino, "Data"))
+    _alias_minusculas(destino)
+    return destino
+
+
+def _correr_version(etiqueta, raiz_codigo, datasets, args, directorio):
+    print(f"[equivalencia] {etiqueta}: Analysis/ de {raiz_codigo}")
+    salida = os.path.join(directorio, f"{etiqueta}.pkl")
+    subprocess.run([sys.executable, "-m", "Benchmarks.equivalencia", "--ejecutar", raiz_codigo,
+                    "--datasets", json.dumps(datasets), "--municipios", str(args.municipios),
+                    "--repeticiones", str(args.repeticiones), "--salida", salida], cwd=RAIZ, check=True)
+    with open(salida, "rb") as f:
+        return pickle.load(f)
+
+
+# DATOS
+
+def _datasets(directorio, args):
+    datasets = {}
+    sintetico = os.path.join(directorio, f"sintetico_{args.filas}.csv")
+    generar_limpio(args.filas, args.semilla).to_csv(sintetico, index=False)
+    datasets["sintetico"] = sintetico
+
+    if args.muestra:
+        ruta_real = next((r for r in RUTAS_REALES if os.path.exists(r)), None)
+        try:
+            real = pd.read_parquet(ruta_real) if ruta_real.endswith(".parquet") else pd.read_csv(ruta_real)
+            if COLUMNA_MUNICIPIO not in real.columns:
+                raise ValueError("sin columna de municipio (¿puntero de Git LFS?)")
+        except (AttributeError, OSError, ValueError) as e:
+            print(f"[equivalencia] sin muestra del dataset real ({ruta_real}): {e}")
+        else:
+            muestra = os.path.join(directorio, f"muestra_{args.muestra}.csv")
+            real.sample(n=min(args.muestra, len(real)), random_state=args.semilla).to_csv(muestra, index=False)
+            datasets["muestra"] = muestra
+    return datasets
+
+
+# REPORTE
+
+def reportar(referencia, optimizado, rtol, atol):
+    """Imprime la tabla por función y devuelve cuántas funciones difieren."""
+    fallas = 0
+    for nombre_datos, registros_opt in optimizado.items():
+        registros_ref = referencia.get(nombre_datos, {})
+        print(f"\n{nombre_datos}")
+        print(f"{'funcion':48} {'filtros':>7} {'difieren':>8} {'referencia':>10} {'optimizado':>10} "
+              f"{'aceleración':>11}  resultado")
+        for nombre, _, _ in CASOS:
+            claves = [c for c in registros_opt if c[0] == nombre]
+            comparadas, distintas, errores, detalles = 0, 0, 0, []
+            t_ref = t_opt = 0.0
+            sin_referencia = False
+            for clave in claves:
+                ref, opt = registros_ref.get(clave), registros_opt[clave]
+                if ref is None or ref.get("falta"):
+                    # La función no existe en la referencia: no hay con qué comparar
+                    sin_referencia = True
+                    continue
+                if ref["error"] is not None:
+                    # Existe pero falla: la comparación no se puede dar por buena
+                    diferencias = [f"error en referencia: {ref['error']}"]
+                    errores += 1
+                elif opt.get("falta"):
+                    diferencias = ["no existe en optimizado"]
+                    errores += 1
+                elif opt["error"] is not None:
+                    diferencias = [f"error en optimizado: {opt['error']}"]
+                    errores += 1
+                else:
+                    diferencias = comparar(ref["huella"], opt["huella"], rtol, atol)
+                    t_ref += ref["segundos"]
+                    t_opt += opt["segundos"]
+                comparadas += 1
+                if diferencias:
+                    distintas += 1
+                    if len(detalles) < MAX_DIFERENCIAS:
+                        detalles.append((clave[1], diferencias))
+            if not comparadas:
+                print(f"{nombre:48} {'-':>7} {'-':>8} {'-':>10} {'-':>10} {'-':>11}  SIN REFERENCIA")
+                continue
+            # Una diferencia esperada no excusa errores de ninguna de las dos versiones
+            esperado = DIFERENCIAS_ESPERADAS.get(nombre) if not errores else None
+            fallas += distintas > 0 and esperado is None
+            aceleracion = f"{t_ref / t_opt:.2f}x" if t_opt > 0 else "-"
+            if distintas:
+                estado = "DIFERENTE" if esperado is None else f"DIFERENTE (esperado: {esperado})"
+            else:
+                estado = "OK" if not sin_referencia else "OK (parcial)"
+            print(f"{nombre:48} {comparadas:>7} {distintas:>8} {t_ref:>9.3f}s {t_opt:>9.3f}s {aceleracion:>11}  "
+                  f"{estado}")
+            for valor, diferencias in detalles:
+                print(f"    [{valor or '-'}] " + "\n      ".join(diferencias[:MAX_DIFERENCIAS]))
+    return fallas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--referencia", default="HEAD", help="Commit de la versión de referencia")
+    parser.add_argument("--optimizado", default=None, help="Commit de la versión optimizada (por defecto, el árbol de trabajo)")
+    parser.add_argument("--dorado", default=None, help="Archivo dorado a usar como referencia")
+    parser.add_argument("--guardar-dorado", default=None, help="Guarda las salidas de referencia en este archivo")
+    parser.add_argument("--filas", type=int, default=50000)
+    parser.add_argument("--muestra", type=int, default=0, help="Filas de la muestra del dataset real (0 = sin muestra)")
+    parser.add_argument("--municipios", type=int, default=0, help="Solo los N municipios más grandes (0 = todos)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--rtol", type=float, default=1e-6)
+    parser.add_argument("--atol", type=float, default=1e-9)
+    # Uso interno: corre una versión y guarda sus salidas
+    parser.add_argument("--ejecutar", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--datasets", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--salida", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.ejecutar:
+        resultados = ejecutar_version(args.ejecutar, json.loads(args.datasets), args.municipios, args.repeticiones)
+        with open(args.salida, "wb") as f:
+            pickle.dump(resultados, f)
+        return 0
+
+    # Lo que debe coincidir para que un archivo dorado sirva de referencia
+    parametros = {"filas": args.filas, "muestra": args.muestra, "municipios": args.municipios,
+                  "semilla": args.semilla}
+    with tempfile.TemporaryDirectory() as directorio:
+        datasets = _datasets(directorio, args)
+
+        if args.dorado:
+            with open(args.dorado, "rb") as f:
+                dorado = pickle.load(f)
+            if dorado["parametros"] != parametros:
+                print(f"[equivalencia] el archivo dorado es de otros parámetros: {dorado['parametros']}")
+                return 2
+            referencia = dorado["resultados"]
+        else:
+            referencia = _correr_version("referencia", _exportar(args.referencia, os.path.join(directorio, "ref")),
+                                         datasets, args, directorio)
+            if args.guardar_dorado:
+                with open(args.guardar_dorado, "wb") as f:
+                    pickle.dump({"referencia": args.referencia, "parametros": parametros,
+                                 "resultados": referencia}, f)
+                print(f"[equivalencia] salidas de referencia guardadas en: {args.guardar_dorado}")
+
+        raiz_optimizado = RAIZ if args.optimizado is None else _exportar(
+            args.optimizado, os.path.join(directorio, "opt"))
+        optimizado = _correr_version("optimizado", raiz_optimizado, datasets, args, directorio)
+
+    fallas = reportar(referencia, optimizado, args.rtol, args.atol)
+    print(f"\n{fallas} funciones con diferencias" if fallas else "\nSalidas equivalentes")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
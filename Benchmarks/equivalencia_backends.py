@@ -0,0 +1,105 @@
+"""Equivalencia entre los backends pandas y DuckDB de `Analysis/consultas.py`.
+
+Genera un dataset sintético, lo escribe en Parquet y corre cada consulta de
+la fachada con los dos backends: las tablas deben coincidir (mismas filas y
+claves, conteos exactos y medias/desviaciones con tolerancia numérica).
+También reporta el tiempo de cada consulta en cada backend.
+
+Uso (desde la raíz del repositorio):
+
+    python -m Benchmarks.equivalencia_backends --filas 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+
+import pandas as pd  # noqa: E402
+
+from Analysis import consultas  # noqa: E402
+from Benchmarks.datos_sinteticos import generar_limpio  # noqa: E402
+
+MUNICIPIO_DEFECTO = "MEDELLIN"
+TOLERANCIA = 1e-6
+
+
+def casos(municipio):
+    """(nombre, método, argumentos) de cada consulta a comparar."""
+    return [
+        ("estadisticas_area", "estadisticas_area", ()),
+        ("celdas_naturaleza", "celdas_naturaleza", ()),
+        ("medias_estrato", "medias_estrato", ("punt_matematicas",)),
+        ("medias_estrato_municipio", "medias_estrato", ("punt_global", municipio, (20191, 20192))),
+        ("tabla_tic_ingles", "tabla_tic_ingles", ()),
+        ("tabla_tic_ingles_municipio", "tabla_tic_ingles", (municipio,)),
+        ("serie_anual_tic", "serie_anual", ("punt_ingles", "acceso_tic")),
+        ("serie_anual_naturaleza", "serie_anual", ("punt_global", "naturaleza", municipio)),
+        ("serie_anual_total", "serie_anual", ("punt_global", None)),
+    ]
+
+
+def _normalizar(tabla):
+    # El orden de filas no está definido en SQL: se ordena por las claves
+    claves = [c for c in tabla.columns
+              if not pd.api.types.is_numeric_dtype(tabla[c]) or c in ("anio", "periodo")]
+    tabla = tabla.copy()
+    for columna in tabla.columns:
+        if columna in claves:
+            tabla[columna] = tabla[columna].astype(object).map(lambda v: v if pd.isna(v) else str(v))
+        else:
+            tabla[columna] = tabla[columna].astype(float)
+    return tabla.sort_values(claves, na_position="last").reset_index(drop=True)
+
+
+def comparar(a, b):
+    """None si coinciden; si no, el mensaje de la diferencia."""
+    a, b = _normalizar(a), _normalizar(b)
+    try:
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, check_exact=False, rtol=TOLERANCIA, atol=TOLERANCIA)
+    except AssertionError as e:
+        return str(e)
+    return None
+
+
+def correr(n_filas, municipio, semilla=0):
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "saber11_sintetico.parquet")
+        generar_limpio(n_filas, semilla).to_parquet(ruta, index=False)
+        backends = {nombre: consultas.crear_backend(nombre, ruta) for nombre in ("pandas", "duckdb")}
+
+        fallas = 0
+        print(f"{'consulta':30} {'filas':>7} {'pandas':>9} {'duckdb':>9}  resultado")
+        for nombre, metodo, args in casos(municipio):
+            tablas, tiempos = {}, {}
+            for backend, instancia in backends.items():
+                inicio = time.perf_counter()
+                tablas[backend] = getattr(instancia, metodo)(*args)
+                tiempos[backend] = time.perf_counter() - inicio
+            diferencia = comparar(tablas["pandas"], tablas["duckdb"])
+            fallas += diferencia is not None
+            print(f"{nombre:30} {len(tablas['pandas']):>7} {tiempos['pandas']:>8.3f}s {tiempos['duckdb']:>8.3f}s  "
+                  f"{'OK' if diferencia is None else 'DIFERENTE'}")
+            if diferencia:
+                print("    " + diferencia.replace("\n", "\n    "))
+    return fallas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=50000)
+    parser.add_argument("--municipio", default=MUNICIPIO_DEFECTO)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+    fallas = correr(args.filas, args.municipio, args.semilla)
+    print(f"{fallas} consultas con diferencias" if fallas else "Backends equivalentes")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
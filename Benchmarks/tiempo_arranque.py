@@ -0,0 +1,130 @@
+"""Perfil del arranque en frío de la app (`import app`).
+
+Mide el tiempo de pared de importar la app en un proceso nuevo (varias
+repeticiones, mínimo y mediana) y, en una corrida aparte con
+`python -X importtime`, desglosa el tiempo propio por paquete y los
+módulos más costosos. También avisa si alguna de las librerías pesadas que
+solo deberían cargarse al construir figuras (`PESADAS`) se importó al
+arrancar.
+
+Uso (desde la raíz del repositorio):
+
+    python -m Benchmarks.tiempo_arranque
+    python -m Benchmarks.tiempo_arranque --repeticiones 5 --objetivo 8
+    SABER_MODO_ESTATICO=1 python -m Benchmarks.tiempo_arranque
+
+Con `--objetivo` el comando termina con código 1 si la mediana lo supera.
+Los resultados se guardan en `Benchmarks/resultados/arranque_<commit>.json`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS_DIR = os.path.join(RAIZ, "Benchmarks", "resultados")
+
+PESADAS = ("plotly.express", "plotly.subplots", "scipy.stats", "statsmodels.api", "duckdb")
+
+
+def _commit_actual():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True,
+            stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+
+
+def _importar(modulo, importtime=False):
+    comando = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", f"import {modulo}"]
+    inicio = time.perf_counter()
+    proceso = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+    segundos = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        raise RuntimeError(f"Falló 'import {modulo}':\n{proceso.stderr[-2000:]}")
+    return segundos, proceso.stderr
+
+
+def medir_arranque(modulo, repeticiones):
+    tiempos = [_importar(modulo)[0] for _ in range(repeticiones)]
+    return {"min": min(tiempos), "mediana": statistics.median(tiempos), "tiempos": tiempos}
+
+
+def parsear_importtime(salida):
+    """[(módulo, propio_us, acumulado_us)] a partir de la salida de -X importtime."""
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|", 2)
+        modulos.append((nombre.strip(), int(propio), int(acumulado)))
+    return modulos
+
+
+def desglosar(modulos, top):
+    por_paquete = defaultdict(int)
+    for nombre, propio, _ in modulos:
+        por_paquete[nombre.split(".")[0]] += propio
+    cargados = {nombre for nombre, _, _ in modulos}
+    return {
+        "total_importtime_s": sum(propio for _, propio, _ in modulos) / 1e6,
+        "paquetes": sorted(((p, us / 1e6) for p, us in por_paquete.items()), key=lambda t: t[1], reverse=True)[:top],
+        "modulos": [(n, ac / 1e6) for n, _, ac in sorted(modulos, key=lambda t: t[2], reverse=True)[:top]],
+        "pesadas_cargadas": [m for m in PESADAS if m in cargados],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modulo", default="app", help="Módulo a importar (por defecto, la app completa)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--objetivo", type=float, default=None, help="Segundos máximos para la mediana")
+    parser.add_argument("--salida", default=None)
+    args = parser.parse_args(argv)
+
+    arranque = medir_arranque(args.modulo, args.repeticiones)
+    _, salida = _importar(args.modulo, importtime=True)
+    desglose = desglosar(parsear_importtime(salida), args.top)
+
+    print(f"import {args.modulo}: mínimo {arranque['min']:.2f}s, mediana {arranque['mediana']:.2f}s "
+          f"({args.repeticiones} procesos nuevos)")
+    print(f"\nTiempo propio por paquete (total importtime {desglose['total_importtime_s']:.2f}s):")
+    for paquete, segundos in desglose["paquetes"]:
+        print(f"  {paquete:30} {segundos:8.3f}s")
+    print("\nMódulos con mayor tiempo acumulado:")
+    for nombre, segundos in desglose["modulos"]:
+        print(f"  {nombre:50} {segundos:8.3f}s")
+    if desglose["pesadas_cargadas"]:
+        print(f"\nLibrerías pesadas cargadas al arrancar: {', '.join(desglose['pesadas_cargadas'])}")
+
+    commit = _commit_actual()
+    salida_json = args.salida or os.path.join(RESULTADOS_DIR, f"arranque_{commit}.json")
+    os.makedirs(os.path.dirname(salida_json), exist_ok=True)
+    with open(salida_json, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "modulo": args.modulo,
+            "modo_estatico": os.environ.get("SABER_MODO_ESTATICO") == "1",
+            "arranque": arranque,
+            **desglose,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados en {salida_json}")
+
+    if args.objetivo is not None and arranque["mediana"] > args.objetivo:
+        print(f"Mediana {arranque['mediana']:.2f}s por encima del objetivo de {args.objetivo:.2f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""API JSON de solo lectura con las cifras de los tableros.
+
+Rutas (todas GET, bajo `/api/v1`):
+
+- `/indice`: municipios, periodos y materias disponibles.
+- `/brechas?materia=&municipio=&periodo=`: brecha privado - público por
+  materia (la de `calcular_brechas`), con medias y tamaños de muestra.
+- `/urbano-rural?municipio=`: t de Welch urbano vs rural del puntaje
+  global (la de `calcular_estadisticas_brecha`).
+- `/probabilidad-b1?municipio=`: diferencial de probabilidad de nivel
+  B1/B+ con y sin internet e intervalo de confianza al 95 % (el de
+  `diferencial_b1`).
+- `/intervalos?brecha=&municipio=`: intervalos bootstrap al 95 % de las
+  brechas `urbano_rural`, `publico_privado` (por materia) y `b1_internet`
+  (ver `Analysis/bootstrap.py`).
+- `/percentil?columna=&valor=&municipio=&periodo=&naturaleza=&area=`:
+  percentil que ocupa el puntaje `valor` en el grupo filtrado y sus
+  deciles, desde los histogramas de `Analysis/sketches.py`.
+- `/colegios?q=&municipio=&limite=`: búsqueda de colegios por nombre
+  (sin tildes, por prefijos de palabra o subcadena) o código DANE, la
+  misma del dropdown de colegio (ver `Analysis/colegios.py`).
+- `/colegio?codigo=`: n, media y desviación de cada puntaje del colegio
+  por naturaleza y en total, con la media de su municipio.
+- `/nacional?columna=&por=&frecuencia=`: media y conteo por año (o
+  periodo) y departamento (o una dimensión de las series), sumando los
+  agregados por departamento de `Analysis/departamentos.py`.
+
+Las respuestas salen de `Analysis/agregados.py`, calculados una vez por
+versión de los datos y guardados en el caché de figuras, así que cada
+consulta es una búsqueda en un diccionario. `ETag` y `Last-Modified`
+dependen de la versión de los datos y se responde 304 cuando el cliente
+ya tiene la respuesta.
+"""
+import hashlib
+import json
+import math
+from functools import lru_cache
+
+from flask import Response, request
+
+from Analysis import bootstrap, cache_figuras, colegios, consultas, departamentos, registro_datos, sketches
+from Analysis.agregados import TODOS, calcular_agregados
+from Analysis.series_tiempo import COLUMNAS_PUNTAJE, DIMENSIONES, FRECUENCIAS
+
+RUTA_API = "/api/v1"
+
+# Los datos solo cambian con un refresco (nueva versión y nuevo ETag)
+MAX_AGE_API = 3600
+
+
+@lru_cache(maxsize=1)
+def _agregados(version):
+    return cache_figuras.obtener("api/agregados", (), calcular_agregados, version=version)
+
+
+def agregados():
+    return _agregados(cache_figuras.version_datos())
+
+
+@lru_cache(maxsize=1)
+def _intervalos(version_id):
+    # Tablas -> {brecha: {municipio: fila o {materia: fila}}}
+    version = registro_datos.buscar(version_id)
+    resultado = {}
+    for brecha, tabla in bootstrap.intervalos_version(version).items():
+        por_municipio = resultado[brecha] = {}
+        for fila in tabla.round(4).to_dict("records"):
+            municipio = str(fila.pop("municipio")).upper().strip()
+            materia = fila.pop("materia", None)
+            if materia is None:
+                por_municipio[municipio] = fila
+            else:
+                por_municipio.setdefault(municipio, {})[materia] = fila
+    return resultado
+
+
+@lru_cache(maxsize=1)
+def _sketches(version):
+    # En memoria por worker: unos MB para todos los grupos y columnas
+    return sketches.construir_sketches(consultas.marco())
+
+
+def _responder(datos, estado=200):
+    cuerpo = json.dumps(datos, ensure_ascii=False, separators=(",", ":"))
+    respuesta = Response(cuerpo, status=estado, mimetype="application/json")
+    if estado != 200:
+        return respuesta
+    # La versión de los datos más la consulta identifican la respuesta (igual en
+    # todos los workers)
+    consulta = hashlib.sha1(request.full_path.encode("utf-8")).hexdigest()[:12]
+    respuesta.set_etag(f"{cache_figuras.version_datos()}-{consulta}")
+    respuesta.last_modified = cache_figuras.fecha_datos()
+    respuesta.cache_control.public = True
+    respuesta.cache_control.max_age = MAX_AGE_API
+    return respuesta.make_conditional(request)
+
+
+def _error(mensaje, estado):
+    return _responder({"error": mensaje}, estado)
+
+
+def _municipio(tabla):
+    municipio = request.args.get("municipio", TODOS).upper().strip()
+    return municipio if municipio in tabla else None
+
+
+# RUTAS
+
+def indice():
+    datos = agregados()
+    return _responder({
+        "version": cache_figuras.version_datos(),
+        "municipios": datos["municipios"],
+        "periodos": datos["periodos"],
+        "materias": datos["materias"],
+    })
+
+
+def brechas():
+    datos = agregados()
+    municipio = _municipio(datos["brechas"])
+    if municipio is None:
+        return _error("Municipio no encontrado", 404)
+
+    periodo = request.args.get("periodo", TODOS).strip().upper()
+    por_periodo = datos["brechas"][municipio]
+    if periodo not in por_periodo:
+        return _error("Periodo no encontrado", 404)
+
+    por_materia = por_periodo[periodo]
+    materia = request.args.get("materia")
+    if materia:
+        # Se acepta el nombre ("Matemáticas") o la columna ("punt_matematicas")
+        nombres = {col: nombre for nombre, col in datos["materias"].items()}
+        materia = nombres.get(materia, materia)
+        if materia not in por_materia:
+            return _error("Materia no encontrada", 400)
+        por_materia = {materia: por_materia[materia]}
+
+    return _responder({
+        "version": cache_figuras.version_datos(),
+        "municipio": municipio,
+        "periodo": periodo,
+        "brechas": por_materia,
+    })
+
+
+def urbano_rural():
+    datos = agregados()
+    municipio = _municipio(datos["urbano_rural"])
+    if municipio is None:
+        return _error("Municipio no encontrado", 404)
+    return _responder({
+        "version": cache_figuras.version_datos(),
+        "municipio": municipio,
+        # None si alguna zona tiene menos de 2 estudiantes
+        "prueba": datos["urbano_rural"][municipio],
+    })
+
+
+def probabilidad_b1():
+    datos = agregados()
+    municipio = _municipio(datos["probabilidad_b1"])
+    if municipio is None:
+        return _error("Municipio no encontrado", 404)
+    return _responder({
+        "version": cache_figuras.version_datos(),
+        "municipio": municipio,
+        **datos["probabilidad_b1"][municipio],
+    })
+
+
+def intervalos():
+    brecha = request.args.get("brecha", "urbano_rural")
+    # La versión se toma al empezar, como en los callbacks
+    datos = _intervalos(registro_datos.actual().id)
+    if brecha not in datos:
+        return _error(f"Brecha desconocida, use una de: {', '.join(datos)}", 400)
+    municipio = _municipio(datos[brecha])
+    if municipio is None:
+        return _error("Municipio no encontrado", 404)
+    return _responder({
+        "version": cache_figuras.version_datos(),
+        "municipio": municipio,
+        "brecha": brecha,
+        "replicas": bootstrap.REPLICAS,
+        "confianza": bootstrap.CONFIANZA,
+        "intervalos": datos[brecha][municipio],
+    })
+
+
+def percentil():
+    columna = request.args.get("columna", "punt_global")
+    if columna not in sketches.RANGOS:
+        return _error(f"Columna desconocida, use una de: {', '.join(sketches.RANGOS)}", 400)
+    periodo = request.args.get("periodo", TODOS).strip().upper()
+    try:
+        periodos = None if periodo == TODOS else [int(p) for p in periodo.split(",")]
+    except ValueError:
+        return _error("Periodo inválido", 400)
+    # `type=float` devolvería None para 'abc' y dejaría pasar 'nan' o 'inf'
+    valor = request.args.get("valor")
+    if valor is not None:
+        try:
+            valor = float(valor)
+        except ValueError:
+            valor = math.nan
+        if not math.isfinite(valor):
+            return _error("Valor inválido: debe ser un número finito", 400)
+
+    hist = sketches.combinar(
+        _sketches(cache_figuras.version_datos()), columna,
+        municipio=request.args.get("municipio", TODOS).upper().strip(),
+        periodos=periodos,
+        naturaleza=request.args.get("naturaleza"),
+        area=request.args.get("area"),
+    )
+    n = int(hist.sum())
+    if n == 0:
+        return _error("Sin estudiantes para ese filtro", 404)
+    deciles = sketches.percentiles(hist, [d / 10 for d in range(1, 10)], columna)
+    return _responder({
+        "version": cache_figuras.version_datos(),
+        "columna": columna,
+        "n": n,
+        "valor": valor,
+        "rango_percentil": None if valor is None else round(sketches.rango_percentil(hist, valor, columna), 2),
+        "deciles": {f"p{d * 10}": round(float(v), 2) for d, v in enumerate(deciles, 1)},
+    })
+
+
+def _indice_colegios():
+    # El de /pregunta_2: todas las filas con código de colegio
+    return registro_datos.actual().datos["pregunta_2"]["colegios"]
+
+
+def buscar_colegios():
+    indice = _indice_colegios()
+    if indice is None:
+        return _error("El dataset no trae el código de los colegios", 404)
+    limite = min(request.args.get("limite", colegios.LIMITE, type=int), 100)
+    encontrados = indice.buscar(request.args.get("q", ""), request.args.get("municipio"), limite)
+    return _responder({
+        "version": cache_figuras.version_datos(),
+        "colegios": encontrados,
+    })
+
+
+def colegio():
+    indice = _indice_colegios()
+    codigo = request.args.get("codigo", "").strip()
+    if indice is None or codigo not in indice:
+        return _error("Colegio no encontrado", 404)
+    tabla = indice.estadisticas(codigo).round(2)
+    estadisticas = {}
+    for fila in json.loads(tabla.to_json(orient="records", force_ascii=False)):
+        estadisticas.setdefault(fila.pop("columna"), {})[str(fila.pop(indice.por))] = fila
+    info = indice.opcion(codigo)
+    return _responder({
+        "version": cache_figuras.version_datos(),
+        "codigo": codigo,
+        "nombre": info["nombre"],
+        "municipio": info["municipio"],
+        "n": info["n"],
+        "estadisticas": estadisticas,
+    })
+
+
+def nacional():
+    columna = request.args.get("columna", "punt_global")
+    por = request.args.get("por", "departamento")
+    frecuencia = request.args.get("frecuencia", "anio")
+    if columna not in COLUMNAS_PUNTAJE:
+        return _error(f"Columna desconocida, use una de: {', '.join(COLUMNAS_PUNTAJE)}", 400)
+    if por not in ("departamento",) + DIMENSIONES:
+        return _error(f"Dimensión desconocida, use una de: departamento, {', '.join(DIMENSIONES)}", 400)
+    if frecuencia not in FRECUENCIAS:
+        return _error(f"Frecuencia desconocida, use una de: {', '.join(FRECUENCIAS)}", 400)
+
+    tabla = departamentos.serie_nacional(columna, por, frecuencia)
+    if tabla.empty:
+        return _error("Sin agregados; genérelos con python -m Analysis.departamentos --agregar", 404)
+    tabla[columna] = tabla[columna].round(2)
+    return _responder({
+        "version": cache_figuras.version_datos(),
+        "columna": columna,
+        "por": por,
+        "frecuencia": frecuencia,
+        "serie": json.loads(tabla.to_json(orient="records", force_ascii=False)),
+    })
+
+
+def instalar_api(app, ruta=RUTA_API):
+    """Registra las rutas de la API en `app.server`."""
+    # Con datos nuevos el backend pandas debe volver a leer el archivo
+    registro_datos.al_cambiar(consultas.limpiar)
+    server = app.server
+    for sufijo, nombre, vista in (
+        ("/indice", "saber_api_indice", indice),
+        ("/brechas", "saber_api_brechas", brechas),
+        ("/urbano-rural", "saber_api_urbano_rural", urbano_rural),
+        ("/probabilidad-b1", "saber_api_probabilidad_b1", probabilidad_b1),
+        ("/intervalos", "saber_api_intervalos", intervalos),
+        ("/percentil", "saber_api_percentil", percentil),
+        ("/colegios", "saber_api_colegios", buscar_colegios),
+        ("/colegio", "saber_api_colegio", colegio),
+        ("/nacional", "saber_api_nacional", nacional),
+    ):
+        server.add_url_rule(ruta + sufijo, nombre, vista, methods=["GET"])
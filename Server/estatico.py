@@ -0,0 +1,38 @@
+"""Servicio de los archivos del export estático en `/estatico/`.
+
+Los archivos ya están comprimidos con gzip; se envían tal cual con
+`Content-Encoding: gzip` y caché pública larga, porque el nombre de cada
+archivo depende de sus filtros y el manifiesto se regenera en cada export.
+Así un CDN o proxy delante de Gunicorn puede servirlos sin tocar Python.
+"""
+import os
+
+from flask import abort, send_from_directory
+
+from Analysis.estatico import DIRECTORIO_ESTATICO, MANIFIESTO
+
+# Un día para las figuras; el manifiesto se revalida siempre
+MAX_AGE_FIGURAS = 86400
+
+
+def _servir(directorio, archivo):
+    if archivo == MANIFIESTO:
+        respuesta = send_from_directory(directorio, archivo, mimetype="application/json", max_age=0)
+        respuesta.headers["Cache-Control"] = "no-cache"
+        return respuesta
+    if not archivo.endswith(".json.gz"):
+        abort(404)
+    respuesta = send_from_directory(directorio, archivo, mimetype="application/json",
+                                    max_age=MAX_AGE_FIGURAS)
+    respuesta.headers["Content-Encoding"] = "gzip"
+    respuesta.headers["Cache-Control"] = f"public, max-age={MAX_AGE_FIGURAS}"
+    return respuesta
+
+
+def instalar_estatico(app, ruta="/estatico", directorio=DIRECTORIO_ESTATICO):
+    """Registra la ruta de archivos estáticos del export en `app.server`."""
+    directorio = os.path.abspath(directorio)
+    app.server.add_url_rule(
+        f"{ruta}/<path:archivo>", "saber_estatico",
+        lambda archivo: _servir(directorio, archivo)
+    )
@@ -0,0 +1,36 @@
+"""Servicio de las geometrías municipales simplificadas en `/geometrias/`.
+
+Los mapas coropléticos referencian el archivo por URL en vez de incrustar
+los polígonos en cada figura. Como el nombre del archivo incluye la huella
+de su contenido (ver `Analysis/geometrias.py`), se sirve con caché pública
+de un año e `immutable`: el navegador lo descarga una vez y las
+actualizaciones del mapa solo llevan los valores por municipio.
+"""
+import os
+
+from flask import abort, send_from_directory
+
+from Analysis import geometrias, registro_datos
+
+MAX_AGE_GEOMETRIAS = 365 * 86400
+
+
+def _servir(directorio, archivo):
+    if archivo == geometrias.INDICE or not archivo.endswith(".json"):
+        abort(404)
+    respuesta = send_from_directory(directorio, archivo, mimetype="application/json",
+                                    max_age=MAX_AGE_GEOMETRIAS)
+    respuesta.headers["Cache-Control"] = f"public, max-age={MAX_AGE_GEOMETRIAS}, immutable"
+    return respuesta
+
+
+def instalar_geometrias(app, ruta=geometrias.RUTA_URL, directorio=geometrias.DIRECTORIO_GEOMETRIAS):
+    """Registra la ruta de las geometrías en `app.server`."""
+    directorio = os.path.abspath(directorio)
+    app.server.add_url_rule(
+        f"{ruta}/<path:archivo>", "saber_geometrias",
+        lambda archivo: _servir(directorio, archivo)
+    )
+    # Si se reconstruyen los límites cambia la huella de los datos (el índice
+    # está en cache_figuras.ARCHIVOS_DATOS): se vuelve a leer el índice
+    registro_datos.al_cambiar(geometrias.limpiar)
@@ -0,0 +1,219 @@
+"""Instrumentación de callbacks de Dash con endpoint Prometheus `/metrics`.
+
+Por cada petición a `_dash-update-component` se registra:
+
+- latencia total del callback (histograma),
+- tiempo por fase: `filtrado` (bloques marcados con `medir_fase`),
+  `figura` (resto del cuerpo del callback) y `serializacion` (lo que
+  Dash tarda en serializar y despachar la respuesta),
+- tamaño en bytes de la respuesta,
+- aciertos/fallos de los cachés registrados con `registrar_cache`.
+
+Los mismos tiempos se devuelven en el encabezado `Server-Timing` para
+verlos desde las herramientas de desarrollo del navegador.
+
+El costo por petición es un par de `perf_counter` y unas sumas bajo un
+lock, así que puede quedar activo en producción. Con Gunicorn cada worker
+expone sus propias métricas (etiqueta `pid`).
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, g, has_request_context, request
+
+from Server import perfilador
+
+RUTA_CALLBACKS = "_dash-update-component"
+
+# Límites de los histogramas (segundos y bytes)
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+FASES = ("filtrado", "figura", "serializacion")
+
+
+class _Histograma:
+    __slots__ = ("limites", "conteos", "suma", "total")
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+_lock = threading.Lock()
+_latencias = {}
+_fases = {}
+_bytes = {}
+_aciertos = {}
+_fuentes_cache = {}
+_nombres_callback = {}
+
+
+# API PARA CALLBACKS Y CACHES
+
+@contextmanager
+def medir_fase(fase):
+    """Acumula el tiempo del bloque en la fase indicada de la petición actual."""
+    if not has_request_context():
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fases = g.setdefault("_saber_fases", {})
+        fases[fase] = fases.get(fase, 0.0) + time.perf_counter() - inicio
+
+
+def instrumentar_callback(funcion):
+    """Decorador para callbacks: mide el tiempo total del cuerpo del callback.
+
+    Se aplica debajo de `@callback` para que Dash registre la función envuelta.
+    """
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if not has_request_context():
+            return funcion(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            g._saber_callback = time.perf_counter() - inicio
+            g._saber_nombre = funcion.__name__
+    # Con el perfilador apagado el callback queda como está (ver Server/perfilador.py)
+    if perfilador.ACTIVO:
+        return perfilador.envolver(envoltura, funcion.__name__)
+    return envoltura
+
+
+def registrar_acierto(cache, acierto):
+    """Cuenta un acierto o fallo para cachés que reportan cada consulta."""
+    with _lock:
+        conteo = _aciertos.setdefault(cache, [0, 0])
+        conteo[0 if acierto else 1] += 1
+
+
+def registrar_cache(cache, obtener_info):
+    """Registra un caché cuya información se lee al consultar `/metrics`.
+
+    `obtener_info` debe retornar un objeto con atributos `hits` y `misses`,
+    como el `cache_info` de `functools.lru_cache`.
+    """
+    _fuentes_cache[cache] = obtener_info
+
+
+# HOOKS DE FLASK
+
+def _nombre_callback(app, salida):
+    nombre = _nombres_callback.get(salida)
+    if nombre is None:
+        info = app.callback_map.get(salida, {})
+        funcion = info.get("callback")
+        nombre = getattr(funcion, "__name__", None) or salida.strip(".")
+        _nombres_callback[salida] = nombre
+    return nombre
+
+
+def _antes():
+    if request.path.endswith(RUTA_CALLBACKS):
+        g._saber_inicio = time.perf_counter()
+
+
+def _registrar_respuesta(app, response):
+    inicio = g.get("_saber_inicio")
+    if inicio is None:
+        return response
+
+    total = time.perf_counter() - inicio
+    cuerpo = request.get_json(silent=True) or {}
+    nombre = g.get("_saber_nombre") or _nombre_callback(app, cuerpo.get("output", "desconocido"))
+
+    fases = dict(g.get("_saber_fases", {}))
+    en_callback = g.get("_saber_callback")
+    if en_callback is not None:
+        fases["figura"] = max(en_callback - fases.get("filtrado", 0.0), 0.0)
+        fases["serializacion"] = max(total - en_callback, 0.0)
+
+    tamano = response.calculate_content_length() or 0
+
+    with _lock:
+        _latencias.setdefault(nombre, _Histograma(BUCKETS_SEGUNDOS)).observar(total)
+        _bytes.setdefault(nombre, _Histograma(BUCKETS_BYTES)).observar(tamano)
+        for fase, duracion in fases.items():
+            _fases.setdefault((nombre, fase), _Histograma(BUCKETS_SEGUNDOS)).observar(duracion)
+
+    partes = [f"{fase};dur={fases[fase] * 1000:.1f}" for fase in FASES if fase in fases]
+    partes.append(f"total;dur={total * 1000:.1f}")
+    response.headers["Server-Timing"] = ", ".join(partes)
+    return response
+
+
+# EXPOSICION EN FORMATO PROMETHEUS
+
+def _lineas_histograma(metrica, etiquetas, histo):
+    acumulado = 0
+    for limite, conteo in zip(histo.limites, histo.conteos):
+        acumulado += conteo
+        yield f'{metrica}_bucket{{{etiquetas},le="{limite:g}"}} {acumulado}'
+    yield f'{metrica}_bucket{{{etiquetas},le="+Inf"}} {histo.total}'
+    yield f"{metrica}_sum{{{etiquetas}}} {histo.suma:.6f}"
+    yield f"{metrica}_count{{{etiquetas}}} {histo.total}"
+
+
+def exportar_prometheus():
+    pid = os.getpid()
+    lineas = []
+
+    with _lock:
+        lineas.append("# HELP saber_callback_duracion_segundos Latencia total por callback.")
+        lineas.append("# TYPE saber_callback_duracion_segundos histogram")
+        for nombre, histo in sorted(_latencias.items()):
+            lineas.extend(_lineas_histograma(
+                "saber_callback_duracion_segundos", f'pid="{pid}",callback="{nombre}"', histo))
+
+        lineas.append("# HELP saber_callback_fase_segundos Tiempo por fase (filtrado, figura, serializacion).")
+        lineas.append("# TYPE saber_callback_fase_segundos histogram")
+        for (nombre, fase), histo in sorted(_fases.items()):
+            lineas.extend(_lineas_histograma(
+                "saber_callback_fase_segundos", f'pid="{pid}",callback="{nombre}",fase="{fase}"', histo))
+
+        lineas.append("# HELP saber_callback_respuesta_bytes Tamaño de la respuesta del callback.")
+        lineas.append("# TYPE saber_callback_respuesta_bytes histogram")
+        for nombre, histo in sorted(_bytes.items()):
+            lineas.extend(_lineas_histograma(
+                "saber_callback_respuesta_bytes", f'pid="{pid}",callback="{nombre}"', histo))
+
+        conteos = {cache: tuple(valores) for cache, valores in _aciertos.items()}
+
+    for cache, obtener_info in _fuentes_cache.items():
+        info = obtener_info()
+        conteos[cache] = (info.hits, info.misses)
+
+    lineas.append("# HELP saber_cache_consultas_total Consultas a cachés por resultado.")
+    lineas.append("# TYPE saber_cache_consultas_total counter")
+    for cache, (hits, misses) in sorted(conteos.items()):
+        lineas.append(f'saber_cache_consultas_total{{pid="{pid}",cache="{cache}",resultado="acierto"}} {hits}')
+        lineas.append(f'saber_cache_consultas_total{{pid="{pid}",cache="{cache}",resultado="fallo"}} {misses}')
+
+    return "\n".join(lineas) + "\n"
+
+
+def instalar_metricas(app, ruta="/metrics"):
+    """Registra los hooks de medición y el endpoint de métricas en `app.server`."""
+    server = app.server
+    server.before_request(_antes)
+    server.after_request(lambda response: _registrar_respuesta(app, response))
+    server.add_url_rule(
+        ruta, "saber_metricas",
+        lambda: Response(exportar_prometheus(), mimetype="text/plain; version=0.0.4")
+    )
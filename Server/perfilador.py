@@ -0,0 +1,326 @@
+"""Perfilado bajo demanda de callbacks en producción.
+
+Apagado (por defecto) no cuesta nada: `instrumentar_callback` solo envuelve
+los callbacks con el perfilador si `SABER_PERFILADOR=1` al importar las
+páginas, así que sin él no hay ni una comparación extra por petición.
+
+Encendido, una ejecución de callback se perfila si:
+
+- la petición trae el encabezado `X-Saber-Perfil: 1` junto con
+  `X-Saber-Token` igual a `SABER_PERFIL_TOKEN`;
+- la página se abrió con `?perfil=<SABER_PERFIL_TOKEN>` (llega en el
+  `Referer` de las peticiones de los callbacks);
+- está armada desde `/admin/perfil` (POST con `callback=`, `n=` y
+  `minutos=`, con el mismo encabezado `X-Saber-Token`).
+  El armado vive en un archivo del directorio de perfiles, así que lo ven
+  todos los workers de Gunicorn y los procesos de los callbacks en segundo
+  plano (el conteo entre procesos es aproximado);
+- o cae en la muestra aleatoria `SABER_PERFIL_TASA` (0 a 1).
+
+Sin `SABER_PERFIL_TOKEN` solo queda la muestra aleatoria: un perfil cuesta
+CPU y disco, así que ningún cliente anónimo puede pedirlo. Las dos
+primeras solo aplican a callbacks que corren en la petición; los de
+segundo plano (tableros de /pregunta_1 y /pregunta_3) se perfilan
+armándolos o por muestra.
+
+Cada perfil es un muestreo estadístico de pilas (un hilo lee
+`sys._current_frames()` cada `SABER_PERFIL_INTERVALO_MS`) del hilo del
+callback y de los del pool de figuras de `Analysis/paralelo.py`, más una
+instantánea de tracemalloc con lo asignado durante el callback que sigue
+vivo al terminar. En `SABER_DIR_PERFILES` quedan, por ejecución:
+
+- `<id>.folded`: pilas colapsadas (`a;b;c 12`), la entrada de
+  flamegraph.pl, inferno o speedscope;
+- `<id>.memoria.txt`: duración, muestras, pico de memoria y las líneas que
+  más memoria asignaron;
+- `<id>.tracemalloc`: la instantánea completa (`tracemalloc.Snapshot.load`).
+
+Se conservan los últimos `SABER_PERFIL_MAX` perfiles.
+"""
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+from urllib.parse import parse_qs, urlparse
+
+from flask import abort, has_request_context, jsonify, request, send_from_directory
+
+ACTIVO = os.environ.get("SABER_PERFILADOR") == "1"
+DIRECTORIO_PERFILES = os.environ.get("SABER_DIR_PERFILES", os.path.join(".cache", "perfiles"))
+INTERVALO = float(os.environ.get("SABER_PERFIL_INTERVALO_MS", "5")) / 1000
+TASA = float(os.environ.get("SABER_PERFIL_TASA", "0"))
+TOKEN = os.environ.get("SABER_PERFIL_TOKEN")
+MAX_PERFILES = int(os.environ.get("SABER_PERFIL_MAX", "200"))
+
+ENCABEZADO = "X-Saber-Perfil"
+ENCABEZADO_TOKEN = "X-Saber-Token"
+ARCHIVO_ARMADO = "armado.json"
+PREFIJO_HILOS_FIGURAS = "saber-figuras"
+PROFUNDIDAD_MAXIMA = 128
+LINEAS_MEMORIA = 40
+EXTENSIONES = (".folded", ".memoria.txt", ".tracemalloc")
+
+_lock = threading.Lock()
+_usuarios_tracemalloc = 0
+_tracemalloc_propio = False
+# (momento de lectura, contenido) del archivo de armado; se relee cada segundo
+_armado = (float("-inf"), None)
+
+
+# MUESTREO DE PILAS
+
+def _marco(codigo):
+    return f"{os.path.basename(codigo.co_filename)}:{getattr(codigo, 'co_qualname', codigo.co_name)}"
+
+
+class Muestreador(threading.Thread):
+    """Cuenta las pilas del hilo `objetivo` y de los hilos del pool de figuras."""
+
+    def __init__(self, objetivo, intervalo=INTERVALO):
+        super().__init__(daemon=True, name="saber-perfilador")
+        self.objetivo = objetivo
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self._parar = threading.Event()
+
+    def _hilos(self):
+        hilos = {self.objetivo: "callback"}
+        for hilo in threading.enumerate():
+            if hilo.name.startswith(PREFIJO_HILOS_FIGURAS) and hilo.ident is not None:
+                hilos[hilo.ident] = hilo.name
+        return hilos
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            marcos = sys._current_frames()
+            for ident, etiqueta in self._hilos().items():
+                marco = marcos.get(ident)
+                # Hilos del pool sin tarea (esperando en la cola): no son parte del callback
+                if marco is None or (ident != self.objetivo
+                                     and marco.f_code.co_filename.endswith(("threading.py", "queue.py"))):
+                    continue
+                pila = []
+                while marco is not None and len(pila) < PROFUNDIDAD_MAXIMA:
+                    pila.append(_marco(marco.f_code))
+                    marco = marco.f_back
+                pila.append(etiqueta)
+                self.pilas[";".join(reversed(pila))] += 1
+            self.muestras += 1
+
+    def detener(self):
+        self._parar.set()
+        self.join()
+
+
+# TRACEMALLOC (COMPARTIDO ENTRE PERFILES SIMULTANEOS)
+
+def _iniciar_memoria():
+    global _usuarios_tracemalloc, _tracemalloc_propio
+    with _lock:
+        if _usuarios_tracemalloc == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            _tracemalloc_propio = True
+        _usuarios_tracemalloc += 1
+
+
+def _terminar_memoria():
+    global _usuarios_tracemalloc, _tracemalloc_propio
+    with _lock:
+        _usuarios_tracemalloc -= 1
+        if _usuarios_tracemalloc == 0 and _tracemalloc_propio:
+            tracemalloc.stop()
+            _tracemalloc_propio = False
+
+
+# ARMADO DESDE /admin/perfil
+
+def _ruta_armado():
+    return os.path.join(DIRECTORIO_PERFILES, ARCHIVO_ARMADO)
+
+
+def _guardar_armado(contenido):
+    global _armado
+    os.makedirs(DIRECTORIO_PERFILES, exist_ok=True)
+    ruta_tmp = f"{_ruta_armado()}.{os.getpid()}.tmp"
+    with open(ruta_tmp, "w", encoding="utf-8") as f:
+        json.dump(contenido, f)
+    os.replace(ruta_tmp, _ruta_armado())
+    _armado = (time.monotonic(), contenido)
+
+
+def leer_armado():
+    """Armado vigente ({callback, restantes, expira}) o None."""
+    global _armado
+    leido, contenido = _armado
+    if time.monotonic() - leido >= 1.0:
+        try:
+            with open(_ruta_armado(), encoding="utf-8") as f:
+                contenido = json.load(f)
+        except (OSError, ValueError):
+            contenido = None
+        _armado = (time.monotonic(), contenido)
+    if not contenido or contenido["restantes"] <= 0 or time.time() > contenido["expira"]:
+        return None
+    return contenido
+
+
+def armar(callback=None, n=1, minutos=10):
+    """Perfila las próximas `n` ejecuciones de `callback` (de cualquiera si es None)."""
+    contenido = {"callback": callback or None, "restantes": int(n), "expira": time.time() + 60 * minutos}
+    with _lock:
+        _guardar_armado(contenido)
+    return contenido
+
+
+def desarmar():
+    global _armado
+    with _lock:
+        try:
+            os.remove(_ruta_armado())
+        except FileNotFoundError:
+            pass
+        _armado = (time.monotonic(), None)
+
+
+def _consumir_armado(nombre):
+    with _lock:
+        armado = leer_armado()
+        if armado is None or armado["callback"] not in (None, nombre):
+            return False
+        _guardar_armado(dict(armado, restantes=armado["restantes"] - 1))
+    return True
+
+
+# DECISION Y PERFILADO
+
+def _token_valido(valor):
+    return bool(TOKEN) and valor is not None and hmac.compare_digest(valor, TOKEN)
+
+
+def _motivo(nombre):
+    if has_request_context():
+        if request.headers.get(ENCABEZADO) == "1" and _token_valido(request.headers.get(ENCABEZADO_TOKEN)):
+            return "encabezado"
+        if request.referrer and _token_valido(parse_qs(urlparse(request.referrer).query).get("perfil", [None])[0]):
+            return "url"
+    if _consumir_armado(nombre):
+        return "armado"
+    if TASA > 0 and random.random() < TASA:
+        return "muestra"
+    return None
+
+
+def _podar():
+    perfiles = sorted({archivo.split(".")[0] for archivo in os.listdir(DIRECTORIO_PERFILES)
+                       if archivo.endswith(EXTENSIONES)})
+    for base in perfiles[:-MAX_PERFILES]:
+        for extension in EXTENSIONES:
+            try:
+                os.remove(os.path.join(DIRECTORIO_PERFILES, base + extension))
+            except FileNotFoundError:
+                pass
+
+
+def _escribir(nombre, motivo, duracion, muestreador, instantanea, pico):
+    os.makedirs(DIRECTORIO_PERFILES, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_PERFILES, f"{datetime.now():%Y%m%d-%H%M%S-%f}_{nombre}_{os.getpid()}")
+
+    with open(ruta + ".folded", "w", encoding="utf-8") as f:
+        for pila, conteo in muestreador.pilas.most_common():
+            f.write(f"{pila} {conteo}\n")
+
+    instantanea = instantanea.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, threading.__file__),
+    ])
+    with open(ruta + ".memoria.txt", "w", encoding="utf-8") as f:
+        f.write(f"callback: {nombre}\nmotivo: {motivo}\nduracion_s: {duracion:.3f}\n"
+                f"muestras: {muestreador.muestras} cada {muestreador.intervalo * 1000:g} ms\n"
+                f"pico_memoria_mb: {pico / 1e6:.1f}\n\n")
+        for estadistica in instantanea.statistics("lineno")[:LINEAS_MEMORIA]:
+            f.write(f"{estadistica}\n")
+    instantanea.dump(ruta + ".tracemalloc")
+
+    _podar()
+    print(f"[perfilador] {nombre} ({motivo}): {duracion:.2f}s, {muestreador.muestras} muestras -> {ruta}.folded")
+
+
+def _perfilar(funcion, nombre, motivo, args, kwargs):
+    _iniciar_memoria()
+    if _tracemalloc_propio:
+        tracemalloc.reset_peak()
+    muestreador = Muestreador(threading.get_ident())
+    muestreador.start()
+    inicio = time.perf_counter()
+    try:
+        return funcion(*args, **kwargs)
+    finally:
+        duracion = time.perf_counter() - inicio
+        muestreador.detener()
+        instantanea = tracemalloc.take_snapshot()
+        pico = tracemalloc.get_traced_memory()[1]
+        _terminar_memoria()
+        try:
+            _escribir(nombre, motivo, duracion, muestreador, instantanea, pico)
+        except OSError as e:
+            print(f"[perfilador] no se pudo guardar el perfil de {nombre}: {e}")
+
+
+def envolver(funcion, nombre):
+    """`funcion` envuelta para perfilar las ejecuciones seleccionadas (ver arriba)."""
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        motivo = _motivo(nombre)
+        if motivo is None:
+            return funcion(*args, **kwargs)
+        return _perfilar(funcion, nombre, motivo, args, kwargs)
+    return envoltura
+
+
+# ENDPOINT DE ADMINISTRACION
+
+def _autorizar():
+    if not _token_valido(request.headers.get(ENCABEZADO_TOKEN)):
+        abort(403)
+
+
+def _admin():
+    _autorizar()
+    if request.method == "POST":
+        armar(request.args.get("callback"), request.args.get("n", 1, type=int),
+              request.args.get("minutos", 10, type=float))
+    elif request.method == "DELETE":
+        desarmar()
+    perfiles = []
+    if os.path.isdir(DIRECTORIO_PERFILES):
+        perfiles = sorted((a for a in os.listdir(DIRECTORIO_PERFILES) if a.endswith(EXTENSIONES)), reverse=True)
+    return jsonify({"armado": leer_armado(), "tasa": TASA, "intervalo_ms": INTERVALO * 1000,
+                    "perfiles": perfiles})
+
+
+def _descargar(archivo):
+    _autorizar()
+    if not archivo.endswith(EXTENSIONES):
+        abort(404)
+    return send_from_directory(os.path.abspath(DIRECTORIO_PERFILES), archivo, as_attachment=True)
+
+
+def instalar_perfilador(app, ruta="/admin/perfil"):
+    """Registra `/admin/perfil` si el perfilador está activo y hay `SABER_PERFIL_TOKEN`."""
+    if not ACTIVO:
+        return
+    if not TOKEN:
+        print("[perfilador] activo sin SABER_PERFIL_TOKEN: solo muestra aleatoria (SABER_PERFIL_TASA)")
+        return
+    server = app.server
+    server.add_url_rule(ruta, "saber_perfil", _admin, methods=["GET", "POST", "DELETE"])
+    server.add_url_rule(f"{ruta}/<archivo>", "saber_perfil_archivo", _descargar, methods=["GET"])
@@ -0,0 +1,59 @@
+"""Serialización rápida de figuras y compresión de las respuestas.
+
+Dash serializa las respuestas de los callbacks con `plotly.io.json`, así
+que cambiar el motor de plotly a `orjson` (que codifica arreglos de NumPy
+de forma nativa) acelera todas las respuestas con figuras. La compresión
+br/gzip de `flask-compress` reduce los bytes en red, que es lo que domina
+en conexiones rurales; las respuestas pequeñas se envían sin comprimir.
+
+Ambas dependencias son opcionales: sin ellas se mantiene el comportamiento
+anterior.
+"""
+import plotly.io as pio
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Respuestas por debajo de este tamaño no compensan el costo de comprimir
+MINIMO_BYTES_COMPRESION = 1024
+
+TIPOS_COMPRIMIBLES = [
+    "application/json",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "application/javascript",
+]
+
+
+def configurar_serializacion():
+    """Usa orjson como motor JSON de plotly si está instalado; retorna el motor."""
+    if orjson is None:
+        return pio.json.config.default_engine
+    pio.json.config.default_engine = "orjson"
+    return "orjson"
+
+
+def instalar_compresion(app, minimo=MINIMO_BYTES_COMPRESION, nivel_gzip=6, nivel_br=4):
+    """Comprime con br/gzip las respuestas de `app.server`.
+
+    Debe llamarse después de `instalar_metricas`: Flask ejecuta los
+    `after_request` en orden inverso, así las métricas registran los bytes
+    ya comprimidos. Las respuestas que ya traen `Content-Encoding` (como
+    los archivos de `/estatico/`) se dejan como están.
+    """
+    try:
+        from flask_compress import Compress
+    except ImportError:
+        return False
+
+    config = app.server.config
+    config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+    config["COMPRESS_MIN_SIZE"] = minimo
+    config["COMPRESS_MIMETYPES"] = TIPOS_COMPRIMIBLES
+    config["COMPRESS_LEVEL"] = nivel_gzip
+    config["COMPRESS_BR_LEVEL"] = nivel_br
+    Compress(app.server)
+    return True
@@ -0,0 +1,28 @@
+"""Gestor local de callbacks en segundo plano (`background=True`).
+
+Los tableros de /pregunta_1 y /pregunta_3 con 'TODOS' construyen boxplots,
+dispersiones y tendencias OLS sobre todas las filas; ejecutados dentro de
+la petición bloquean un worker síncrono de Gunicorn por varios segundos.
+Con `DiskcacheManager` el callback corre en un proceso aparte y el
+navegador sondea el resultado, así que el worker queda libre de inmediato.
+
+El estado de los trabajos vive en un directorio de `diskcache`, compartido
+por todos los workers del mismo host: no hace falta Redis ni Celery. Si un
+usuario cambia el filtro antes de que termine el trabajo anterior, Dash
+envía el trabajo viejo en `oldJob` y el gestor lo termina.
+"""
+import os
+
+import diskcache
+from dash import DiskcacheManager
+
+DIRECTORIO_TRABAJOS = os.environ.get("SABER_CACHE_CALLBACKS", os.path.join(".cache", "callbacks"))
+
+# Segundos que se conservan resultados y progreso de un trabajo en disco
+EXPIRACION_TRABAJOS = 600
+
+
+def crear_gestor_callbacks(directorio=DIRECTORIO_TRABAJOS, expiracion=EXPIRACION_TRABAJOS):
+    """Crea el gestor de callbacks en segundo plano respaldado en disco."""
+    os.makedirs(directorio, exist_ok=True)
+    return DiskcacheManager(diskcache.Cache(directorio), expire=expiracion)
@@ -1,33 +1,107 @@
 #Inicio del proyecto 1 - Analitica Computacional para la toma de decisiones
 
+from urllib.parse import parse_qs, urlencode
+
 import dash
-from dash import html, dcc
+from dash import html, dcc, ctx, Input, Output
 import dash_bootstrap_components as dbc
 
+from Analysis import cache_figuras, departamentos, registro_datos
+from Server.api import instalar_api
+from Server.estatico import instalar_estatico
+from Server.geometrias import instalar_geometrias
+from Server.metricas import instalar_metricas, registrar_cache
+from Server.perfilador import instalar_perfilador
+from Server.serializacion import configurar_serializacion, instalar_compresion
+from Server.tareas import crear_gestor_callbacks
+
+# orjson para serializar figuras en las respuestas de los callbacks
+configurar_serializacion()
+
 # Usamos un tema de Bootstrap (LUX es limpio y profesional)
-app = dash.Dash(__name__, use_pages=True, external_stylesheets=[dbc.themes.LUX])
+# Los tableros pesados corren como callbacks en segundo plano (ver Server/tareas.py)
+app = dash.Dash(
+    __name__,
+    use_pages=True,
+    external_stylesheets=[dbc.themes.LUX],
+    background_callback_manager=crear_gestor_callbacks(),
+)
 server = app.server  # Necesario para despliegue en AWS/Gunicorn
 
-# Navbar simple que siempre se ve arriba
+# Latencias por callback en /metrics y encabezado Server-Timing
+instalar_metricas(app)
+registrar_cache("figuras", cache_figuras.cache_info)
+
+# Perfiles de callbacks bajo demanda (SABER_PERFILADOR=1) y /admin/perfil
+instalar_perfilador(app)
+
+# Archivos del export estático (python -m Analysis.estatico) en /estatico/
+instalar_estatico(app)
+
+# Límites municipales simplificados (python -m Analysis.geometrias) en /geometrias/
+instalar_geometrias(app)
+
+# API JSON de solo lectura con las cifras de los tableros en /api/v1
+instalar_api(app)
+
+# Compresión br/gzip; después de las métricas para que midan bytes en red
+instalar_compresion(app)
+
+# Recarga de datos en caliente: las páginas ya registraron sus cargadores al
+# importarse; un hilo por worker activa la nueva versión cuando cambia Data/
+registro_datos.iniciar_vigilancia()
+
+# Navbar simple que siempre se ve arriba, con el selector de departamento
+# (los datos de cada uno se cargan a demanda, ver Analysis/departamentos.py)
+PAGINAS_NAVBAR = [("Inicio", "/"), ("Pregunta 1", "/pregunta_1"),
+                  ("Pregunta 2", "/pregunta_2"), ("Pregunta 3", "/pregunta_3")]
+
 navbar = dbc.NavbarSimple(
     children=[
-        dbc.NavItem(dbc.NavLink("Inicio", href="/")),
-        dbc.NavItem(dbc.NavLink("Pregunta 1", href="/pregunta_1")),
-        dbc.NavItem(dbc.NavLink("Pregunta 2", href="/pregunta_2")),
-        dbc.NavItem(dbc.NavLink("Pregunta 3", href="/pregunta_3")),
+        dbc.NavItem(dbc.NavLink(nombre, href=ruta, id=f"nav-{ruta.strip('/') or 'inicio'}"))
+        for nombre, ruta in PAGINAS_NAVBAR
+    ] + [
+        dbc.NavItem(dcc.Dropdown(
+            id="selector-departamento",
+            options=departamentos.disponibles(),
+            value=departamentos.DEPARTAMENTO_DEFECTO,
+            clearable=False,
+            style={"width": "220px", "color": "#222"},
+        ), className="ms-3"),
     ],
-    brand="Analítica Saber 11 - Antioquia",
+    brand="Analítica Saber 11",
     brand_href="/",
     color="primary",
     dark=True,
 )
 
 app.layout = html.Div([
+    dcc.Location(id="url-departamento", refresh=True),
     navbar,
     dbc.Container([
         dash.page_container  # Aquí se renderizan las páginas de la carpeta /pages
     ], fluid=True, class_name="py-3")
 ])
 
+
+# El departamento va en la URL (?departamento=...), que las páginas reciben en
+# layout(); el selector la cambia y una URL abierta directamente fija el selector
+@dash.callback(
+    Output("url-departamento", "search"),
+    Output("selector-departamento", "value"),
+    *[Output(f"nav-{ruta.strip('/') or 'inicio'}", "href") for _, ruta in PAGINAS_NAVBAR],
+    Input("url-departamento", "search"),
+    Input("selector-departamento", "value"),
+)
+def sincronizar_departamento(busqueda, seleccionado):
+    if ctx.triggered_id == "selector-departamento":
+        departamento = departamentos.validar(seleccionado)
+    else:
+        departamento = departamentos.validar(parse_qs((busqueda or "").lstrip("?")).get("departamento", [None])[0])
+    sufijo = "" if departamento == departamentos.DEPARTAMENTO_DEFECTO else "?" + urlencode({"departamento": departamento})
+    nueva_busqueda = dash.no_update if sufijo == (busqueda or "") else sufijo
+    return nueva_busqueda, departamento, *[ruta + sufijo for _, ruta in PAGINAS_NAVBAR]
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8050, debug=False)
\ No newline at end of file
@@ -0,0 +1,57 @@
+// Resaltado del municipio seleccionado en los mapas, sin ir al servidor.
+// El servidor envía el mapa base una sola vez en un dcc.Store con la forma
+// {figura, estilo}; aquí solo se recalculan los arreglos de tamaño y
+// opacidad de los marcadores, o de opacidad y borde de los polígonos en los
+// mapas coropléticos (misma lógica que Analysis/mapas.py).
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    mapas: {
+        resaltar: function (base, municipio) {
+            if (!base || !base.figura) {
+                return window.dash_clientside.no_update;
+            }
+            const figura = base.figura;
+            const estilo = base.estilo;
+            const datos = figura.data || [];
+            if (!datos.length || !Array.isArray(datos[0].hovertext)) {
+                return figura;
+            }
+
+            const traza = datos[0];
+            const todos = !municipio || municipio === estilo.todos;
+            const tamanos = traza.hovertext.map(function (nombre) {
+                if (todos) { return estilo.tam_todos; }
+                return nombre === municipio ? estilo.tam_sel : estilo.tam_otros;
+            });
+            const opacidades = traza.hovertext.map(function (nombre) {
+                if (todos) { return estilo.op_todos; }
+                return nombre === municipio ? estilo.op_sel : estilo.op_otros;
+            });
+            let marker;
+            if (traza.type === "choroplethmapbox") {
+                const bordes = traza.hovertext.map(function (nombre) {
+                    return !todos && nombre === municipio ? estilo.linea_sel : estilo.linea_otros;
+                });
+                marker = Object.assign({}, traza.marker, {
+                    opacity: opacidades,
+                    line: Object.assign({}, (traza.marker || {}).line, {width: bordes})
+                });
+            } else {
+                const maximo = Math.max.apply(null, tamanos);
+                marker = Object.assign({}, traza.marker, {
+                    size: tamanos,
+                    opacity: opacidades,
+                    sizeref: maximo / (estilo.size_max * estilo.size_max)
+                });
+            }
+            const layout = Object.assign({}, figura.layout);
+            layout.title = Object.assign({}, layout.title, {
+                text: estilo.titulo.replace("{municipio}", todos ? estilo.etiqueta_todos : municipio)
+            });
+
+            return Object.assign({}, figura, {
+                data: [Object.assign({}, traza, {marker: marker})].concat(datos.slice(1)),
+                layout: layout
+            });
+        }
+    }
+});
@@ -1,15 +1,31 @@
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
 
 # Importar la función desde tu archivo de lógica
 from Analysis.logica_insights import obtener_figuras_eda, build_bar_with_comparisons
 from dash import Input, Output
+from Server.metricas import instrumentar_callback
+from Analysis import cache_figuras, estatico, registro_datos
 
 dash.register_page(__name__, path='/insights', name="Insights Generales")
 
-# Traer KPIs, figuras y datos auxiliares
-kp, figs, aux = obtener_figuras_eda()
+# Traer KPIs, figuras y datos auxiliares (del export estático si está activo),
+# una vez por versión de los datos (ver Analysis/registro_datos.py)
+def _cargar():
+    eda_estatico = estatico.leer("insights/eda", ()) if cache_figuras.MODO_ESTATICO else None
+    if eda_estatico is not None:
+        return {
+            "kp": eda_estatico["kpis"],
+            "figs": eda_estatico["figuras"],
+            "aux": {"metrics_list": eda_estatico["metricas"]},
+        }
+    kp, figs, aux = obtener_figuras_eda()
+    return {"kp": kp, "figs": figs, "aux": aux}
+
+
+registro_datos.registrar("insights", _cargar)
 
 # Helper para crear una tarjeta KPI
 def _kpi_card(title, value, md=3):
@@ -18,52 +34,55 @@ def _kpi_card(title, value, md=3):
         html.H4(f"{value}", className="card-text")
     ]), className="mb-3 shadow-sm"), md=md)
 
-layout = dbc.Container([
-    html.H2("Insights Generales - Exploración y Análisis", className="my-4"),
-    html.Hr(),
-
-    # Serie temporal - aparecer primero (puntaje global)
-    dbc.Row([
-        dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('serie_punt_global_por_periodo'))])), md=12)
-    ], className="mb-4"),
-
-    # KPIs en la parte superior
-    dbc.Row([
-        _kpi_card("Máximo puntaje global", round(kp.get("max_punt_global", 0), 2) if kp.get("max_punt_global") is not None else "N/A"),
-        _kpi_card("Mínimo puntaje global", round(kp.get("min_punt_global", 0), 2) if kp.get("min_punt_global") is not None else "N/A"),
-        _kpi_card("Media puntaje global", round(kp.get("mean_punt_global", 0), 2) if kp.get("mean_punt_global") is not None else "N/A"),
-        _kpi_card("% > 300 (global)", f"{round(kp.get('pct_over_300', 0),2)}%" if kp.get("pct_over_300") is not None else "N/A")
-    ], className="mb-4"),
-
-    # Histogramas y pie
-    dbc.Row([
-        dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('hist_global'))])), md=6),
-        dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('pie_genero'))])), md=6)
-    ], className="mb-4"),
-
-    # Histogramas por categoría
-    dbc.Row([
-        dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('hist_by_area'))])), md=6),
-        dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('hist_by_genero'))])), md=6)
-    ], className="mb-4"),
-
-    # Boxplot y barra con selector de métrica (interactive)
-    dbc.Row([
-        dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('box_global_by_category'))])), md=6),
-        dbc.Col([
-            dbc.Card(dbc.CardBody([
-                dcc.Dropdown(
-                    id='metric-select',
-                    options=[{"label": m, "value": m} for m in aux.get('metrics_list', [])],
-                    value=(aux.get('metrics_list', [None])[0] if aux.get('metrics_list') else None),
-                    clearable=False
-                ),
-                dcc.Graph(id='bar-estrato-graph', figure=figs.get('bar_by_estrato_metric_select')),
-                html.Div(id='bar-estrato-kpis')
-            ]))
-        ], md=6)
-    ], className="mb-4")
-], fluid=True)
+def layout(**kwargs):
+    datos = registro_datos.actual().datos["insights"]
+    kp, figs, aux = datos["kp"], datos["figs"], datos["aux"]
+    return dbc.Container([
+        html.H2("Insights Generales - Exploración y Análisis", className="my-4"),
+        html.Hr(),
+
+        # Serie temporal - aparecer primero (puntaje global)
+        dbc.Row([
+            dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('serie_punt_global_por_periodo'))])), md=12)
+        ], className="mb-4"),
+
+        # KPIs en la parte superior
+        dbc.Row([
+            _kpi_card("Máximo puntaje global", round(kp.get("max_punt_global", 0), 2) if kp.get("max_punt_global") is not None else "N/A"),
+            _kpi_card("Mínimo puntaje global", round(kp.get("min_punt_global", 0), 2) if kp.get("min_punt_global") is not None else "N/A"),
+            _kpi_card("Media puntaje global", round(kp.get("mean_punt_global", 0), 2) if kp.get("mean_punt_global") is not None else "N/A"),
+            _kpi_card("% > 300 (global)", f"{round(kp.get('pct_over_300', 0),2)}%" if kp.get("pct_over_300") is not None else "N/A")
+        ], className="mb-4"),
+
+        # Histogramas y pie
+        dbc.Row([
+            dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('hist_global'))])), md=6),
+            dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('pie_genero'))])), md=6)
+        ], className="mb-4"),
+
+        # Histogramas por categoría
+        dbc.Row([
+            dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('hist_by_area'))])), md=6),
+            dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('hist_by_genero'))])), md=6)
+        ], className="mb-4"),
+
+        # Boxplot y barra con selector de métrica (interactive)
+        dbc.Row([
+            dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(figure=figs.get('box_global_by_category'))])), md=6),
+            dbc.Col([
+                dbc.Card(dbc.CardBody([
+                    dcc.Dropdown(
+                        id='metric-select',
+                        options=[{"label": m, "value": m} for m in aux.get('metrics_list', [])],
+                        value=(aux.get('metrics_list', [None])[0] if aux.get('metrics_list') else None),
+                        clearable=False
+                    ),
+                    dcc.Graph(id='bar-estrato-graph', figure=figs.get('bar_by_estrato_metric_select')),
+                    html.Div(id='bar-estrato-kpis')
+                ]))
+            ], md=6)
+        ], className="mb-4")
+    ], fluid=True)
 
 
 # Callback para actualizar la barra por estrato y mostrar KPIs comparativos
@@ -72,14 +91,25 @@ layout = dbc.Container([
     Output('bar-estrato-kpis', 'children'),
     Input('metric-select', 'value')
 )
+@instrumentar_callback
 def _update_bar_and_kpis(selected_metric):
+    version = registro_datos.actual()
+    aux = version.datos["insights"]["aux"]
     df = aux.get('df')
     estrato_col = aux.get('detected', {}).get('col_estrato')
     metrics_list = aux.get('metrics_list', [])
-    if df is None or selected_metric is None or estrato_col is None:
+
+    def calcular():
+        if df is None or estrato_col is None:
+            return None
+        return build_bar_with_comparisons(df, selected_metric, estrato_col, metrics_list)
+
+    resultado = (cache_figuras.obtener('insights', (selected_metric,), calcular, version=version.id)
+                 if selected_metric else None)
+    if resultado is None:
         return go.Figure(), html.Div("No hay datos o columna de estrato detectada.")
 
-    fig, kpis_bar = build_bar_with_comparisons(df, selected_metric, estrato_col, metrics_list)
+    fig, kpis_bar = resultado
 
     # Construir representación de KPIs
     children = []
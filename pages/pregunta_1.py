@@ -1,121 +1,267 @@
+import math
+from functools import lru_cache
+
 import dash
-from dash import html, dcc, callback, Input, Output
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Input, Output, State
 import dash_bootstrap_components as dbc
+from Analysis.mapas import ESTILO_MAPA_P1, mapa_para_store
+from Server.metricas import instrumentar_callback
+from Analysis import cache_figuras, colegios, departamentos, registro_datos, vecinos
 from Analysis.logica_p1 import (
     cargar_datos_p1,
+    celdas_vecinos,
     obtener_lista_municipios_p1,
-    generar_boxplot_brecha,
     generar_dispersion_pib_brecha,
-    calcular_estadisticas_brecha,
-    generar_barras_brecha_error,
-    generar_mapa_pib_puntaje # <-- IMPORTAMOS LA NUEVA FUNCIÓN
+    generar_mapa_pib_puntaje_base,
+    construir_tablero_p1
 )
 
 dash.register_page(__name__, path='/pregunta_1', name="Brecha Urbano/Rural")
 
-# Carga de datos y gráficas estáticas
-df_p1 = cargar_datos_p1()
-lista_municipios = obtener_lista_municipios_p1(df_p1)
-grafica_pib_estatica = generar_dispersion_pib_brecha(df_p1)
-
-layout = dbc.Container([
-    # Encabezado y Contexto
-    html.H2("Pregunta 1: Brecha de Desempeño Urbano vs. Rural", className="my-4 fw-bold"),
-    dbc.Alert(
-        "Contexto del Ministerio: Identificar brechas críticas de desempeño entre zonas urbanas y rurales para focalizar recursos y programas de nivelación en municipios de menor PIB.",
-        color="info",
-        className="shadow-sm"
-    ),
-    html.Hr(),
+# Carga de datos (una vez por versión, ver Analysis/registro_datos.py; otros
+# departamentos se cargan a demanda, ver Analysis/departamentos.py)
+def _cargar(departamento=departamentos.DEPARTAMENTO_DEFECTO):
+    rutas = departamentos.rutas(departamento)
+    df_p1 = cargar_datos_p1(rutas['datos'], rutas['pib'], rutas['coordenadas'], departamento)
+    registro_datos.validar_marco(df_p1, ['cole_mcpio_ubicacion', 'Area', 'punt_global'])
+    return {
+        'df': df_p1,
+        'municipios': obtener_lista_municipios_p1(df_p1),
+        # Búsqueda y estadísticas por colegio (zona de residencia), ver Analysis/colegios.py
+        'colegios': colegios.construir_indice(df_p1, por='Area'),
+        # Celdas municipio x zona para la comparación con vecinos de las barras
+        'celdas_vecinos': celdas_vecinos(df_p1),
+    }
+
+
+registro_datos.registrar('pregunta_1', _cargar)
+# Si cambian las coordenadas se reconstruye el índice de vecinos
+registro_datos.al_cambiar(vecinos.limpiar)
+
+
+# El mapa base se calcula una vez por versión; el municipio se resalta en el
+# navegador. Ambas figuras salen del caché si está caliente (sin importar
+# plotly.express)
+@lru_cache(maxsize=4)
+def _graficas_estaticas(version_id):
+    df_p1 = departamentos.buscar(version_id, 'pregunta_1')['df']
+    return cache_figuras.obtener(
+        'pregunta_1/estaticas', (),
+        lambda: (generar_dispersion_pib_brecha(df_p1),
+                 mapa_para_store(generar_mapa_pib_puntaje_base(df_p1), ESTILO_MAPA_P1)),
+        version=version_id
+    )
+
+
+def layout(departamento=None, **kwargs):
+    departamento = departamentos.validar(departamento)
+    version_id, datos = departamentos.datos(departamento, 'pregunta_1')
+    lista_municipios = datos['municipios']
+    grafica_pib_estatica, mapa_base_p1 = _graficas_estaticas(version_id)
+    return dbc.Container([
+        dcc.Store(id='departamento-p1', data=departamento),
+        # Encabezado y Contexto
+        html.H2("Pregunta 1: Brecha de Desempeño Urbano vs. Rural", className="my-4 fw-bold"),
+        dbc.Alert(
+            "Contexto del Ministerio: Identificar brechas críticas de desempeño entre zonas urbanas y rurales para focalizar recursos y programas de nivelación en municipios de menor PIB.",
+            color="info",
+            className="shadow-sm"
+        ),
+        html.Hr(),
     
-    # Filtro
-    dbc.Row([
-        dbc.Col([
-            html.Label("Focalizar Análisis por Municipio:", className="fw-bold"),
-            dcc.Dropdown(
-                id='filtro-municipio-p1',
-                options=[{'label': m, 'value': m} for m in lista_municipios],
-                value='TODOS',
-                clearable=False,
-                className="mb-3 shadow-sm"
-            )
-        ], md=4)
-    ]),
+        # Filtro
+        dbc.Row([
+            dbc.Col([
+                html.Label("Focalizar Análisis por Municipio:", className="fw-bold"),
+                dcc.Dropdown(
+                    id='filtro-municipio-p1',
+                    options=[{'label': m, 'value': m} for m in lista_municipios],
+                    value='TODOS',
+                    clearable=False,
+                    className="mb-3 shadow-sm"
+                )
+            ], md=4),
+            # Colegio: las opciones las busca el servidor a medida que se escribe
+            dbc.Col([
+                html.Label("Bajar a un Colegio:", className="fw-bold"),
+                dcc.Dropdown(
+                    id='filtro-colegio-p1',
+                    options=[],
+                    placeholder="Escriba el nombre o código DANE...",
+                    className="mb-3 shadow-sm"
+                )
+            ], md=4),
+            # Progreso del tablero mientras se calcula en segundo plano
+            dbc.Col([
+                html.Div(
+                    dbc.Progress(id='progreso-p1', value=0, max=3, striped=True, animated=True),
+                    id='contenedor-progreso-p1',
+                    style={'display': 'none'},
+                    className="mt-4"
+                )
+            ], md=4)
+        ]),
     
-    # Tarjeta de Insights y Estadísticas
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.H5("Hallazgos e Insights (Prueba T-Student)", className="card-title text-success fw-bold"),
-                    html.P(id='texto-insight-p1', className="card-text fs-5")
-                ])
-            ], className="mb-4 shadow-sm border-success")
-        ], md=12)
-    ]),
-
-    # NUEVA FILA: Mapa Interactivo
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([dcc.Graph(id='grafica-mapa-p1')])
-            ], className="mb-4 shadow-sm")
-        ], md=12)
-    ]),
+        # Tarjeta de Insights y Estadísticas
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H5("Hallazgos e Insights (Prueba T-Student)", className="card-title text-success fw-bold"),
+                        html.P(id='texto-insight-p1', className="card-text fs-5")
+                    ])
+                ], className="mb-4 shadow-sm border-success")
+            ], md=12)
+        ]),
+
+        # Estadísticas del colegio seleccionado (vacío sin colegio)
+        html.Div(id='detalle-colegio-p1'),
+
+        # NUEVA FILA: Mapa Interactivo
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        dcc.Store(id='mapa-base-p1', data=mapa_base_p1),
+                        dcc.Graph(id='grafica-mapa-p1')
+                    ])
+                ], className="mb-4 shadow-sm")
+            ], md=12)
+        ]),
     
-    # Fila: Boxplot y Gráfico de Barras con Error
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader("Comparación de Distribución (Urbano vs Rural)", className="fw-bold bg-light"),
-                dbc.CardBody([dcc.Graph(id='grafica-boxplot-p1')])
-            ], className="mb-4 shadow-sm")
-        ], md=6),
+        # Fila: Boxplot y Gráfico de Barras con Error
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("Comparación de Distribución (Urbano vs Rural)", className="fw-bold bg-light"),
+                    dbc.CardBody([dcc.Graph(id='grafica-boxplot-p1')])
+                ], className="mb-4 shadow-sm")
+            ], md=6),
         
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader("Promedios con Desviación Estándar", className="fw-bold bg-light"),
-                dbc.CardBody([
-                    dcc.Graph(id='grafica-barras-error-p1'),
-                    html.Small(
-                        "Nota: Las líneas sobre las barras indican la variabilidad de los datos (Desviación Estándar).", 
-                        className="text-muted text-center d-block mt-2"
-                    )
-                ])
-            ], className="mb-4 shadow-sm")
-        ], md=6)
-    ]),
-
-    # Fila: Dispersión del PIB
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader("Impacto del PIB en la Brecha Educativa (Global Departamental)", className="fw-bold bg-light"),
-                dbc.CardBody([
-                    dcc.Graph(figure=grafica_pib_estatica),
-                    html.Small(
-                        "Nota: Valores positivos en Y indican ventaja urbana. Muestra si los municipios más pobres sufren brechas más grandes.", 
-                        className="text-muted text-center d-block mt-2"
-                    )
-                ])
-            ], className="mb-4 shadow-sm")
-        ], md=12)
-    ])
-], fluid=True)
-
-
-# Callback actualizado para incluir el mapa
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("Promedios con Desviación Estándar", className="fw-bold bg-light"),
+                    dbc.CardBody([
+                        dcc.Graph(id='grafica-barras-error-p1'),
+                        html.Small(
+                            "Nota: Las líneas sobre las barras indican la variabilidad de los datos (Desviación Estándar).", 
+                            className="text-muted text-center d-block mt-2"
+                        )
+                    ])
+                ], className="mb-4 shadow-sm")
+            ], md=6)
+        ]),
+
+        # Fila: Dispersión del PIB
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("Impacto del PIB en la Brecha Educativa (Global Departamental)", className="fw-bold bg-light"),
+                    dbc.CardBody([
+                        dcc.Graph(figure=grafica_pib_estatica),
+                        html.Small(
+                            "Nota: Valores positivos en Y indican ventaja urbana. Muestra si los municipios más pobres sufren brechas más grandes.", 
+                            className="text-muted text-center d-block mt-2"
+                        )
+                    ])
+                ], className="mb-4 shadow-sm")
+            ], md=12)
+        ])
+    ], fluid=True)
+
+
+# Callback del tablero (el mapa se actualiza en el navegador, ver abajo)
+# Corre en segundo plano: con 'TODOS' tarda varios segundos y no debe
+# bloquear el worker; si el municipio cambia antes de terminar, Dash
+# cancela el trabajo anterior. Las salidas se guardan en el caché de figuras
 @callback(
     [Output('grafica-boxplot-p1', 'figure'),
      Output('grafica-barras-error-p1', 'figure'),
-     Output('grafica-mapa-p1', 'figure'), # <-- NUEVO OUTPUT PARA EL MAPA
      Output('texto-insight-p1', 'children')],
-    [Input('filtro-municipio-p1', 'value')]
+    [Input('filtro-municipio-p1', 'value')],
+    [State('departamento-p1', 'data')],
+    background=True,
+    running=[(Output('contenedor-progreso-p1', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('progreso-p1', 'value'), Output('progreso-p1', 'max')]
 )
-def actualizar_tablero_p1(municipio_seleccionado):
-    boxplot = generar_boxplot_brecha(df_p1, municipio_seleccionado)
-    barras_error = generar_barras_brecha_error(df_p1, municipio_seleccionado)
-    mapa = generar_mapa_pib_puntaje(df_p1, municipio_seleccionado) # <-- GENERAR EL MAPA
-    texto_insight = calcular_estadisticas_brecha(df_p1, municipio_seleccionado)
-    
-    return boxplot, barras_error, mapa, texto_insight
\ No newline at end of file
+@instrumentar_callback
+def actualizar_tablero_p1(set_progress, municipio_seleccionado, departamento):
+    # La versión se toma al empezar: una recarga en medio no cambia los datos
+    version_id, datos = departamentos.datos(departamento, 'pregunta_1')
+    return cache_figuras.obtener(
+        'pregunta_1', (municipio_seleccionado,),
+        lambda: construir_tablero_p1(
+            datos['df'], municipio_seleccionado,
+            progreso=lambda hecho, total: set_progress((hecho, total)),
+            celdas=datos['celdas_vecinos']
+        ),
+        version=version_id
+    )
+
+
+# Resaltado del municipio en el mapa sin ir al servidor (assets/mapas.js)
+clientside_callback(
+    ClientsideFunction(namespace='mapas', function_name='resaltar'),
+    Output('grafica-mapa-p1', 'figure'),
+    Input('mapa-base-p1', 'data'),
+    Input('filtro-municipio-p1', 'value')
+)
+
+
+# COLEGIOS
+# Solo las opciones que coinciden con lo escrito viajan al navegador
+@callback(
+    Output('filtro-colegio-p1', 'options'),
+    Input('filtro-colegio-p1', 'search_value'),
+    Input('filtro-municipio-p1', 'value'),
+    State('filtro-colegio-p1', 'value'),
+    State('departamento-p1', 'data')
+)
+def buscar_colegios_p1(busqueda, municipio, seleccionado, departamento):
+    _, datos = departamentos.datos(departamento, 'pregunta_1')
+    return colegios.opciones_dropdown(datos['colegios'], busqueda, seleccionado, municipio)
+
+
+@callback(
+    Output('filtro-colegio-p1', 'value'),
+    Input('filtro-municipio-p1', 'value'),
+    prevent_initial_call=True
+)
+def limpiar_colegio_p1(municipio):
+    return None
+
+
+@callback(
+    Output('detalle-colegio-p1', 'children'),
+    Input('filtro-colegio-p1', 'value'),
+    State('departamento-p1', 'data')
+)
+@instrumentar_callback
+def detalle_colegio_p1(codigo, departamento):
+    _, datos = departamentos.datos(departamento, 'pregunta_1')
+    indice = datos['colegios']
+    if not codigo or indice is None or codigo not in indice:
+        return None
+    colegio = indice.opcion(codigo)
+    tabla = indice.estadisticas(codigo, ['punt_global'])
+    filas = [
+        html.Tr([
+            html.Td(fila['Area']),
+            html.Td(f"{fila['n']:,}"),
+            # Sin desviación con un solo estudiante
+            html.Td(f"{fila['media']:.1f}" + ("" if math.isnan(fila['de']) else f" ± {fila['de']:.1f}")),
+            html.Td(f"{fila['media_municipio']:.1f}"),
+            html.Td(f"{fila['media'] - fila['media_municipio']:+.1f}"),
+        ])
+        for fila in tabla.to_dict('records')
+    ]
+    return dbc.Card([
+        dbc.CardHeader(f"{colegio['nombre']} ({colegio['municipio']}, código {codigo})", className="fw-bold bg-light"),
+        dbc.CardBody(dbc.Table(
+            [html.Thead(html.Tr([html.Th(t) for t in
+                                 ("Zona de residencia", "Estudiantes", "Puntaje global (± DE)",
+                                  "Promedio del municipio", "Diferencia")])),
+             html.Tbody(filas)],
+            bordered=False, hover=True, size="sm", className="mb-0"
+        ))
+    ], className="mb-4 shadow-sm")
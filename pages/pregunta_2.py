@@ -1,23 +1,50 @@
+from functools import lru_cache
+
 import dash
-from dash import html, dcc, Input, Output
+from dash import html, dcc, clientside_callback, ClientsideFunction, Input, Output, State
 import dash_bootstrap_components as dbc
 
+from Server.metricas import instrumentar_callback, medir_fase, registrar_cache
 from Analysis.logica_p2 import (
-    cargar_datos, filtrar_datos, calcular_brechas,
-    generar_boxplots_materias, generar_mapa_brecha,
-    generar_brecha_por_estrato,
+    cargar_datos, resumir_porcion, construir_celdas_brecha, calcular_brechas_ajustadas,
+    generar_boxplots_desde_resumen, generar_mapa_brecha_desde_resumen, estilo_mapa_brecha,
+    generar_brecha_por_estrato_desde_resumen,
     formato_periodo, MATERIAS
 )
+from Analysis.mapas import mapa_para_store
+from Analysis.memo import memo_compartido
+from Analysis import cache_figuras, colegios, departamentos, registro_datos
 
 # REGISTRO DE PAGINA
 dash.register_page(__name__, path="/pregunta_2")
 
 # CARGAR DATOS
-df = cargar_datos()
-
-# OPCIONES DE FILTROS
-municipios = ["Todos"] + sorted(df["cole_mcpio_ubicacion"].dropna().unique())
-periodos = sorted(df["periodo"].dropna().unique())
+# Una vez por versión de los datos, con las opciones de los filtros
+# (ver Analysis/registro_datos.py; otros departamentos se cargan a demanda,
+# ver Analysis/departamentos.py)
+def _cargar(departamento=departamentos.DEPARTAMENTO_DEFECTO):
+    rutas = departamentos.rutas(departamento)
+    df = cargar_datos(rutas["datos"], rutas["coordenadas"], departamento)
+    registro_datos.validar_marco(df, ["cole_mcpio_ubicacion", "cole_naturaleza", "periodo"])
+    return {
+        "df": df,
+        # Celdas para las brechas ajustadas por estrato de las tarjetas
+        "celdas_brecha": construir_celdas_brecha(df),
+        # Busqueda y estadisticas por colegio (ver Analysis/colegios.py)
+        "colegios": colegios.construir_indice(df, por="cole_naturaleza"),
+        "municipios": ["Todos"] + sorted(df["cole_mcpio_ubicacion"].dropna().unique()),
+        "periodos": sorted(df["periodo"].dropna().unique()),
+    }
+
+
+registro_datos.registrar("pregunta_2", _cargar)
+
+
+# Periodos seleccionados en el slider (indices sobre los de la version)
+def _periodos_seleccionados(datos, rango_periodo):
+    periodos = datos["periodos"]
+    idx_min, idx_max = rango_periodo
+    return tuple(periodos[idx_min:idx_max + 1])
 
 
 # TARJETA DE BRECHA
@@ -39,115 +66,172 @@ def crear_tarjeta_brecha(nombre_materia):
 
 
 # LAYOUT
-layout = html.Div([
-
-    # Titulo principal y subtitulo
-    html.H2("Calidad Educativa: Colegios Públicos vs Privados",
-            className="text-center mt-4 mb-1",
-            style={"fontWeight": "bold", "color": "#222"}),
-    html.P("Análisis de brechas en puntajes Saber 11 en Antioquia",
-           className="text-center mb-4",
-           style={"fontSize": "14px", "color": "#666"}),
-
-    # FILTROS GLOBALES
-    # Municipio y rango de periodos, aplican a todas las graficas
-    dbc.Row([
-        dbc.Col([
-            html.Label("Municipio", className="fw-bold",
-                       style={"fontSize": "13px"}),
-            dcc.Dropdown(
-                id="filtro-municipio",
-                options=[{"label": m, "value": m} for m in municipios],
-                value="Todos",
-                clearable=False
-            ),
-        ], width=4),
-        dbc.Col([
-            html.Label("Periodo", className="fw-bold",
-                       style={"fontSize": "13px"}),
-            html.Div([
-                dcc.RangeSlider(
-                    id="filtro-periodo-timeline",
-                    min=0,
-                    max=len(periodos) - 1,
-                    step=1,
-                    marks={i: {"label": formato_periodo(p),
-                               "style": {"fontSize": "11px", "transform": "rotate(-45deg)"}}
-                           for i, p in enumerate(periodos)},
-                    value=[0, len(periodos) - 1],
-                    tooltip={"placement": "top", "always_visible": False},
-                    allowCross=False,
-                )
-            ], style={"padding": "5px 10px 25px 10px"})
-        ], width=7),
-    ], justify="center", className="mb-4"),
-
-    html.Hr(style={"borderColor": "#ddd"}),
-
-    # TARJETAS DE BRECHA
-    # Dos filas de 3 tarjetas, una por cada materia
-    html.H5("Brecha por materia (Privado - Público)",
-            className="text-center mt-3 mb-3",
-            style={"fontWeight": "600", "color": "#333"}),
-    dbc.Row(
-        [crear_tarjeta_brecha(nombre) for nombre in list(MATERIAS.keys())[:3]],
-        justify="center",
-    ),
-    dbc.Row(
-        [crear_tarjeta_brecha(nombre) for nombre in list(MATERIAS.keys())[3:]],
-        justify="center",
-        className="mb-3"
-    ),
-
-    html.Hr(style={"borderColor": "#ddd"}),
-
-    # BOXPLOTS
-    # Distribucion de puntajes publico vs privado por materia
-    dcc.Graph(id="grafica-boxplot-brecha"),
-
-    html.Hr(style={"borderColor": "#ddd"}),
-
-    # BRECHA POR ESTRATO
-    # Barras agrupadas publico vs privado por nivel socioeconomico
-    dbc.Row([
-        dbc.Col([
-            html.Label("Materia", className="fw-bold",
-                       style={"fontSize": "13px"}),
-            dcc.Dropdown(
-                id="filtro-materia-estrato",
-                options=[{"label": nombre, "value": col}
-                         for nombre, col in MATERIAS.items()],
-                value="punt_global",
-                clearable=False
-            ),
-        ], width=3)
-    ], justify="center", className="mb-3"),
-
-    dcc.Graph(id="grafica-brecha-estrato"),
-
-    html.Hr(style={"borderColor": "#ddd"}),
-
-    # MAPA DE BRECHA
-    # Mapa geografico con la brecha por municipio
-    dbc.Row([
-        dbc.Col([
-            html.Label("Materia", className="fw-bold",
-                       style={"fontSize": "13px"}),
-            dcc.Dropdown(
-                id="filtro-materia-mapa",
-                options=[{"label": nombre, "value": col}
-                         for nombre, col in MATERIAS.items()],
-                value="punt_global",
-                clearable=False
-            ),
-        ], width=3)
-    ], justify="center", className="mb-3"),
-
-    dcc.Graph(id="grafica-mapa-brecha"),
-
-    html.Br(),
-
-])
+def layout(departamento=None, **kwargs):
+    departamento = departamentos.validar(departamento)
+    _, datos = departamentos.datos(departamento, "pregunta_2")
+    municipios, periodos = datos["municipios"], datos["periodos"]
+    return html.Div([
+        dcc.Store(id="departamento-p2", data=departamento),
+
+        # Titulo principal y subtitulo
+        html.H2("Calidad Educativa: Colegios Públicos vs Privados",
+                className="text-center mt-4 mb-1",
+                style={"fontWeight": "bold", "color": "#222"}),
+        html.P(f"Análisis de brechas en puntajes Saber 11 en {departamento}",
+               className="text-center mb-4",
+               style={"fontSize": "14px", "color": "#666"}),
+
+        # FILTROS GLOBALES
+        # Municipio y rango de periodos, aplican a todas las graficas
+        dbc.Row([
+            dbc.Col([
+                html.Label("Municipio", className="fw-bold",
+                           style={"fontSize": "13px"}),
+                dcc.Dropdown(
+                    id="filtro-municipio",
+                    options=[{"label": m, "value": m} for m in municipios],
+                    value="Todos",
+                    clearable=False
+                ),
+            ], width=4),
+            dbc.Col([
+                html.Label("Periodo", className="fw-bold",
+                           style={"fontSize": "13px"}),
+                html.Div([
+                    dcc.RangeSlider(
+                        id="filtro-periodo-timeline",
+                        min=0,
+                        max=len(periodos) - 1,
+                        step=1,
+                        marks={i: {"label": formato_periodo(p),
+                                   "style": {"fontSize": "11px", "transform": "rotate(-45deg)"}}
+                               for i, p in enumerate(periodos)},
+                        value=[0, len(periodos) - 1],
+                        tooltip={"placement": "top", "always_visible": False},
+                        allowCross=False,
+                    )
+                ], style={"padding": "5px 10px 25px 10px"})
+            ], width=7),
+        ], justify="center", className="mb-4"),
+
+        # COLEGIO
+        # Las opciones las busca el servidor a medida que se escribe
+        dbc.Row([
+            dbc.Col([
+                html.Label("Colegio", className="fw-bold",
+                           style={"fontSize": "13px"}),
+                dcc.Dropdown(
+                    id="filtro-colegio",
+                    options=[],
+                    placeholder="Escriba el nombre o código DANE del colegio..."
+                ),
+            ], width=6)
+        ], justify="center", className="mb-3"),
+        html.Div(id="detalle-colegio"),
+
+        html.Hr(style={"borderColor": "#ddd"}),
+
+        # TARJETAS DE BRECHA
+        # Dos filas de 3 tarjetas, una por cada materia
+        html.H5("Brecha por materia (Privado - Público)",
+                className="text-center mt-3 mb-3",
+                style={"fontWeight": "600", "color": "#333"}),
+        dbc.Row(
+            [crear_tarjeta_brecha(nombre) for nombre in list(MATERIAS.keys())[:3]],
+            justify="center",
+        ),
+        dbc.Row(
+            [crear_tarjeta_brecha(nombre) for nombre in list(MATERIAS.keys())[3:]],
+            justify="center",
+            className="mb-3"
+        ),
+
+        html.Hr(style={"borderColor": "#ddd"}),
+
+        # BOXPLOTS
+        # Distribucion de puntajes publico vs privado por materia
+        dcc.Graph(id="grafica-boxplot-brecha"),
+
+        html.Hr(style={"borderColor": "#ddd"}),
+
+        # BRECHA POR ESTRATO
+        # Barras agrupadas publico vs privado por nivel socioeconomico
+        dbc.Row([
+            dbc.Col([
+                html.Label("Materia", className="fw-bold",
+                           style={"fontSize": "13px"}),
+                dcc.Dropdown(
+                    id="filtro-materia-estrato",
+                    options=[{"label": nombre, "value": col}
+                             for nombre, col in MATERIAS.items()],
+                    value="punt_global",
+                    clearable=False
+                ),
+            ], width=3)
+        ], justify="center", className="mb-3"),
+
+        dcc.Graph(id="grafica-brecha-estrato"),
+
+        html.Hr(style={"borderColor": "#ddd"}),
+
+        # MAPA DE BRECHA
+        # Mapa geografico con la brecha por municipio
+        dbc.Row([
+            dbc.Col([
+                html.Label("Materia", className="fw-bold",
+                           style={"fontSize": "13px"}),
+                dcc.Dropdown(
+                    id="filtro-materia-mapa",
+                    options=[{"label": nombre, "value": col}
+                             for nombre, col in MATERIAS.items()],
+                    value="punt_global",
+                    clearable=False
+                ),
+            ], width=3)
+        ], justify="center", className="mb-3"),
+
+        dcc.Store(id="mapa-brecha-base"),
+        dcc.Graph(id="grafica-mapa-brecha"),
+
+        html.Br(),
+
+    ])
+
+
+# RESUMEN COMPARTIDO
+# Los tres callbacks de la pagina se disparan juntos con los mismos filtros;
+# la porcion filtrada se agrega una sola vez por (municipio, periodos) y los
+# callbacks concurrentes esperan el mismo calculo en lugar de repetirlo.
+# Cada proceso de Gunicorn mantiene su propia memoria de resumenes; debajo
+# esta el cache de figuras en disco, compartido y precalentado.
+# La clave incluye la version: una recarga no mezcla resumenes de datos viejos.
+@memo_compartido(maxsize=64)
+def _resumen(version_id, municipio, periodos_seleccionados):
+    with medir_fase("filtrado"):
+        return cache_figuras.obtener(
+            "pregunta_2/resumen", (municipio, periodos_seleccionados),
+            lambda: resumir_porcion(departamentos.buscar(version_id, "pregunta_2")["df"],
+                                    municipio, periodos_seleccionados),
+            version=version_id
+        )
+
+
+registrar_cache("p2_resumen", _resumen.cache_info)
+
+
+# Brecha ajustada por estrato (estandarizacion directa) con su IC del 95%
+def _linea_ajustada(info):
+    ajustada = info.get("brecha_ajustada")
+    if ajustada is None:
+        return html.P("Ajustada por estrato: sin datos", className="text-center text-muted",
+                      style={"fontSize": "10px", "marginBottom": "0"})
+    return html.P(
+        f"Ajustada por estrato: {ajustada:+.1f} ± {1.96 * info['ee_ajustada']:.1f} pts",
+        className="text-center",
+        title=(f"Dentro de {info['estratos']} estratos ({info['cobertura']:.0%} de los estudiantes). "
+               f"Intra estrato ponderada: {info['brecha_intra']} ± {info['ee_intra']} (EE)"),
+        style={"fontSize": "11px", "color": "#555", "marginBottom": "0"}
+    )
 
 
 # CALLBACK BOXPLOT Y TARJETAS
@@ -156,18 +240,22 @@ layout = html.Div([
     Output("grafica-boxplot-brecha", "figure"),
     *[Output(f"brecha-{nombre}", "children") for nombre in MATERIAS.keys()],
     Input("filtro-municipio", "value"),
-    Input("filtro-periodo-timeline", "value")
+    Input("filtro-periodo-timeline", "value"),
+    State("departamento-p2", "data")
 )
-def actualizar_principales(municipio, rango_periodo):
+@instrumentar_callback
+def actualizar_principales(municipio, rango_periodo, departamento):
 
-    idx_min, idx_max = rango_periodo
-    periodos_seleccionados = periodos[idx_min:idx_max + 1]
+    version_id, datos = departamentos.datos(departamento, "pregunta_2")
+    periodos_seleccionados = _periodos_seleccionados(datos, rango_periodo)
 
-    df_filtrado = filtrar_datos(df, municipio=municipio, periodo=periodos_seleccionados)
+    def calcular():
+        resumen = _resumen(version_id, municipio, periodos_seleccionados)
+        brechas = calcular_brechas_ajustadas(datos["celdas_brecha"], municipio, periodos_seleccionados)
+        return generar_boxplots_desde_resumen(resumen), brechas
 
-    fig_boxplot = generar_boxplots_materias(df_filtrado)
-
-    brechas = calcular_brechas(df_filtrado)
+    fig_boxplot, brechas = cache_figuras.obtener(
+        "pregunta_2/principales", (municipio, periodos_seleccionados), calcular, version=version_id)
 
     # Construir contenido de cada tarjeta segun la brecha
     tarjetas = []
@@ -205,6 +293,7 @@ def actualizar_principales(municipio, rango_periodo):
                     className="text-center",
                     style={"marginBottom": "0"}
                 ),
+                _linea_ajustada(info),
             ])
         else:
             contenido = html.P("Sin datos", className="text-center text-muted",
@@ -221,34 +310,135 @@ def actualizar_principales(municipio, rango_periodo):
     Output("grafica-brecha-estrato", "figure"),
     Input("filtro-municipio", "value"),
     Input("filtro-periodo-timeline", "value"),
-    Input("filtro-materia-estrato", "value")
+    Input("filtro-materia-estrato", "value"),
+    State("departamento-p2", "data")
 )
-def actualizar_estrato(municipio, rango_periodo, columna_materia):
-
-    idx_min, idx_max = rango_periodo
-    periodos_seleccionados = periodos[idx_min:idx_max + 1]
+@instrumentar_callback
+def actualizar_estrato(municipio, rango_periodo, columna_materia, departamento):
 
-    df_filtrado = filtrar_datos(df, municipio=municipio, periodo=periodos_seleccionados)
+    version_id, datos = departamentos.datos(departamento, "pregunta_2")
+    periodos_seleccionados = _periodos_seleccionados(datos, rango_periodo)
 
-    return generar_brecha_por_estrato(df_filtrado, columna_materia)
+    return cache_figuras.obtener(
+        "pregunta_2/estrato", (municipio, periodos_seleccionados, columna_materia),
+        lambda: generar_brecha_por_estrato_desde_resumen(
+            _resumen(version_id, municipio, periodos_seleccionados), columna_materia),
+        version=version_id
+    )
 
 
 # CALLBACK MAPA
-# Siempre usa todos los municipios para el mapa, resalta el seleccionado
+# El mapa base usa todos los municipios y solo depende de periodos y materia;
+# se calcula una vez por combinacion y el municipio se resalta en el navegador
+@lru_cache(maxsize=32)
+def _mapa_base(version_id, periodos_seleccionados, columna_materia):
+    def calcular():
+        fig = generar_mapa_brecha_desde_resumen(
+            _resumen(version_id, "Todos", periodos_seleccionados), columna_materia)
+        return mapa_para_store(fig, estilo_mapa_brecha(columna_materia))
+    return cache_figuras.obtener(
+        "pregunta_2/mapa", (periodos_seleccionados, columna_materia), calcular, version=version_id)
+
+
+registrar_cache("p2_mapa_base", _mapa_base.cache_info)
+
+# Al cambiar de version los resumenes y mapas en memoria ya no sirven
+registro_datos.al_cambiar(_resumen.cache_clear)
+registro_datos.al_cambiar(_mapa_base.cache_clear)
+
+
 @dash.callback(
+    Output("mapa-brecha-base", "data"),
+    Input("filtro-periodo-timeline", "value"),
+    Input("filtro-materia-mapa", "value"),
+    State("departamento-p2", "data")
+)
+@instrumentar_callback
+def actualizar_mapa(rango_periodo, columna_materia, departamento):
+
+    version_id, datos = departamentos.datos(departamento, "pregunta_2")
+    periodos_seleccionados = _periodos_seleccionados(datos, rango_periodo)
+
+    return _mapa_base(version_id, periodos_seleccionados, columna_materia)
+
+
+# Resaltado del municipio seleccionado sin ir al servidor (assets/mapas.js)
+clientside_callback(
+    ClientsideFunction(namespace="mapas", function_name="resaltar"),
     Output("grafica-mapa-brecha", "figure"),
+    Input("mapa-brecha-base", "data"),
+    Input("filtro-municipio", "value")
+)
+
+
+# CALLBACKS COLEGIO
+# Solo las opciones que coinciden con lo escrito viajan al navegador
+@dash.callback(
+    Output("filtro-colegio", "options"),
+    Input("filtro-colegio", "search_value"),
     Input("filtro-municipio", "value"),
-    Input("filtro-periodo-timeline", "value"),
-    Input("filtro-materia-mapa", "value")
+    State("filtro-colegio", "value"),
+    State("departamento-p2", "data")
 )
-def actualizar_mapa(municipio, rango_periodo, columna_materia):
+def buscar_colegios(busqueda, municipio, seleccionado, departamento):
+    _, datos = departamentos.datos(departamento, "pregunta_2")
+    return colegios.opciones_dropdown(datos["colegios"], busqueda, seleccionado, municipio)
 
-    idx_min, idx_max = rango_periodo
-    periodos_seleccionados = periodos[idx_min:idx_max + 1]
 
-    # Filtra todos los municipios para mostrar el mapa completo
-    df_filtrado = filtrar_datos(df, municipio="Todos", periodo=periodos_seleccionados)
+@dash.callback(
+    Output("filtro-colegio", "value"),
+    Input("filtro-municipio", "value"),
+    prevent_initial_call=True
+)
+def limpiar_colegio(municipio):
+    return None
+
 
-    fig_mapa = generar_mapa_brecha(df_filtrado, columna_materia, municipio_seleccionado=municipio)
+# Promedio del colegio por materia frente a su municipio (todos los periodos)
+@dash.callback(
+    Output("detalle-colegio", "children"),
+    Input("filtro-colegio", "value"),
+    State("departamento-p2", "data")
+)
+@instrumentar_callback
+def detalle_colegio(codigo, departamento):
+
+    _, datos = departamentos.datos(departamento, "pregunta_2")
+    indice = datos["colegios"]
+    if not codigo or indice is None or codigo not in indice:
+        return None
+
+    colegio = indice.opcion(codigo)
+    tabla = indice.estadisticas(codigo, list(MATERIAS.values()))
+    naturaleza = tabla.loc[tabla["cole_naturaleza"] != "Total", "cole_naturaleza"].iloc[0]
+    filas = []
+    for nombre, columna in MATERIAS.items():
+        propias = tabla[(tabla["columna"] == columna) & (tabla["cole_naturaleza"] == naturaleza)]
+        total = tabla[(tabla["columna"] == columna) & (tabla["cole_naturaleza"] == "Total")]
+        if propias.empty:
+            continue
+        propias, total = propias.iloc[0], total.iloc[0]
+        filas.append(html.Tr([
+            html.Td(nombre),
+            html.Td(f"{propias['media']:.1f}"),
+            html.Td(f"{propias['media_municipio']:.1f}"),
+            html.Td(f"{total['media_municipio']:.1f}"),
+            html.Td(f"{propias['media'] - propias['media_municipio']:+.1f}"),
+        ]))
+
+    return dbc.Row(dbc.Col(dbc.Card([
+        dbc.CardBody([
+            html.H6(f"{colegio['nombre']} · {colegio['municipio']} · {naturaleza} · {colegio['n']:,} estudiantes",
+                    className="text-center mb-2", style={"fontWeight": "600", "fontSize": "13px"}),
+            dbc.Table(
+                [html.Thead(html.Tr([html.Th(t) for t in
+                                     ("Materia", "Colegio", f"Municipio ({naturaleza})",
+                                      "Municipio (todos)", "Diferencia")])),
+                 html.Tbody(filas)],
+                bordered=False, hover=True, size="sm", className="mb-0",
+                style={"fontSize": "12px"}
+            )
+        ], style={"padding": "12px 8px"})
+    ], className="shadow-sm", style={"borderRadius": "8px", "border": "1px solid #e0e0e0"}),
+        width=8), justify="center", className="mb-3")
 
-    return fig_mapa
\ No newline at end of file
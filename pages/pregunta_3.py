@@ -1,97 +1,164 @@
+from functools import lru_cache
+
 import dash
-from dash import html, dcc, callback, Input, Output
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Input, Output, State
 import dash_bootstrap_components as dbc
+from Analysis.mapas import ESTILO_MAPA_P3, mapa_para_store
+from Server.metricas import instrumentar_callback
+from Analysis import cache_figuras, departamentos, registro_datos
 from Analysis.logica_p3 import (
     cargar_datos_p3, 
-    generar_mapa_antioquia, 
+    generar_mapa_antioquia_base,
     generar_ranking_municipios_estatico,
-    generar_histograma_tic, 
-    generar_dispersion_clusters,
-    calcular_probabilidad_b1,
-    generar_serie_tic_ingles_por_periodo,
+    construir_tablero_p3,
+    precalcular_p3,
     obtener_lista_municipios
 )
 
 dash.register_page(__name__, path='/pregunta_3', name="Competitividad / Bilingüismo")
 
-df_p3 = cargar_datos_p3()
-lista_municipios = obtener_lista_municipios(df_p3)
-ranking_estatico = generar_ranking_municipios_estatico(df_p3)
+# Carga de datos, conteos TIC x internet x nivel de inglés y series por año,
+# una vez por versión (ver Analysis/registro_datos.py; otros departamentos
+# se cargan a demanda, ver Analysis/departamentos.py)
+def _cargar(departamento=departamentos.DEPARTAMENTO_DEFECTO):
+    rutas = departamentos.rutas(departamento)
+    df_p3 = cargar_datos_p3(rutas['datos'], rutas['coordenadas'], departamento)
+    registro_datos.validar_marco(
+        df_p3, ['cole_mcpio_ubicacion', 'punt_ingles', 'desemp_ingles', 'fami_tieneinternet', 'periodo'])
+    return {
+        'df': df_p3,
+        'municipios': obtener_lista_municipios(df_p3),
+        'precalculos': precalcular_p3(df_p3),
+    }
+
+
+registro_datos.registrar('pregunta_3', _cargar)
+
+
+# El mapa base se calcula una vez por versión; el municipio se resalta en el
+# navegador. Ambas figuras salen del caché si está caliente (sin importar
+# plotly.express)
+@lru_cache(maxsize=4)
+def _graficas_estaticas(version_id):
+    df_p3 = departamentos.buscar(version_id, 'pregunta_3')['df']
+    return cache_figuras.obtener(
+        'pregunta_3/estaticas', (),
+        lambda: (generar_ranking_municipios_estatico(df_p3),
+                 mapa_para_store(generar_mapa_antioquia_base(df_p3), ESTILO_MAPA_P3)),
+        version=version_id
+    )
+
 
-layout = dbc.Container([
-    html.H2("Competitividad y Bilingüismo: Impacto TIC", className="my-4"),
-    html.Hr(),
+def layout(departamento=None, **kwargs):
+    departamento = departamentos.validar(departamento)
+    version_id, datos = departamentos.datos(departamento, 'pregunta_3')
+    lista_municipios = datos['municipios']
+    ranking_estatico, mapa_base_p3 = _graficas_estaticas(version_id)
+    return dbc.Container([
+        dcc.Store(id='departamento-p3', data=departamento),
+        html.H2("Competitividad y Bilingüismo: Impacto TIC", className="my-4"),
+        html.Hr(),
     
-    dbc.Row([
-        dbc.Col([
-            html.Label("Filtrar Análisis por Municipio:", className="fw-bold"),
-            dcc.Dropdown(
-                id='filtro-municipio',
-                options=[{'label': m, 'value': m} for m in lista_municipios],
-                value='TODOS',
-                clearable=False,
-                className="mb-3 shadow-sm"
-            )
-        ], md=4)
-    ]),
+        dbc.Row([
+            dbc.Col([
+                html.Label("Filtrar Análisis por Municipio:", className="fw-bold"),
+                dcc.Dropdown(
+                    id='filtro-municipio',
+                    options=[{'label': m, 'value': m} for m in lista_municipios],
+                    value='TODOS',
+                    clearable=False,
+                    className="mb-3 shadow-sm"
+                )
+            ], md=4),
+            # Progreso del tablero mientras se calcula en segundo plano
+            dbc.Col([
+                html.Div(
+                    dbc.Progress(id='progreso-p3', value=0, max=4, striped=True, animated=True),
+                    id='contenedor-progreso-p3',
+                    style={'display': 'none'},
+                    className="mt-4"
+                )
+            ], md=4)
+        ]),
     
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([dcc.Graph(id='grafica-mapa')])
-            ], className="mb-4 shadow-sm")
-        ], md=12)
-    ]),
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        dcc.Store(id='mapa-base-p3', data=mapa_base_p3),
+                        dcc.Graph(id='grafica-mapa')
+                    ])
+                ], className="mb-4 shadow-sm")
+            ], md=12)
+        ]),
     
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([dcc.Graph(id='grafica-histograma')])
-            ], className="mb-4 shadow-sm")
-        ], md=6),
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([dcc.Graph(id='grafica-histograma')])
+                ], className="mb-4 shadow-sm")
+            ], md=6),
         
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.H5(id='texto-probabilidad', className="text-center text-primary mb-3 fw-bold"),
-                    dcc.Graph(id='grafica-dispersion')
-                ])
-            ], className="mb-4 shadow-sm")
-        ], md=6)
-    ]),
-
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([dcc.Graph(figure=ranking_estatico)])
-            ], className="mb-4 shadow-sm")
-        ], md=12)
-    ])
-
-    ,
-
-    # Serie temporal (última en esta página)
-    dbc.Row([
-        dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(id='grafica-tiempo')])), md=12)
-    ], className="mb-4")
-], fluid=True)
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H5(id='texto-probabilidad', className="text-center text-primary mb-3 fw-bold"),
+                        dcc.Graph(id='grafica-dispersion')
+                    ])
+                ], className="mb-4 shadow-sm")
+            ], md=6)
+        ]),
 
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([dcc.Graph(figure=ranking_estatico)])
+                ], className="mb-4 shadow-sm")
+            ], md=12)
+        ])
+
+        ,
+
+        # Serie temporal (última en esta página)
+        dbc.Row([
+            dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(id='grafica-tiempo')])), md=12)
+        ], className="mb-4")
+    ], fluid=True)
+
+
+# Tablero en segundo plano (dispersion con OLS sobre todas las filas con
+# 'TODOS'); un cambio de municipio cancela el trabajo anterior. Las salidas
+# se guardan en el caché de figuras
 @callback(
-    [Output('grafica-mapa', 'figure'),
-     Output('grafica-histograma', 'figure'),
+    [Output('grafica-histograma', 'figure'),
      Output('grafica-dispersion', 'figure'),
      Output('texto-probabilidad', 'children'),
      Output('grafica-tiempo', 'figure')],
-    [Input('filtro-municipio', 'value')]
+    [Input('filtro-municipio', 'value')],
+    [State('departamento-p3', 'data')],
+    background=True,
+    running=[(Output('contenedor-progreso-p3', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('progreso-p3', 'value'), Output('progreso-p3', 'max')]
 )
-def actualizar_tablero(municipio_seleccionado):
-    mapa = generar_mapa_antioquia(df_p3, municipio_seleccionado)
-    histograma = generar_histograma_tic(df_p3, municipio_seleccionado)
-    dispersion = generar_dispersion_clusters(df_p3, municipio_seleccionado)
-    
-    probabilidad_z = calcular_probabilidad_b1(df_p3, municipio_seleccionado)
-    texto_insight = f"Insight: El acceso a internet altera la probabilidad de alcanzar nivel B1/B+ en un {probabilidad_z}%"
-    # Serie temporal (por acceso TIC)
-    serie = generar_serie_tic_ingles_por_periodo(df_p3, municipio_seleccionado)
+@instrumentar_callback
+def actualizar_tablero(set_progress, municipio_seleccionado, departamento):
+    # La versión se toma al empezar: una recarga en medio no cambia los datos
+    version_id, datos = departamentos.datos(departamento, 'pregunta_3')
+    return cache_figuras.obtener(
+        'pregunta_3', (municipio_seleccionado,),
+        lambda: construir_tablero_p3(
+            datos['df'], municipio_seleccionado,
+            progreso=lambda hecho, total: set_progress((hecho, total)),
+            precalculos=datos['precalculos']
+        ),
+        version=version_id
+    )
+
 
-    return mapa, histograma, dispersion, texto_insight, serie
\ No newline at end of file
+# Resaltado del municipio en el mapa sin ir al servidor (assets/mapas.js)
+clientside_callback(
+    ClientsideFunction(namespace='mapas', function_name='resaltar'),
+    Output('grafica-mapa', 'figure'),
+    Input('mapa-base-p3', 'data'),
+    Input('filtro-municipio', 'value')
+)
\ No newline at end of file